@@ -1,9 +1,12 @@
 import streamlit as st
 import os
 import sys
-from utils import init_db, initialize_all_data
+from utils import init_db, initialize_all_data, set_structure_id
+from utils import db_config
 from utils.helpers import load_css, display_logo
-from pages import dashboard, indicateurs, associes, repartition, charges, parametres
+from utils.data_layer import get_structures
+from utils.structures import create_structure
+from pages import dashboard, indicateurs, associes, repartition, charges, parametres, simulation, historique
 
 # Configuration de la page - désactiver la barre latérale vide par défaut
 st.set_page_config(
@@ -18,179 +21,49 @@ st.set_page_config(
     }
 )
 
-# Masquer la barre latérale avec les fichiers Python
-st.markdown("""
-<style>
-    /* Masquage de la barre du navigateur de fichiers */
-    section.main-file-navigation,
-    div[data-testid="stFileNavigationToggle"],
-    div[data-testid="stFileBrowser"],
-    div.css-1ay57l1,
-    div.st-emotion-cache-1ay57l1,
-    div.st-emotion-cache-1cypcdb,
-    div.css-1544g2n,
-    div.st-emotion-cache-1544g2n {
-        display: none !important;
-        width: 0 !important;
-        margin: 0 !important;
-        padding: 0 !important;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# Forcer le thème clair
-st.markdown("""
-    <style>
-    :root {
-        --background-color: #FFFFFF;
-        --secondary-background-color: #f9fafb;
-        --primary-color: #006deb;
-        --text-color: #2d3e50;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-# Style Doctolib pour l'en-tête et la navigation
-st.markdown("""
-    <style>
-    /* En-tête de style Doctolib */
-    [data-testid="stSidebar"] {
-        background-color: white !important;
-        border-right: 1px solid #edf0f2;
-    }
-
-    [data-testid="stSidebar"] > div:first-child {
-        padding: 0 !important;
-    }
-    
-    .sidebar-header {
-        background-color: #006deb;
-        color: white;
-        padding: 1.5rem 1rem;
-        margin-bottom: 1.5rem;
-    }
-    
-    .sidebar-header h1 {
-        color: white !important;
-        font-size: 1.3rem !important;
-        font-weight: 600 !important;
-        margin: 0 !important;
-        letter-spacing: -0.2px;
-    }
-    
-    .sidebar-nav {
-        padding: 0 1rem;
-    }
-    
-    .sidebar-separator {
-        height: 1px;
-        background-color: #edf0f2;
-        margin: 1.5rem 0;
-    }
-    
-    /* Doctolib notification badge */
-    .badge-notification {
-        display: inline-flex;
-        align-items: center;
-        justify-content: center;
-        min-width: 18px;
-        height: 18px;
-        padding: 0 6px;
-        font-size: 12px;
-        font-weight: 600;
-        line-height: 1;
-        color: white;
-        background-color: #ff4050;
-        border-radius: 12px;
-        margin-left: 8px;
-    }
-    
-    /* Hover effects */
-    .stRadio > div > div > label:hover {
-        background-color: rgba(0, 109, 235, 0.05);
-        border-radius: 8px;
-    }
-    
-    /* Éliminer les espaces vides dans la barre latérale */
-    [data-testid="stSidebar"] .block-container {
-        padding-top: 0 !important;
-        padding-bottom: 0 !important;
-    }
-    
-    /* Amélioration des éléments radio */
-    .stRadio > div {
-        gap: 0 !important;
-    }
-    
-    .stRadio > div > div > label {
-        padding: 0.5rem 0.75rem !important;
-        border-radius: 8px;
-        transition: all 0.2s ease;
-    }
-    
-    .stRadio > div > div > label[data-baseweb="radio"] > div:first-child {
-        margin-right: 12px !important;
-    }
-    
-    .stRadio > div > div > label > div:last-child {
-        font-weight: 500;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-# Désactiver les éléments d'interface Streamlit par défaut avec CSS
-hide_streamlit_style = """
-    <style>
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    [data-testid="collapsedControl"] {display: none !important;}
-    section[data-testid="stSidebar"] > div {z-index: 1;}
-    
-    /* Masquer complètement la barre de navigation de pages */
-    [data-testid="stAppViewBlockContainer"] > div:first-child {display: none !important;}
-    .st-emotion-cache-uf99v8 {display: none !important;}
-    .st-emotion-cache-16txtl3 {display: none !important;}
-    .st-emotion-cache-z5fcl4 {display: none !important;}
-    
-    /* Classes alternatives qui peuvent être utilisées */
-    nav {display: none !important;}
-    header[data-testid="stHeader"] {display: none !important;}
-    
-    /* Masquer la barre latérale avec les fichiers du projet */
-    .main-file-navigation {display: none !important;}
-    .css-1544g2n {display: none !important;}
-    .st-emotion-cache-1544g2n {display: none !important;}
-    [data-testid="stFileBrowser"] {display: none !important;}
-    .st-emotion-cache-1cypcdb {display: none !important;}
-    .st-emotion-cache-1ay57l1 {display: none !important;}
-    
-    /* Élimine tout espace à gauche */
-    .main .block-container {padding-left: 2rem !important;}
-    
-    /* Force le mode clair */
-    .stApp {
-        background-color: white;
-    }
-    .css-6qob1r {
-        background-color: white;
-    }
-    .css-1d391kg {
-        background-color: #f0f2f6;
-    }
-    </style>
-"""
-st.markdown(hide_streamlit_style, unsafe_allow_html=True)
-
-# Chargement du CSS personnalisé
+# Feuilles de style de l'application, lues et minifiées une fois par processus
 load_css()
 
+@st.cache_resource(show_spinner=False)
+def mettre_a_jour_schema(db_path):
+    """Crée les tables manquantes et applique les migrations d'une base existante, une fois par processus."""
+    init_db()
+
 # Initialisation de la base de données si elle n'existe pas
-db_path = os.path.join(os.path.dirname(__file__), 'data', 'aci_app.db')
-if not os.path.exists(db_path):
+if not os.path.exists(db_config.DB_PATH):
     initialize_all_data()
+else:
+    mettre_a_jour_schema(db_config.DB_PATH)
 
 # En-tête de navigation personnalisé style Doctolib
 st.sidebar.markdown('<div class="sidebar-header"><h1>ACI Manager</h1></div>', unsafe_allow_html=True)
+
+# Sélection de la structure (SISA) : toutes les pages travaillent sur la structure choisie
+structures = {structure.id: structure.nom for structure in get_structures()}
+if "structure_a_selectionner" in st.session_state:
+    st.session_state.structure_id = st.session_state.pop("structure_a_selectionner")
+if st.session_state.get("structure_id") not in structures:
+    st.session_state.structure_id = next(iter(structures))
+
+structure_id = st.sidebar.selectbox(
+    "🏥 Structure",
+    options=list(structures),
+    format_func=structures.get,
+    key="structure_id"
+)
+set_structure_id(structure_id)
+
+with st.sidebar.expander("➕ Nouvelle structure"):
+    with st.form("form_nouvelle_structure", clear_on_submit=True):
+        nom_structure = st.text_input("Nom de la structure")
+        
+        if st.form_submit_button("Créer la structure"):
+            try:
+                st.session_state.structure_a_selectionner = create_structure(nom_structure)
+                st.rerun()
+            except ValueError as e:
+                st.error(str(e))
+
 st.sidebar.markdown('<div class="sidebar-nav">', unsafe_allow_html=True)
 
 # Options de navigation
@@ -200,6 +73,8 @@ pages = {
     "Gestion des associés": associes,
     "Répartition des revenus": repartition,
     "Gestion des charges": charges,
+    "Simulation de scénarios": simulation,
+    "Historique annuel": historique,
     "Paramètres": parametres
 }
 
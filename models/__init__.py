@@ -1,5 +1,6 @@
 # Ce fichier permet d'importer facilement les modèles
 from models.models import (
+    Structure, 
     Indicateur, 
     Associe, 
     Repartition, 
@@ -7,5 +8,11 @@ from models.models import (
     Charge, 
     Parametre, 
     Patientele, 
-    ProfessionnelSante
+    ProfessionnelSante, 
+    Exercice, 
+    ExerciceValeur, 
+    ResultatCalcul, 
+    ResultatIndicateur, 
+    ResultatAxe, 
+    ResultatAssocie
 )
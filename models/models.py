@@ -1,11 +1,25 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Date, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
-from utils.db_config import Base
+from utils.db_config import Base, StructureMixin
 import datetime
 
-class Indicateur(Base):
+class Structure(Base):
+    """Modèle pour les structures (SISA) gérées par l'application."""
+    __tablename__ = 'structures'
+    
+    id = Column(Integer, primary_key=True)
+    nom = Column(String(255), nullable=False, unique=True)
+    date_creation = Column(Date, default=datetime.datetime.now().date())
+    
+    def __repr__(self):
+        return f"<Structure(id={self.id}, nom='{self.nom}')>"
+
+class Indicateur(StructureMixin, Base):
     """Modèle pour les indicateurs ACI."""
     __tablename__ = 'indicateurs'
+    __table_args__ = (
+        Index('ix_indicateurs_structure_nom', 'structure_id', 'nom'),
+    )
     
     id = Column(Integer, primary_key=True)
     nom = Column(String(255), nullable=False)
@@ -14,6 +28,7 @@ class Indicateur(Base):
     points_fixes = Column(Integer, default=0)
     points_variables = Column(Integer, default=0)
     formule_calcul = Column(Text)  # Formule de calcul pour les points variables
+    code_formule = Column(String(50))  # Code de la formule appliquée (REGLES_FORMULES), None pour les seuls points fixes
     est_valide = Column(Boolean, default=False)
     prorata = Column(Float, default=1.0)  # Prorata à appliquer (entre 0 et 1)
     
@@ -24,7 +39,7 @@ class Indicateur(Base):
     def __repr__(self):
         return f"<Indicateur(id={self.id}, nom='{self.nom}', axe='{self.axe}', type='{self.type}')>"
 
-class Associe(Base):
+class Associe(StructureMixin, Base):
     """Modèle pour les associés de la SISA."""
     __tablename__ = 'associes'
     
@@ -41,9 +56,13 @@ class Associe(Base):
     def __repr__(self):
         return f"<Associe(id={self.id}, nom='{self.nom}', prenom='{self.prenom}', fonction='{self.fonction}')>"
 
-class Repartition(Base):
+class Repartition(StructureMixin, Base):
     """Modèle pour définir le mode de répartition d'un indicateur."""
     __tablename__ = 'repartitions'
+    __table_args__ = (
+        # Une seule répartition par indicateur
+        Index('uq_repartitions_structure_indicateur', 'structure_id', 'indicateur_id', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     indicateur_id = Column(Integer, ForeignKey('indicateurs.id'), nullable=False)
@@ -56,9 +75,14 @@ class Repartition(Base):
     def __repr__(self):
         return f"<Repartition(id={self.id}, indicateur_id={self.indicateur_id}, est_commun={self.est_commun})>"
 
-class Attribution(Base):
+class Attribution(StructureMixin, Base):
     """Modèle pour l'attribution des indicateurs aux associés."""
     __tablename__ = 'attributions'
+    __table_args__ = (
+        # Une seule attribution par couple (indicateur, associé)
+        Index('uq_attributions_structure_indicateur_associe', 'structure_id', 'indicateur_id', 'associe_id', unique=True),
+        Index('ix_attributions_associe', 'associe_id'),
+    )
     
     id = Column(Integer, primary_key=True)
     associe_id = Column(Integer, ForeignKey('associes.id'), nullable=False)
@@ -72,9 +96,13 @@ class Attribution(Base):
     def __repr__(self):
         return f"<Attribution(id={self.id}, associe_id={self.associe_id}, indicateur_id={self.indicateur_id}, pourcentage={self.pourcentage})>"
 
-class Charge(Base):
+class Charge(StructureMixin, Base):
     """Modèle pour les charges de la SISA."""
     __tablename__ = 'charges'
+    __table_args__ = (
+        Index('ix_charges_structure_categorie', 'structure_id', 'categorie'),
+        Index('ix_charges_structure_date_saisie', 'structure_id', 'date_saisie'),
+    )
     
     id = Column(Integer, primary_key=True)
     libelle = Column(String(255), nullable=False)
@@ -85,21 +113,27 @@ class Charge(Base):
     def __repr__(self):
         return f"<Charge(id={self.id}, libelle='{self.libelle}', montant={self.montant}, categorie='{self.categorie}')>"
 
-class Parametre(Base):
+class Parametre(StructureMixin, Base):
     """Modèle pour les paramètres système."""
     __tablename__ = 'parametres'
+    __table_args__ = (
+        UniqueConstraint('structure_id', 'cle', name='uq_parametres_structure_cle'),
+    )
     
     id = Column(Integer, primary_key=True)
-    cle = Column(String(100), nullable=False, unique=True)
+    cle = Column(String(100), nullable=False)
     valeur = Column(String(255), nullable=False)
     description = Column(Text)
     
     def __repr__(self):
         return f"<Parametre(id={self.id}, cle='{self.cle}', valeur='{self.valeur}')>"
 
-class Patientele(Base):
+class Patientele(StructureMixin, Base):
     """Modèle pour stocker les données de patientèle."""
     __tablename__ = 'patientele'
+    __table_args__ = (
+        Index('ix_patientele_structure_annee', 'structure_id', 'annee'),
+    )
     
     id = Column(Integer, primary_key=True)
     annee = Column(Integer, nullable=False)
@@ -109,7 +143,7 @@ class Patientele(Base):
     def __repr__(self):
         return f"<Patientele(id={self.id}, annee={self.annee}, nombre_patients={self.nombre_patients})>"
 
-class ProfessionnelSante(Base):
+class ProfessionnelSante(StructureMixin, Base):
     """Modèle pour les professionnels de santé de la structure."""
     __tablename__ = 'professionnels_sante'
     
@@ -123,3 +157,107 @@ class ProfessionnelSante(Base):
     
     def __repr__(self):
         return f"<ProfessionnelSante(id={self.id}, nom='{self.nom}', prenom='{self.prenom}', profession='{self.profession}')>"
+
+class Exercice(StructureMixin, Base):
+    """Modèle pour l'instantané d'une année clôturée et de ses résultats calculés."""
+    __tablename__ = 'exercices'
+    __table_args__ = (
+        UniqueConstraint('structure_id', 'annee', name='uq_exercices_structure_annee'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    annee = Column(Integer, nullable=False)
+    date_cloture = Column(Date, default=datetime.datetime.now().date())
+    patientele = Column(Integer)
+    nombre_ps = Column(Integer)
+    valeur_point = Column(Float)
+    total_points = Column(Float, default=0.0)
+    total_aci = Column(Float, default=0.0)
+    total_charges = Column(Float, default=0.0)
+    net_revenue = Column(Float, default=0.0)
+    
+    # Relations
+    valeurs = relationship("ExerciceValeur", back_populates="exercice", cascade="all, delete-orphan")
+    
+    def __repr__(self):
+        return f"<Exercice(id={self.id}, annee={self.annee}, total_aci={self.total_aci})>"
+
+class ExerciceValeur(StructureMixin, Base):
+    """Modèle pour une valeur d'instantané ayant changé par rapport à l'année précédente."""
+    __tablename__ = 'exercice_valeurs'
+    __table_args__ = (
+        Index('ix_exercice_valeurs_exercice_type', 'exercice_id', 'type'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    exercice_id = Column(Integer, ForeignKey('exercices.id'), nullable=False)
+    type = Column(String(50), nullable=False)  # 'indicateur', 'points', 'parametre', 'charges', 'axe', 'associe', 'nom_indicateur', 'nom_associe'
+    cle = Column(String(255), nullable=False)  # Id de l'indicateur ou de l'associé, nom pour les autres éléments
+    valeur = Column(String(255))  # Valeur vide : élément supprimé depuis l'année précédente
+    
+    # Relations
+    exercice = relationship("Exercice", back_populates="valeurs")
+    
+    def __repr__(self):
+        return f"<ExerciceValeur(exercice_id={self.exercice_id}, type='{self.type}', cle='{self.cle}', valeur='{self.valeur}')>"
+
+class ResultatCalcul(StructureMixin, Base):
+    """Modèle pour les totaux matérialisés du dernier calcul d'une structure."""
+    __tablename__ = 'resultats_calcul'
+    __table_args__ = (
+        UniqueConstraint('structure_id', name='uq_resultats_calcul_structure'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    empreinte = Column(String(64), nullable=False)  # Empreinte des données d'entrée du calcul
+    date_calcul = Column(Date, default=datetime.datetime.now().date())
+    total_points = Column(Float, default=0.0)
+    total_aci = Column(Float, default=0.0)
+    total_charges = Column(Float, default=0.0)
+    net_revenue = Column(Float, default=0.0)
+    
+    def __repr__(self):
+        return f"<ResultatCalcul(id={self.id}, empreinte='{self.empreinte[:8]}', total_aci={self.total_aci})>"
+
+class ResultatIndicateur(StructureMixin, Base):
+    """Modèle pour les points matérialisés de chaque indicateur."""
+    __tablename__ = 'resultats_indicateurs'
+    
+    id = Column(Integer, primary_key=True)
+    indicateur_id = Column(Integer, ForeignKey('indicateurs.id'), nullable=False)
+    points = Column(Float, default=0.0)
+    
+    def __repr__(self):
+        return f"<ResultatIndicateur(indicateur_id={self.indicateur_id}, points={self.points})>"
+
+class ResultatAxe(StructureMixin, Base):
+    """Modèle pour les totaux de points matérialisés de chaque axe."""
+    __tablename__ = 'resultats_axes'
+    
+    id = Column(Integer, primary_key=True)
+    rang = Column(Integer, nullable=False)  # Ordre d'affichage des axes
+    axe = Column(String(50), nullable=False)
+    total = Column(Float, default=0.0)  # Points potentiels
+    valide = Column(Float, default=0.0)  # Points validés
+    
+    def __repr__(self):
+        return f"<ResultatAxe(axe='{self.axe}', valide={self.valide}, total={self.total})>"
+
+class ResultatAssocie(StructureMixin, Base):
+    """Modèle pour les montants matérialisés revenant à chaque associé."""
+    __tablename__ = 'resultats_associes'
+    
+    id = Column(Integer, primary_key=True)
+    rang = Column(Integer, nullable=False)  # Ordre d'affichage des associés
+    associe_id = Column(Integer, ForeignKey('associes.id'), nullable=False)
+    nom = Column(String(255), nullable=False)
+    fonction = Column(String(100))
+    est_gerant = Column(Boolean, default=False)
+    coefficient = Column(Float, default=1.0)
+    part_fixe = Column(Float, default=0.0)
+    part_variable = Column(Float, default=0.0)
+    total = Column(Float, default=0.0)
+    pourcentage = Column(Float, default=0.0)
+    
+    def __repr__(self):
+        return f"<ResultatAssocie(associe_id={self.associe_id}, total={self.total})>"
@@ -1,46 +1,23 @@
 # Ce fichier permet d'importer facilement les pages de l'application
-from pages.dashboard import show as dashboard_show
-from pages.indicateurs import show as indicateurs_show
-from pages.associes import show as associes_show
-from pages.repartition import show as repartition_show
-from pages.charges import show as charges_show
-from pages.parametres import show as parametres_show
+# Le module d'une page n'est importé qu'à son premier affichage : le démarrage de
+# l'application ne paie que pour la page affichée.
+import importlib
 
-# Créer des classes simples pour chaque page
-class Dashboard:
-    @staticmethod
-    def show(*args, **kwargs):
-        dashboard_show()
+class Page:
+    """Page de l'application, dont le module est importé à la demande."""
 
-class Indicateurs:
-    @staticmethod
-    def show(*args, **kwargs):
-        indicateurs_show()
+    def __init__(self, module):
+        self.module = module
 
-class Associes:
-    @staticmethod
-    def show(*args, **kwargs):
-        associes_show()
+    def show(self, *args, **kwargs):
+        importlib.import_module(f"pages.{self.module}").show()
 
-class Repartition:
-    @staticmethod
-    def show(*args, **kwargs):
-        repartition_show()
-
-class Charges:
-    @staticmethod
-    def show(*args, **kwargs):
-        charges_show()
-
-class Parametres:
-    @staticmethod
-    def show(*args, **kwargs):
-        parametres_show()
-
-# Créer des instances de chaque classe
-dashboard = Dashboard()
-indicateurs = Indicateurs()
-associes = Associes()
-repartition = Repartition()
-charges = Charges()
-parametres = Parametres()
+# Créer une instance pour chaque page
+dashboard = Page("dashboard")
+indicateurs = Page("indicateurs")
+associes = Page("associes")
+repartition = Page("repartition")
+charges = Page("charges")
+parametres = Page("parametres")
+simulation = Page("simulation")
+historique = Page("historique")
@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
 from utils.helpers import format_currency
-from models import Associe
-from utils import get_session
+from utils.data_layer import get_associes
+from models import Associe, Attribution
+from utils import get_session, bump_data_version
 
 def show():
     """Affiche la page de gestion des associés."""
@@ -15,9 +16,7 @@ def show():
         st.subheader("Liste des associés")
         
         # Récupérer tous les associés
-        session = get_session()
-        associes = session.query(Associe).all()
-        session.close()
+        associes = get_associes()
         
         if not associes:
             st.info("Aucun associé n'a été ajouté. Utilisez le formulaire pour ajouter des associés.")
@@ -62,8 +61,11 @@ def show():
                             session = get_session()
                             associe = session.query(Associe).filter_by(id=associe_id).first()
                             if associe:
+                                # Supprimer d'abord ses attributions, qui référencent l'associé
+                                session.query(Attribution).filter(Attribution.associe_id == associe.id).delete(synchronize_session=False)
                                 session.delete(associe)
                                 session.commit()
+                                bump_data_version(("associes",))
                                 st.success(f"L'associé {associe.prenom} {associe.nom} a été supprimé avec succès.")
                                 st.rerun()
                             session.close()
@@ -110,6 +112,7 @@ def show():
                             associe.coefficient_majoration = coefficient
                             
                             session.commit()
+                            bump_data_version(("associes",))
                             st.success(f"L'associé {prenom} {nom} a été modifié avec succès.")
                             
                             # Réinitialiser le mode modification
@@ -157,6 +160,7 @@ def show():
                     session.add(nouvel_associe)
                     session.commit()
                     session.close()
+                    bump_data_version(("associes",))
                     
                     st.success(f"L'associé {prenom} {nom} a été ajouté avec succès.")
                     st.rerun()
@@ -1,10 +1,61 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import math
 from datetime import datetime
-from utils.helpers import format_currency, calculate_charges_total
+from utils.helpers import format_currency
+from utils.data_layer import (
+    get_charges_total,
+    get_charges_par_categorie,
+    get_charges_par_mois,
+    get_charges_par_annee,
+    get_page_charges,
+    get_nombre_charges,
+    get_categories_charges
+)
 from models import Charge
-from utils import get_session
+from utils import get_session, bump_data_version, get_structure_id
+from utils.charges import read_charges_file, import_charges, FiltresCharges, TAILLE_PAGE_CHARGES
+from utils.graphiques import graphique_memorise
+
+def _appliquer_style(fig):
+    """Applique le style commun des graphiques de la page."""
+    fig.update_layout(
+        font=dict(family="Lato, sans-serif"),
+        title_font=dict(size=20, color="#0596DE"),
+        legend_title_font=dict(size=14),
+        legend_font=dict(size=12),
+    )
+    return fig
+
+@graphique_memorise
+def create_charges_category_chart(charges_par_categorie):
+    """Crée le graphique en camembert des charges par catégorie."""
+    # Plotly n'est importé qu'au premier graphique, pour ne pas ralentir le démarrage
+    import plotly.express as px
+    
+    fig = px.pie(
+        names=list(charges_par_categorie.keys()),
+        values=list(charges_par_categorie.values()),
+        title="Répartition des charges par catégorie",
+        color_discrete_sequence=px.colors.sequential.Blues_r,
+        hole=0.4
+    )
+    return _appliquer_style(fig)
+
+@graphique_memorise
+def create_charges_period_chart(charges_par_periode, regroupement):
+    """Crée le graphique en barres des charges par mois ou par année."""
+    import plotly.express as px
+    
+    fig = px.bar(
+        x=list(charges_par_periode.keys()),
+        y=list(charges_par_periode.values()),
+        labels={"x": regroupement, "y": "Montant (€)"},
+        title=f"Charges par {regroupement.lower()}",
+        color_discrete_sequence=["#0596DE"]
+    )
+    fig.update_xaxes(type="category")
+    return _appliquer_style(fig)
 
 def show():
     """Affiche la page de gestion des charges."""
@@ -16,13 +67,8 @@ def show():
     with col1:
         st.subheader("Liste des charges")
         
-        # Récupérer toutes les charges
-        session = get_session()
-        charges = session.query(Charge).all()
-        session.close()
-        
         # Calculer le total des charges
-        total_charges = calculate_charges_total()
+        total_charges = get_charges_total()
         
         # Afficher le total des charges
         st.metric(
@@ -30,58 +76,115 @@ def show():
             value=format_currency(total_charges)
         )
         
-        if not charges:
+        # Nombre total de charges enregistrées
+        nombre_total, _ = get_nombre_charges(FiltresCharges())
+        
+        if nombre_total == 0:
             st.info("Aucune charge n'a été ajoutée. Utilisez le formulaire pour ajouter des charges.")
         else:
-            # Créer un DataFrame pour afficher les charges
-            df_charges = pd.DataFrame({
-                "ID": [c.id for c in charges],
-                "Libellé": [c.libelle for c in charges],
-                "Montant": [format_currency(c.montant) for c in charges],
-                "Catégorie": [c.categorie for c in charges],
-                "Date": [c.date_saisie.strftime("%d/%m/%Y") if c.date_saisie else "" for c in charges]
-            })
+            # Filtres appliqués par la base de données
+            with st.expander("Filtrer les charges"):
+                periode = st.date_input("Période", value=(), key="filtre_charges_periode")
+                categories_filtre = st.multiselect("Catégories", options=get_categories_charges(), key="filtre_charges_categories")
+                
+                col_min, col_max = st.columns(2)
+                with col_min:
+                    montant_min = st.number_input("Montant minimum (€)", min_value=0.0, value=0.0, step=10.0, key="filtre_charges_min")
+                with col_max:
+                    montant_max = st.number_input("Montant maximum (€, 0 = sans limite)", min_value=0.0, value=0.0, step=10.0, key="filtre_charges_max")
+                
+                recherche = st.text_input("Rechercher dans les libellés", key="filtre_charges_recherche")
+            
+            periode = tuple(periode) if isinstance(periode, (list, tuple)) else (periode,)
+            filtres = FiltresCharges(
+                date_debut=periode[0] if len(periode) > 0 else None,
+                date_fin=periode[1] if len(periode) > 1 else None,
+                categories=tuple(categories_filtre),
+                montant_min=montant_min or None,
+                montant_max=montant_max or None,
+                recherche=recherche.strip()
+            )
+            
+            # Début de chaque page déjà parcourue, réinitialisé lorsque la structure ou les filtres changent
+            structure_id = get_structure_id()
+            pagination = st.session_state.get("pagination_charges")
+            if pagination is None or pagination["structure_id"] != structure_id or pagination["filtres"] != filtres:
+                pagination = {"structure_id": structure_id, "filtres": filtres, "debuts": [None]}
+                st.session_state.pagination_charges = pagination
             
-            # Afficher le tableau
-            st.dataframe(df_charges, use_container_width=True)
+            nombre_filtre, total_filtre = get_nombre_charges(filtres)
+            nombre_pages = max(1, math.ceil(nombre_filtre / TAILLE_PAGE_CHARGES))
+            
+            # Des charges supprimées depuis le parcours peuvent réduire le nombre de pages :
+            # on revient alors à la dernière page existante, qui ne peut pas être vide
+            del pagination["debuts"][nombre_pages:]
+            
+            # Récupérer uniquement la page affichée
+            charges = get_page_charges(filtres, pagination["debuts"][-1])
+            
+            numero_page = len(pagination["debuts"])
+            st.caption(
+                f"{nombre_filtre} charges correspondantes ({format_currency(total_filtre)}) - "
+                f"page {numero_page} sur {nombre_pages}"
+            )
             
-            # Créer un graphique en camembert pour visualiser la répartition des charges par catégorie
-            if len(charges) > 0:
-                # Grouper les charges par catégorie
-                charges_par_categorie = {}
-                for charge in charges:
-                    categorie = charge.categorie or "Non catégorisé"
-                    if categorie not in charges_par_categorie:
-                        charges_par_categorie[categorie] = 0
-                    charges_par_categorie[categorie] += charge.montant
+            if charges:
+                # Créer un DataFrame pour afficher les charges
+                df_charges = pd.DataFrame({
+                    "ID": [c.id for c in charges],
+                    "Libellé": [c.libelle for c in charges],
+                    "Montant": [format_currency(c.montant) for c in charges],
+                    "Catégorie": [c.categorie for c in charges],
+                    "Date": [c.date_saisie.strftime("%d/%m/%Y") if c.date_saisie else "" for c in charges]
+                })
                 
-                # Créer le graphique
-                fig = px.pie(
-                    names=list(charges_par_categorie.keys()),
-                    values=list(charges_par_categorie.values()),
-                    title="Répartition des charges par catégorie",
-                    color_discrete_sequence=px.colors.sequential.Blues_r,
-                    hole=0.4
+                # Afficher le tableau
+                st.dataframe(df_charges, use_container_width=True)
+            else:
+                st.info("Aucune charge ne correspond aux filtres sélectionnés.")
+            
+            # Navigation entre les pages
+            col_precedente, col_suivante = st.columns(2)
+            
+            with col_precedente:
+                if st.button("Page précédente", key="btn_page_precedente", disabled=numero_page == 1):
+                    pagination["debuts"].pop()
+                    st.rerun()
+            
+            with col_suivante:
+                if st.button("Page suivante", key="btn_page_suivante", disabled=numero_page >= nombre_pages):
+                    pagination["debuts"].append(charges[-1].id)
+                    st.rerun()
+            
+            # Visualiser la répartition des charges (totaux calculés par la base de données)
+            if nombre_total > 0:
+                regroupement = st.radio(
+                    "Regrouper les charges par",
+                    options=["Catégorie", "Mois", "Année"],
+                    horizontal=True,
+                    key="regroupement_charges"
                 )
                 
-                fig.update_layout(
-                    font=dict(family="Lato, sans-serif"),
-                    title_font=dict(size=20, color="#0596DE"),
-                    legend_title_font=dict(size=14),
-                    legend_font=dict(size=12),
-                )
+                if regroupement == "Catégorie":
+                    charges_par_categorie = get_charges_par_categorie()
+                    
+                    fig = create_charges_category_chart(charges_par_categorie)
+                else:
+                    charges_par_periode = get_charges_par_mois() if regroupement == "Mois" else get_charges_par_annee()
+                    fig = create_charges_period_chart(charges_par_periode, regroupement)
                 
                 st.plotly_chart(fig, use_container_width=True)
             
-            # Sélection d'une charge pour modification ou suppression
+            # Sélection d'une charge de la page pour modification ou suppression
+            charges_par_id = {c.id: c for c in charges}
             charge_id = st.selectbox(
                 "Sélectionner une charge à modifier ou supprimer",
-                options=[c.id for c in charges],
-                format_func=lambda x: f"{next((c.libelle for c in charges if c.id == x), '')} - {format_currency(next((c.montant for c in charges if c.id == x), 0))}"
+                options=list(charges_par_id),
+                format_func=lambda x: f"{charges_par_id[x].libelle} - {format_currency(charges_par_id[x].montant)}"
             )
             
             # Récupérer la charge sélectionnée
-            charge_selectionnee = next((c for c in charges if c.id == charge_id), None)
+            charge_selectionnee = charges_par_id.get(charge_id)
             
             if charge_selectionnee:
                 # Boutons pour modifier ou supprimer
@@ -102,6 +205,7 @@ def show():
                             if charge:
                                 session.delete(charge)
                                 session.commit()
+                                bump_data_version(("charges",))
                                 st.success(f"La charge '{charge.libelle}' a été supprimée avec succès.")
                                 st.rerun()
                             session.close()
@@ -168,6 +272,7 @@ def show():
                             charge.date_saisie = date_saisie
                             
                             session.commit()
+                            bump_data_version(("charges",))
                             st.success(f"La charge '{libelle}' a été modifiée avec succès.")
                             
                             # Réinitialiser le mode modification
@@ -226,35 +331,48 @@ def show():
                     session.add(nouvelle_charge)
                     session.commit()
                     session.close()
+                    bump_data_version(("charges",))
                     
                     st.success(f"La charge '{libelle}' a été ajoutée avec succès.")
                     st.rerun()
                 else:
                     st.error("Veuillez remplir le libellé et saisir un montant supérieur à 0.")
         
-        # Ajouter un formulaire pour l'import de charges depuis un fichier CSV
+        # Ajouter un formulaire pour l'import de charges depuis un fichier CSV ou Excel
         st.markdown("---")
         st.subheader("Import de charges")
         
+        # Bilan du dernier import, conservé après le rechargement de la page
+        resultat_import = st.session_state.pop("resultat_import_charges", None)
+        if resultat_import:
+            st.success(
+                f"{resultat_import.nb_importees} charges ont été importées avec succès "
+                f"({resultat_import.debit:.0f} lignes/s)."
+            )
+            if resultat_import.nb_rejetees:
+                st.warning(f"{resultat_import.nb_rejetees} lignes ont été ignorées :")
+                st.dataframe(resultat_import.rejets.rename(columns={"ligne": "Ligne", "motif": "Motif"}), use_container_width=True)
+        
         st.info("""
-        Vous pouvez importer des charges depuis un fichier CSV.
+        Vous pouvez importer des charges depuis un fichier CSV ou Excel (.xlsx).
         Le fichier doit contenir les colonnes suivantes :
         - libelle
-        - montant
+        - montant (virgule décimale, par exemple 1234,56 ; un montant ambigu comme 1.234 est ignoré)
         - categorie (optionnel)
         - date_saisie (optionnel, format JJ/MM/AAAA)
         """)
         
-        uploaded_file = st.file_uploader("Choisir un fichier CSV", type="csv")
+        uploaded_file = st.file_uploader("Choisir un fichier CSV ou Excel", type=["csv", "xlsx"])
         
         if uploaded_file is not None:
             try:
-                # Lire le fichier CSV
-                df = pd.read_csv(uploaded_file, sep=",")
+                # Lire le fichier CSV ou Excel
+                df = read_charges_file(uploaded_file, uploaded_file.name)
+                colonnes = [str(c).strip().lower() for c in df.columns]
                 
                 # Vérifier que les colonnes obligatoires sont présentes
-                if "libelle" not in df.columns or "montant" not in df.columns:
-                    st.error("Le fichier CSV doit contenir au moins les colonnes 'libelle' et 'montant'.")
+                if "libelle" not in colonnes or "montant" not in colonnes:
+                    st.error("Le fichier doit contenir au moins les colonnes 'libelle' et 'montant'.")
                 else:
                     # Afficher un aperçu du fichier
                     st.write("Aperçu du fichier :")
@@ -262,24 +380,12 @@ def show():
                     
                     # Bouton pour confirmer l'import
                     if st.button("Importer les charges"):
-                        session = get_session()
-                        
-                        # Parcourir les lignes du DataFrame
-                        for _, row in df.iterrows():
-                            # Créer une nouvelle charge
-                            nouvelle_charge = Charge(
-                                libelle=row["libelle"],
-                                montant=float(row["montant"]),
-                                categorie=row["categorie"] if "categorie" in df.columns and pd.notna(row["categorie"]) else "Autres",
-                                date_saisie=datetime.strptime(row["date_saisie"], "%d/%m/%Y").date() if "date_saisie" in df.columns and pd.notna(row["date_saisie"]) else datetime.now().date()
-                            )
-                            
-                            session.add(nouvelle_charge)
-                        
-                        session.commit()
-                        session.close()
+                        # Import par lots en une seule transaction, les lignes invalides sont écartées
+                        resultat = import_charges(df)
+                        if resultat.nb_importees:
+                            bump_data_version(("charges",))
                         
-                        st.success(f"{len(df)} charges ont été importées avec succès.")
+                        st.session_state.resultat_import_charges = resultat
                         st.rerun()
             
             except Exception as e:
@@ -0,0 +1,173 @@
+import streamlit as st
+import pandas as pd
+from utils.helpers import format_currency
+from utils.data_layer import get_historique, get_comparaison_annees
+from utils.param_store import parametres_store
+from utils.historique import snapshot_year, TYPES_INSTANTANE, TYPES_NUMERIQUES
+from utils.graphiques import graphique_memorise
+
+@graphique_memorise
+def create_history_chart(historique):
+    """Crée le graphique en barres des revenus et charges de chaque année clôturée."""
+    # Plotly n'est importé qu'au premier graphique, pour ne pas ralentir le démarrage
+    import plotly.express as px
+    
+    donnees_graphique = historique.melt(
+        id_vars="annee",
+        value_vars=["total_aci", "total_charges", "net_revenue"],
+        var_name="Montant",
+        value_name="Euros"
+    )
+    donnees_graphique["Montant"] = donnees_graphique["Montant"].map({
+        "total_aci": "Revenu ACI",
+        "total_charges": "Charges",
+        "net_revenue": "Revenu net"
+    })
+    
+    fig = px.bar(
+        donnees_graphique,
+        x="annee",
+        y="Euros",
+        color="Montant",
+        barmode="group",
+        labels={"annee": "Année"},
+        title="Revenus et charges par année",
+        color_discrete_sequence=["#0596DE", "#F39C12", "#2ECC71"]
+    )
+    
+    fig.update_layout(
+        font=dict(family="Lato, sans-serif"),
+        title_font=dict(size=20, color="#0596DE"),
+        xaxis=dict(type="category")
+    )
+    return fig
+
+def format_evolution(valeur):
+    """Formate une évolution annuelle en pourcentage."""
+    if pd.isna(valeur):
+        return "-"
+    return f"{valeur:+.1f} %"
+
+def show():
+    """Affiche la page d'historique et de comparaison des années."""
+    st.title("Historique annuel")
+    
+    st.markdown("""
+    Clôturez chaque année pour conserver l'état des indicateurs, des paramètres, des charges
+    et des résultats calculés. Les années clôturées restent consultables et comparables,
+    même après la validation des indicateurs de l'année suivante.
+    """)
+    
+    # Clôture de l'année en cours
+    historique = get_historique()
+    annees_cloturees = historique["annee"].tolist()
+    
+    with st.form("form_cloture"):
+        annee = st.number_input(
+            "Année à clôturer",
+            min_value=2000,
+            max_value=2100,
+            value=int(parametres_store.get("annee_en_cours")),
+            step=1
+        )
+        st.caption("Clôturer une année déjà enregistrée remplace son instantané par l'état actuel.")
+        
+        if st.form_submit_button("Clôturer l'exercice"):
+            snapshot_year(int(annee))
+            st.success(f"L'exercice {int(annee)} a été clôturé avec succès !")
+            historique = get_historique()
+            annees_cloturees = historique["annee"].tolist()
+    
+    if historique.empty:
+        st.info("Aucune année n'a encore été clôturée.")
+        return
+    
+    # Évolution de la dernière année clôturée
+    st.subheader("Évolution annuelle")
+    
+    derniere = historique.iloc[-1]
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric(
+            label=f"Revenu ACI {derniere['annee']}",
+            value=format_currency(derniere["total_aci"]),
+            delta=format_evolution(derniere["evolution_total_aci"]) if len(historique) > 1 else None
+        )
+    with col2:
+        st.metric(
+            label=f"Revenu net {derniere['annee']}",
+            value=format_currency(derniere["net_revenue"]),
+            delta=format_evolution(derniere["evolution_net_revenue"]) if len(historique) > 1 else None
+        )
+    with col3:
+        st.metric(
+            label=f"Points validés {derniere['annee']}",
+            value=f"{int(derniere['total_points'])} pts",
+            delta=format_evolution(derniere["evolution_total_points"]) if len(historique) > 1 else None
+        )
+    
+    st.plotly_chart(create_history_chart(historique), use_container_width=True)
+    
+    st.dataframe(
+        pd.DataFrame({
+            "Année": historique["annee"],
+            "Clôturée le": historique["date_cloture"],
+            "Patientèle": historique["patientele"],
+            "Nombre de PS": historique["nombre_ps"],
+            "Valeur du point (€)": historique["valeur_point"],
+            "Points validés": historique["total_points"],
+            "Revenu ACI": historique["total_aci"].map(format_currency),
+            "Évolution ACI": historique["evolution_total_aci"].map(format_evolution),
+            "Charges": historique["total_charges"].map(format_currency),
+            "Revenu net": historique["net_revenue"].map(format_currency),
+            "Évolution revenu net": historique["evolution_net_revenue"].map(format_evolution)
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    # Comparaison détaillée de deux années
+    st.subheader("Comparaison de deux années")
+    
+    if len(annees_cloturees) < 2:
+        st.info("Clôturez au moins deux années pour les comparer.")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        annee_a = st.selectbox("Année de référence", options=annees_cloturees, index=len(annees_cloturees) - 2)
+    with col2:
+        annee_b = st.selectbox("Année comparée", options=annees_cloturees, index=len(annees_cloturees) - 1)
+    with col3:
+        differences_seules = st.checkbox("Uniquement les différences", value=True)
+
+    if annee_a == annee_b:
+        st.info("Choisissez deux années différentes.")
+        return
+
+    comparaison = get_comparaison_annees(annee_a, annee_b)
+    if differences_seules:
+        comparaison = comparaison[comparaison["modifie"]]
+    
+    onglets = st.tabs(list(TYPES_INSTANTANE.values()))
+    for onglet, type_ in zip(onglets, TYPES_INSTANTANE):
+        with onglet:
+            lignes = comparaison[comparaison["type"] == type_]
+            if lignes.empty:
+                st.info("Aucune différence entre ces deux années.")
+                continue
+            
+            tableau = pd.DataFrame({
+                "Élément": lignes["element"],
+                str(annee_a): lignes["valeur_a"],
+                str(annee_b): lignes["valeur_b"]
+            })
+            if type_ in TYPES_NUMERIQUES:
+                tableau["Écart"] = lignes["ecart"]
+            elif type_ == "indicateur":
+                tableau[str(annee_a)] = lignes["valeur_a"].map({True: "✅ Validé", False: "❌ Non validé"})
+                tableau[str(annee_b)] = lignes["valeur_b"].map({True: "✅ Validé", False: "❌ Non validé"})
+            
+            st.dataframe(tableau, use_container_width=True, hide_index=True)
@@ -2,13 +2,13 @@ import streamlit as st
 import pandas as pd
 import re
 from utils.helpers import (
-    calculate_indicator_points,
     format_currency,
-    get_parameter_value,
-    set_parameter_value
+    set_parameter_value,
+    save_indicator_validations
 )
-from models import Indicateur
-from utils import get_session
+from utils.kpi import build_axes_table
+from utils.data_layer import get_indicateurs, get_parametres_calcul, get_points_indicateurs, get_kpi_snapshot
+from utils import get_structure_id
 
 def show():
     """Affiche la page de gestion des indicateurs."""
@@ -101,10 +101,11 @@ def show():
         """)
     
     # Récupérer les paramètres nécessaires
-    valeur_point = float(get_parameter_value("valeur_point") or 7)
-    patientele = int(get_parameter_value("patientele") or 4000)
-    nombre_ps = int(get_parameter_value("nombre_ps") or 10)
-    taux_dossiers = float(get_parameter_value("taux_dossiers") or 5)
+    parametres = get_parametres_calcul()
+    valeur_point = parametres.valeur_point
+    patientele = parametres.patientele
+    nombre_ps = parametres.nombre_ps
+    taux_dossiers = parametres.taux_dossiers_pourcentage
     
     # Formulaire pour mettre à jour les paramètres
     with st.expander("⚙️ Paramètres de calcul", expanded=False):
@@ -159,12 +160,30 @@ def show():
     tab_icons = ["🏥", "👥", "💻"]
     tab_names = ["Accès aux soins", "Travail en équipe & coordination", "Système d'information"]
     
+    # Barre d'enregistrement des validations en attente, remplie après l'affichage des onglets
+    barre_modifications = st.container()
+    
     tabs = st.tabs([f"{icon} {name}" for icon, name in zip(tab_icons, tab_names)])
     
-    # Récupérer tous les indicateurs
-    session = get_session()
-    indicateurs = session.query(Indicateur).all()
-    session.close()
+    # Les changements de validation sont mis en attente puis enregistrés en une seule fois,
+    # séparément pour chaque structure afin de ne jamais enregistrer ceux d'une autre ; les
+    # clés des cases à cocher et des menus déroulants sont elles aussi propres à la structure
+    structure_id = get_structure_id()
+    modifications = st.session_state.setdefault("validations_en_attente", {}).setdefault(structure_id, {})
+    prefixe_cles = f"validation_{structure_id}_"
+    
+    def est_valide_affiche(indicateur):
+        return modifications.get(indicateur.id, indicateur.est_valide)
+    
+    def mettre_en_attente(indicateur, est_valide):
+        if est_valide == indicateur.est_valide:
+            modifications.pop(indicateur.id, None)
+        else:
+            modifications[indicateur.id] = est_valide
+    
+    # Récupérer tous les indicateurs et calculer leurs points en une passe
+    indicateurs = get_indicateurs()
+    points_indicateurs = get_points_indicateurs()
     
     # Grouper les indicateurs par axe
     indicateurs_par_axe = {
@@ -199,17 +218,13 @@ def show():
             with col1:
                 est_valide = st.checkbox(
                     f"{indicateur.nom}",
-                    value=indicateur.est_valide,
-                    key=f"check_{indicateur.id}"
+                    value=est_valide_affiche(indicateur),
+                    key=f"{prefixe_cles}check_{indicateur.id}"
                 )
                 
-                if est_valide != indicateur.est_valide:
-                    session = get_session()
-                    indic = session.query(Indicateur).filter_by(id=indicateur.id).first()
-                    indic.est_valide = est_valide
-                    session.commit()
-                    session.close()
-                    st.rerun()
+                mettre_en_attente(indicateur, est_valide)
+                if indicateur.id in modifications:
+                    st.caption("⏳ Modification en attente d'enregistrement")
             
             with col2:
                 col_pts1, col_pts2, col_pts3 = st.columns(3)
@@ -222,13 +237,8 @@ def show():
                     st.write(f"📊 **Variable**: {points_variables}")
                 
                 with col_pts3:
-                    # Calculer les points totaux pour cet indicateur
-                    points_totaux = calculate_indicator_points(
-                        indicateur.id,
-                        patientele=patientele,
-                        nombre_ps=nombre_ps,
-                        taux_dossiers=taux_dossiers/100  # Convertir en pourcentage
-                    )
+                    # Points totaux pour cet indicateur
+                    points_totaux = points_indicateurs[indicateur.id]
                     
                     montant = points_totaux * valeur_point if indicateur.est_valide else 0
                     st.write(f"💰 **{format_currency(montant)}**")
@@ -278,15 +288,13 @@ def show():
             # Déterminer l'option sélectionnée par défaut
             option_defaut = 0
             for i, ind in enumerate(indicateurs_groupe):
-                if ind.est_valide:
+                if est_valide_affiche(ind):
                     option_defaut = i+1
                     break
             
             # Afficher le menu déroulant ou les cases à cocher
             if len(indicateurs_groupe) <= 3 and all(ind.type == "socle" for ind in indicateurs_groupe):
                 # Utiliser des cases à cocher pour les indicateurs socle qui vont ensemble
-                selected_ids = []
-                
                 for ind in indicateurs_groupe:
                     icon = "🔒"
                     if " - Variable " in ind.nom:
@@ -307,51 +315,28 @@ def show():
                     
                     est_valide = st.checkbox(
                         label,
-                        value=ind.est_valide,
-                        key=f"check_{ind.id}"
+                        value=est_valide_affiche(ind),
+                        key=f"{prefixe_cles}check_{ind.id}"
                     )
                     
-                    if est_valide != ind.est_valide:
-                        session = get_session()
-                        indic = session.query(Indicateur).filter_by(id=ind.id).first()
-                        indic.est_valide = est_valide
-                        session.commit()
-                        session.close()
-                        selected_ids.append(ind.id)
-                
-                if selected_ids:
-                    st.rerun()
+                    mettre_en_attente(ind, est_valide)
             else:
                 # Utiliser un menu déroulant pour les indicateurs s'excluant mutuellement
                 selected_option = st.selectbox(
                     "Niveau validé",
                     options=options,
                     index=option_defaut,
-                    key=f"select_{nom_groupe}"
+                    key=f"{prefixe_cles}select_{nom_groupe}"
                 )
                 
-                # Mettre à jour la base de données
+                # Mettre en attente le niveau choisi (seul le niveau sélectionné est validé)
                 selected_id = id_map[options.index(selected_option)]
                 
-                if selected_id:
-                    # Vérifier si le statut a changé
-                    changed = False
-                    session = get_session()
-                    
-                    for ind in indicateurs_groupe:
-                        indic = session.query(Indicateur).filter_by(id=ind.id).first()
-                        if ind.id == selected_id and not indic.est_valide:
-                            indic.est_valide = True
-                            changed = True
-                        elif ind.id != selected_id and indic.est_valide:
-                            indic.est_valide = False
-                            changed = True
-                    
-                    if changed:
-                        session.commit()
-                        st.rerun()
-                    
-                    session.close()
+                for ind in indicateurs_groupe:
+                    mettre_en_attente(ind, ind.id == selected_id if selected_id else ind.est_valide)
+            
+            if any(ind.id in modifications for ind in indicateurs_groupe):
+                st.caption("⏳ Modification en attente d'enregistrement")
             
             # Afficher les détails des indicateurs validés
             for ind in indicateurs_groupe:
@@ -364,13 +349,8 @@ def show():
                         st.write(f"**🔢 Points**: {points_fixes} fixes + {points_variables} variables")
                     
                     with col2:
-                        # Calculer les points totaux
-                        points_totaux = calculate_indicator_points(
-                            ind.id,
-                            patientele=patientele,
-                            nombre_ps=nombre_ps,
-                            taux_dossiers=taux_dossiers/100
-                        )
+                        # Points totaux
+                        points_totaux = points_indicateurs[ind.id]
                         st.write(f"**📊 Total**: {points_totaux:.1f} pts")
                     
                     with col3:
@@ -417,60 +397,39 @@ def show():
                         # Indicateur unique
                         afficher_indicateur_simple(indicateurs_groupe[0], i)
     
-    # Afficher un résumé des points
-    st.write("## 📊 Résumé des points validés")
-    
-    # Calculer les points totaux par axe
-    points_par_axe = {}
-    for axe in indicateurs_par_axe:
-        points_par_axe[axe] = {
-            "total": 0,
-            "valide": 0
-        }
-        
-        for indicateur in indicateurs_par_axe[axe]:
-            points = calculate_indicator_points(
-                indicateur.id,
-                patientele=patientele,
-                nombre_ps=nombre_ps,
-                taux_dossiers=taux_dossiers/100
-            )
+    # Enregistrer ou annuler les validations en attente
+    if modifications:
+        with barre_modifications:
+            st.info(f"⏳ {len(modifications)} modification(s) de validation en attente d'enregistrement.")
+            col_enregistrer, col_annuler = st.columns(2)
             
-            if indicateur.est_valide:
-                points_par_axe[axe]["valide"] += points
+            with col_enregistrer:
+                if st.button("💾 Enregistrer les modifications", key="btn_enregistrer_validations"):
+                    # Une seule transaction pour toutes les modifications, puis un seul rechargement
+                    nombre = save_indicator_validations(modifications)
+                    modifications.clear()
+                    st.session_state.message_validations = f"✅ {nombre} indicateur(s) mis à jour avec succès !"
+                    st.rerun()
             
-            points_par_axe[axe]["total"] += (indicateur.points_fixes + indicateur.points_variables) * indicateur.prorata
+            with col_annuler:
+                if st.button("↩️ Annuler les modifications", key="btn_annuler_validations"):
+                    # Revenir à l'état enregistré des cases à cocher et des menus déroulants de la structure
+                    for cle in list(st.session_state.keys()):
+                        if cle.startswith(prefixe_cles):
+                            del st.session_state[cle]
+                    modifications.clear()
+                    st.rerun()
     
-    # Créer un DataFrame pour afficher les données
-    df_resume = pd.DataFrame({
-        "Axe": list(points_par_axe.keys()),
-        "Points validés": [axe["valide"] for axe in points_par_axe.values()],
-        "Points potentiels": [axe["total"] for axe in points_par_axe.values()],
-        "Taux de validation": [
-            f"{axe['valide'] / axe['total'] * 100:.1f}%" if axe['total'] > 0 else "0%" 
-            for axe in points_par_axe.values()
-        ],
-        "Montant (€)": [
-            format_currency(axe["valide"] * valeur_point) 
-            for axe in points_par_axe.values()
-        ]
-    })
+    message_validations = st.session_state.pop("message_validations", None)
+    if message_validations:
+        with barre_modifications:
+            st.success(message_validations)
     
-    # Ajouter une ligne de total
-    total_row = pd.DataFrame({
-        "Axe": ["Total"],
-        "Points validés": [sum(axe["valide"] for axe in points_par_axe.values())],
-        "Points potentiels": [sum(axe["total"] for axe in points_par_axe.values())],
-        "Taux de validation": [
-            f"{sum(axe['valide'] for axe in points_par_axe.values()) / sum(axe['total'] for axe in points_par_axe.values()) * 100:.1f}%" 
-            if sum(axe['total'] for axe in points_par_axe.values()) > 0 else "0%"
-        ],
-        "Montant (€)": [
-            format_currency(sum(axe["valide"] for axe in points_par_axe.values()) * valeur_point)
-        ]
-    })
+    # Afficher un résumé des points
+    st.write("## 📊 Résumé des points validés")
     
-    df_resume = pd.concat([df_resume, total_row], ignore_index=True)
+    # Points par axe et ligne de total, lus dans l'instantané des indicateurs clés
+    df_resume = build_axes_table(get_kpi_snapshot())
     
     # Afficher le tableau
     st.dataframe(df_resume, use_container_width=True)
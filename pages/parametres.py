@@ -1,11 +1,16 @@
 import streamlit as st
 import pandas as pd
 import os
-import sqlite3
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
 from datetime import datetime
-from utils.helpers import get_parameter_value, set_parameter_value
-from models import Parametre, Indicateur
-from utils import get_session, init_db, initialize_all_data
+from utils.helpers import get_parameter, set_parameter_value
+from utils.param_store import parametres_store
+from models import Indicateur, Associe, Repartition, Attribution, Charge, Parametre, Patientele, ProfessionnelSante
+from utils import get_session, init_db, initialize_all_data, bump_data_version, checkpoint_db, delete_db_files
+from utils import db_config
+from utils.data_layer import get_indicateurs
+from utils.formules import registre_formules
 
 def show():
     """Affiche la page des paramètres de l'application."""
@@ -22,21 +27,13 @@ def show():
     with tab1:
         st.subheader("Paramètres généraux")
         
-        # Récupérer les paramètres existants
-        session = get_session()
-        parametres = session.query(Parametre).all()
-        session.close()
-        
-        # Créer un dictionnaire des paramètres
-        params_dict = {p.cle: p.valeur for p in parametres}
-        
         # Formulaire pour les paramètres généraux
         with st.form("form_parametres_generaux"):
             # Valeur du point
             valeur_point = st.number_input(
                 "Valeur du point (€)",
                 min_value=0.0,
-                value=float(params_dict.get("valeur_point", 7)),
+                value=get_parameter("valeur_point"),
                 step=0.1,
                 help="Valeur d'un point en euros (actuellement 7€)"
             )
@@ -46,7 +43,7 @@ def show():
                 "Année en cours",
                 min_value=2020,
                 max_value=2030,
-                value=int(params_dict.get("annee_en_cours", datetime.now().year)),
+                value=get_parameter("annee_en_cours", datetime.now().year),
                 step=1,
                 help="Année en cours pour les calculs"
             )
@@ -54,7 +51,7 @@ def show():
             # Version de l'avenant
             version_avenant = st.text_input(
                 "Version de l'avenant",
-                value=params_dict.get("version_avenant", "Avenant 1 - Octobre 2022"),
+                value=get_parameter("version_avenant"),
                 help="Version de l'avenant en vigueur"
             )
             
@@ -62,7 +59,7 @@ def show():
             patientele = st.number_input(
                 "Patientèle",
                 min_value=0,
-                value=int(params_dict.get("patientele", 4000)),
+                value=get_parameter("patientele"),
                 step=100,
                 help="Nombre de patients de la structure"
             )
@@ -71,7 +68,7 @@ def show():
             nombre_ps = st.number_input(
                 "Nombre de professionnels de santé",
                 min_value=1,
-                value=int(params_dict.get("nombre_ps", 10)),
+                value=get_parameter("nombre_ps"),
                 step=1,
                 help="Nombre de professionnels de santé dans la structure"
             )
@@ -81,7 +78,7 @@ def show():
                 "Taux de dossiers pour la concertation (%)",
                 min_value=0.0,
                 max_value=100.0,
-                value=float(params_dict.get("taux_dossiers", 5)),
+                value=get_parameter("taux_dossiers"),
                 step=0.5,
                 help="Pourcentage de dossiers pour la concertation pluri-professionnelle"
             )
@@ -104,38 +101,35 @@ def show():
         st.subheader("Gestion des données")
         
         # Chemin vers le fichier de base de données
-        db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'aci_app.db')
+        db_path = db_config.DB_PATH
         
         # Afficher des informations sur la base de données
         if os.path.exists(db_path):
             # Taille de la base de données
             db_size = os.path.getsize(db_path) / (1024 * 1024)  # Convertir en Mo
             
-            # Nombre d'enregistrements dans chaque table
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            
-            tables = [
-                "indicateurs", 
-                "associes", 
-                "repartitions", 
-                "attributions", 
-                "charges", 
-                "parametres",
-                "patientele",
-                "professionnels_sante"
+            # Nombre d'enregistrements de la structure courante dans chaque table : les requêtes
+            # passent par l'ORM pour que le filtre par structure s'applique
+            modeles = [
+                Indicateur, 
+                Associe, 
+                Repartition, 
+                Attribution, 
+                Charge, 
+                Parametre,
+                Patientele,
+                ProfessionnelSante
             ]
             
             table_counts = {}
-            for table in tables:
+            session = get_session()
+            for modele in modeles:
                 try:
-                    cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                    count = cursor.fetchone()[0]
-                    table_counts[table] = count
-                except sqlite3.OperationalError:
-                    table_counts[table] = "Table inexistante"
-            
-            conn.close()
+                    table_counts[modele.__tablename__] = session.query(func.count(modele.id)).scalar()
+                except OperationalError:
+                    session.rollback()
+                    table_counts[modele.__tablename__] = "Table inexistante"
+            session.close()
             
             # Afficher les informations
             st.info(f"Taille de la base de données : {db_size:.2f} Mo")
@@ -161,12 +155,13 @@ def show():
             if st.button("Réinitialiser la base de données"):
                 # Demander confirmation
                 if st.checkbox("Je confirme vouloir réinitialiser la base de données. Cette action est irréversible.", key="confirm_reset_db"):
-                    # Supprimer la base de données existante
-                    if os.path.exists(db_path):
-                        os.remove(db_path)
+                    # Supprimer la base de données existante et ses journaux
+                    delete_db_files()
                     
                     # Recréer la base de données
                     initialize_all_data()
+                    parametres_store.invalider()
+                    bump_data_version()
                     
                     st.success("Base de données réinitialisée avec succès !")
                     st.rerun()
@@ -175,6 +170,9 @@ def show():
             # Exporter la base de données
             if st.button("Exporter la base de données"):
                 if os.path.exists(db_path):
+                    # Reporter le journal WAL dans le fichier avant de le lire
+                    checkpoint_db()
+                    
                     # Lire le contenu du fichier
                     with open(db_path, "rb") as f:
                         db_content = f.read()
@@ -197,10 +195,20 @@ def show():
         if uploaded_file is not None:
             # Demander confirmation
             if st.checkbox("Je confirme vouloir remplacer la base de données actuelle. Cette action est irréversible.", key="confirm_import_db"):
+                # Fermer les connexions et supprimer les journaux WAL de l'ancienne base
+                delete_db_files()
+                
                 # Sauvegarder le fichier importé
                 with open(db_path, "wb") as f:
                     f.write(uploaded_file.getbuffer())
                 
+                # Mettre à jour le schéma de la base importée (tables manquantes et migrations)
+                init_db()
+                
+                # Les paramètres en mémoire ne correspondent plus à la base importée
+                parametres_store.invalider()
+                bump_data_version()
+                
                 st.success("Base de données importée avec succès !")
                 st.rerun()
     
@@ -208,9 +216,15 @@ def show():
         st.subheader("Paramètres des indicateurs")
         
         # Récupérer tous les indicateurs
-        session = get_session()
-        indicateurs = session.query(Indicateur).all()
-        session.close()
+        indicateurs = get_indicateurs()
+        
+        # Signaler les indicateurs à points variables sans formule de calcul associée
+        sans_formule = registre_formules.indicateurs_sans_formule(indicateurs)
+        if sans_formule:
+            st.warning(
+                "Aucune formule de calcul n'est associée aux indicateurs suivants, "
+                "seuls leurs points fixes sont comptabilisés : " + ", ".join(i.nom for i in sans_formule)
+            )
         
         # Grouper les indicateurs par axe
         indicateurs_par_axe = {}
@@ -254,6 +268,16 @@ def show():
                             key=f"formule_{indicateur.id}"
                         )
                         
+                        # Formule appliquée aux points variables, indépendante du nom de l'indicateur
+                        codes_formules = [None, *registre_formules.codes]
+                        code_formule = st.selectbox(
+                            "Formule appliquée",
+                            options=codes_formules,
+                            index=codes_formules.index(indicateur.code_formule) if indicateur.code_formule in codes_formules else 0,
+                            format_func=lambda code: code or "Points fixes uniquement",
+                            key=f"code_formule_{indicateur.id}"
+                        )
+                        
                         prorata = st.slider(
                             "Prorata",
                             min_value=0.0,
@@ -275,9 +299,11 @@ def show():
                                 indic.points_fixes = points_fixes
                                 indic.points_variables = points_variables
                                 indic.formule_calcul = formule_calcul
+                                indic.code_formule = code_formule
                                 indic.prorata = prorata
                                 
                                 session.commit()
+                                bump_data_version(("indicateur", indicateur.id))
                                 st.success(f"Indicateur '{indicateur.nom}' mis à jour avec succès !")
                             
                             session.close()
@@ -310,5 +336,5 @@ def show():
         """)
         
         # Afficher les informations sur la version de l'avenant
-        version_avenant = get_parameter_value("version_avenant") or "Avenant 1 - Octobre 2022"
+        version_avenant = get_parameter("version_avenant")
         st.info(f"Version de l'avenant en vigueur : {version_avenant}")
@@ -1,47 +1,104 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from utils.helpers import (
-    format_currency,
-    calculate_total_aci_revenue,
-    calculate_charges_total,
-    calculate_net_revenue,
-    get_associes_repartition
+from utils.helpers import format_currency
+from utils.data_layer import (
+    get_indicateurs,
+    get_associes,
+    get_kpi_snapshot,
+    get_repartition_associes,
+    get_configuration_repartition
 )
-from models import Indicateur, Associe, Repartition, Attribution
-from utils import get_session
+from models import Repartition
+from utils import get_session, bump_data_version
+from utils.repartition import sync_attributions, create_default_repartitions
+from utils.graphiques import graphique_memorise
+
+def _appliquer_style(fig):
+    """Applique le style commun des graphiques de la page."""
+    fig.update_layout(
+        font=dict(family="Lato, sans-serif"),
+        title_font=dict(size=20, color="#0596DE"),
+        legend_title_font=dict(size=14),
+        legend_font=dict(size=12),
+    )
+    return fig
+
+@graphique_memorise
+def create_repartition_pie_chart(noms, totaux):
+    """Crée le graphique en camembert de la répartition des revenus entre associés."""
+    # Plotly n'est importé qu'au premier graphique, pour ne pas ralentir le démarrage
+    import plotly.express as px
+    
+    fig = px.pie(
+        names=noms,
+        values=totaux,
+        title="Répartition des revenus entre associés",
+        color_discrete_sequence=px.colors.sequential.Blues_r,
+        hole=0.4
+    )
+    return _appliquer_style(fig)
+
+@graphique_memorise
+def create_parts_bar_chart(noms, parts_fixes, parts_variables):
+    """Crée le graphique en barres des parts fixe et variable de chaque associé."""
+    import plotly.express as px
+    
+    df_barres = pd.DataFrame({
+        "Associé": noms,
+        "Part fixe": parts_fixes,
+        "Part variable": parts_variables
+    })
+    
+    df_barres_melted = pd.melt(
+        df_barres,
+        id_vars=["Associé"],
+        value_vars=["Part fixe", "Part variable"],
+        var_name="Type de part",
+        value_name="Montant (€)"
+    )
+    
+    fig = px.bar(
+        df_barres_melted,
+        x="Associé",
+        y="Montant (€)",
+        color="Type de part",
+        title="Répartition part fixe / part variable par associé",
+        barmode="stack",
+        color_discrete_map={
+            "Part fixe": "#0596DE",
+            "Part variable": "#2D3E50"
+        }
+    )
+    return _appliquer_style(fig)
 
 def show():
     """Affiche la page de répartition des revenus entre associés."""
     st.title("Répartition des revenus ACI")
     
     # Récupérer les données
-    session = get_session()
-    indicateurs = session.query(Indicateur).all()
-    associes = session.query(Associe).all()
-    session.close()
+    indicateurs = get_indicateurs()
+    associes = get_associes()
     
     if not associes:
         st.warning("Aucun associé n'a été ajouté. Veuillez d'abord ajouter des associés dans la page 'Gestion des associés'.")
         return
     
     # Afficher les métriques principales
-    total_aci = calculate_total_aci_revenue()
-    total_charges = calculate_charges_total()
-    net_revenue = calculate_net_revenue()
+    kpi = get_kpi_snapshot()
+    net_revenue = kpi.net_revenue
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
         st.metric(
             label="Revenu ACI Total", 
-            value=format_currency(total_aci)
+            value=format_currency(kpi.total_aci)
         )
     
     with col2:
         st.metric(
             label="Total des Charges", 
-            value=format_currency(total_charges)
+            value=format_currency(kpi.total_charges)
         )
     
     with col3:
@@ -63,6 +120,15 @@ def show():
     with tab1:
         st.subheader("Configuration du mode de répartition des indicateurs")
         
+        # Configuration de tous les indicateurs, lue en une requête (mise en cache)
+        configuration = get_configuration_repartition()
+        
+        # Créer la répartition par défaut des indicateurs qui n'en ont pas
+        sans_repartition = [i.id for i in indicateurs if configuration.get(i.id, {}).get("repartition_id") is None]
+        if sans_repartition:
+            create_default_repartitions(sans_repartition)
+            configuration = get_configuration_repartition()
+        
         # Grouper les indicateurs par axe
         indicateurs_par_axe = {}
         for indicateur in indicateurs:
@@ -70,128 +136,104 @@ def show():
                 indicateurs_par_axe[indicateur.axe] = []
             indicateurs_par_axe[indicateur.axe].append(indicateur)
         
-        # Créer des expanders pour chaque axe
-        for axe, indicateurs_axe in indicateurs_par_axe.items():
-            with st.expander(f"Axe: {axe}", expanded=False):
-                for indicateur in indicateurs_axe:
-                    st.markdown(f"### {indicateur.nom}")
-                    
-                    # Récupérer la configuration de répartition existante
-                    session = get_session()
-                    repartition = session.query(Repartition).filter_by(indicateur_id=indicateur.id).first()
-                    
-                    # Si aucune répartition n'existe, en créer une par défaut
-                    if not repartition:
-                        repartition = Repartition(
-                            indicateur_id=indicateur.id,
-                            est_commun=True,
-                            mode_repartition='egalitaire'
-                        )
-                        session.add(repartition)
-                        session.commit()
-                    
-                    # Stocker les valeurs avant de fermer la session
-                    est_commun_value = repartition.est_commun
-                    
-                    # Récupérer les attributions existantes
-                    attributions = session.query(Attribution).filter_by(indicateur_id=indicateur.id).all()
-                    # Créer un dictionnaire des associés déjà sélectionnés
-                    associes_selectionnes = [a.associe_id for a in attributions if a.pourcentage > 0]
-                    session.close()
-                    
-                    # Option simplifié: soit tous les associés, soit des associés spécifiques
-                    est_commun = st.radio(
-                        "Type de répartition",
-                        ["Tous les associés", "Associés spécifiques"],
-                        index=0 if est_commun_value else 1,
-                        key=f"type_{indicateur.id}",
-                        horizontal=True
+        # Attributions attendues des indicateurs répartis entre tous les associés, y compris
+        # ceux des axes non affichés
+        attributions_communes = {
+            indicateur.id: {associe.id: 0 for associe in associes}
+            for indicateur in indicateurs
+            if configuration[indicateur.id]["est_commun"]
+        }
+        
+        # Seuls les widgets de l'axe choisi sont construits
+        axe = st.selectbox("Axe à configurer", options=list(indicateurs_par_axe), key="axe_repartition")
+        
+        for indicateur in indicateurs_par_axe.get(axe, []):
+            st.markdown(f"### {indicateur.nom}")
+            
+            # Configuration de répartition existante
+            est_commun_value = configuration[indicateur.id]["est_commun"]
+            associes_selectionnes = [
+                associe_id for associe_id, pourcentage in configuration[indicateur.id]["attributions"] if pourcentage > 0
+            ]
+            
+            # Option simplifié: soit tous les associés, soit des associés spécifiques
+            est_commun = st.radio(
+                "Type de répartition",
+                ["Tous les associés", "Associés spécifiques"],
+                index=0 if est_commun_value else 1,
+                key=f"type_{indicateur.id}",
+                horizontal=True
+            )
+            
+            est_commun_bool = est_commun == "Tous les associés"
+            
+            # Si la configuration a changé, mettre à jour la base de données
+            if est_commun_bool != est_commun_value:
+                session = get_session()
+                repartition = session.query(Repartition).filter_by(indicateur_id=indicateur.id).first()
+                
+                if repartition:
+                    repartition.est_commun = est_commun_bool
+                    # Toujours utiliser le mode égalitaire (on a supprimé l'option proportionnelle)
+                    repartition.mode_repartition = 'egalitaire'
+                    session.commit()
+                
+                session.close()
+                bump_data_version(("repartition",))
+            
+            # Si on a sélectionné des associés spécifiques
+            if est_commun == "Associés spécifiques":
+                attributions_communes.pop(indicateur.id, None)
+                st.markdown("#### Sélection des associés")
+                
+                # Créer des cases à cocher pour chaque associé
+                associes_coches = {}
+                for associe in associes:
+                    est_selectionne = associe.id in associes_selectionnes
+                    associes_coches[associe.id] = st.checkbox(
+                        f"{associe.prenom} {associe.nom}",
+                        value=est_selectionne,
+                        key=f"select_{indicateur.id}_{associe.id}"
                     )
-                    
-                    est_commun_bool = est_commun == "Tous les associés"
-                    
-                    # Si la configuration a changé, mettre à jour la base de données
-                    if est_commun_bool != est_commun_value:
-                        session = get_session()
-                        repartition = session.query(Repartition).filter_by(indicateur_id=indicateur.id).first()
-                        
-                        if repartition:
-                            repartition.est_commun = est_commun_bool
-                            # Toujours utiliser le mode égalitaire (on a supprimé l'option proportionnelle)
-                            repartition.mode_repartition = 'egalitaire'
-                            session.commit()
-                        
-                        session.close()
-                    
-                    # Si on a sélectionné des associés spécifiques
-                    if est_commun == "Associés spécifiques":
-                        st.markdown("#### Sélection des associés")
-                        
-                        # Créer des cases à cocher pour chaque associé
-                        associes_coches = {}
-                        for associe in associes:
-                            est_selectionne = associe.id in associes_selectionnes
-                            associes_coches[associe.id] = st.checkbox(
-                                f"{associe.prenom} {associe.nom}",
-                                value=est_selectionne,
-                                key=f"select_{indicateur.id}_{associe.id}"
-                            )
-                        
-                        # Bouton pour sauvegarder la sélection
-                        if st.button("Sauvegarder la sélection", key=f"save_{indicateur.id}"):
-                            # Vérifier qu'au moins un associé est sélectionné
-                            if not any(associes_coches.values()):
-                                st.error("Vous devez sélectionner au moins un associé.")
-                            else:
-                                session = get_session()
-                                
-                                # Supprimer toutes les attributions existantes
-                                session.query(Attribution).filter_by(indicateur_id=indicateur.id).delete()
-                                
-                                # Compter combien d'associés sont sélectionnés
-                                nb_selectionnes = sum(1 for est_coche in associes_coches.values() if est_coche)
-                                
-                                # Créer de nouvelles attributions
-                                for associe_id, est_coche in associes_coches.items():
-                                    pourcentage = 100 / nb_selectionnes if est_coche else 0
-                                    attribution = Attribution(
-                                        indicateur_id=indicateur.id,
-                                        associe_id=associe_id,
-                                        pourcentage=pourcentage
-                                    )
-                                    session.add(attribution)
-                                
-                                session.commit()
-                                session.close()
-                                
-                                st.success("Sélection sauvegardée avec succès.")
-                    
-                    # Si tous les associés sont sélectionnés, les pourcentages sont calculés automatiquement
+                
+                # Bouton pour sauvegarder la sélection
+                if st.button("Sauvegarder la sélection", key=f"save_{indicateur.id}"):
+                    # Vérifier qu'au moins un associé est sélectionné
+                    if not any(associes_coches.values()):
+                        st.error("Vous devez sélectionner au moins un associé.")
                     else:
-                        session = get_session()
-                        
-                        # Supprimer les attributions existantes
-                        session.query(Attribution).filter_by(indicateur_id=indicateur.id).delete()
+                        # Compter combien d'associés sont sélectionnés
+                        nb_selectionnes = sum(1 for est_coche in associes_coches.values() if est_coche)
                         
-                        # Créer des attributions pour tous les associés
-                        for associe in associes:
-                            attribution = Attribution(
-                                indicateur_id=indicateur.id,
-                                associe_id=associe.id,
-                                pourcentage=0  # Le pourcentage sera calculé dynamiquement
-                            )
-                            session.add(attribution)
+                        # N'écrire que les attributions qui diffèrent de la sélection
+                        sync_attributions({
+                            indicateur.id: {
+                                associe_id: 100 / nb_selectionnes if est_coche else 0
+                                for associe_id, est_coche in associes_coches.items()
+                            }
+                        })
                         
-                        session.commit()
-                        session.close()
-                    
-                    st.markdown("---")
+                        st.success("Sélection sauvegardée avec succès.")
+            
+            # Si tous les associés sont sélectionnés, les pourcentages sont calculés automatiquement :
+            # une attribution à pourcentage nul est attendue pour chaque associé
+            else:
+                attributions_communes[indicateur.id] = {associe.id: 0 for associe in associes}
+            
+            st.markdown("---")
+        
+        # Synchroniser en une seule transaction les attributions communes qui diffèrent de la base
+        sync_attributions({
+            indicateur_id: attendues
+            for indicateur_id, attendues in attributions_communes.items()
+            if sorted(configuration[indicateur_id]["attributions"]) != sorted(attendues.items())
+        })
     
     with tab2:
         st.subheader("Résultats de la répartition des revenus")
         
         # Récupérer la répartition des revenus entre associés
-        resultats = get_associes_repartition()
+        resultats = get_repartition_associes()
         
         if not resultats:
             st.info("Aucune répartition n'a été configurée. Veuillez configurer la répartition des indicateurs dans l'onglet 'Configuration'.")
@@ -210,60 +252,40 @@ def show():
             # Afficher le tableau
             st.dataframe(df_resultats, use_container_width=True)
             
-            # Créer un graphique en camembert pour visualiser la répartition
-            fig = px.pie(
-                names=[resultats[a_id]["nom"] for a_id in resultats],
-                values=[resultats[a_id]["total"] for a_id in resultats],
-                title="Répartition des revenus entre associés",
-                color_discrete_sequence=px.colors.sequential.Blues_r,
-                hole=0.4
-            )
-            
-            fig.update_layout(
-                font=dict(family="Lato, sans-serif"),
-                title_font=dict(size=20, color="#0596DE"),
-                legend_title_font=dict(size=14),
-                legend_font=dict(size=12),
-            )
+            noms = [resultats[a_id]["nom"] for a_id in resultats]
             
+            # Créer un graphique en camembert pour visualiser la répartition
+            fig = create_repartition_pie_chart(noms, [resultats[a_id]["total"] for a_id in resultats])
             st.plotly_chart(fig, use_container_width=True)
             
             # Créer un graphique en barres pour comparer part fixe et part variable
-            df_barres = pd.DataFrame({
-                "Associé": [resultats[a_id]["nom"] for a_id in resultats],
-                "Part fixe": [resultats[a_id]["part_fixe"] for a_id in resultats],
-                "Part variable": [resultats[a_id]["part_variable"] for a_id in resultats]
-            })
-            
-            df_barres_melted = pd.melt(
-                df_barres,
-                id_vars=["Associé"],
-                value_vars=["Part fixe", "Part variable"],
-                var_name="Type de part",
-                value_name="Montant (€)"
+            fig_barres = create_parts_bar_chart(
+                noms,
+                [resultats[a_id]["part_fixe"] for a_id in resultats],
+                [resultats[a_id]["part_variable"] for a_id in resultats]
             )
+            st.plotly_chart(fig_barres, use_container_width=True)
             
-            fig_barres = px.bar(
-                df_barres_melted,
-                x="Associé",
-                y="Montant (€)",
-                color="Type de part",
-                title="Répartition part fixe / part variable par associé",
-                barmode="stack",
-                color_discrete_map={
-                    "Part fixe": "#0596DE",
-                    "Part variable": "#2D3E50"
+            # Export des résultats enregistrés
+            df_export = pd.DataFrame([
+                {
+                    "associe": resultats[a_id]["nom"],
+                    "fonction": resultats[a_id]["fonction"],
+                    "est_gerant": resultats[a_id]["est_gerant"],
+                    "part_fixe": resultats[a_id]["part_fixe"],
+                    "part_variable": resultats[a_id]["part_variable"],
+                    "total": resultats[a_id]["total"],
+                    "pourcentage": resultats[a_id]["pourcentage"]
                 }
-            )
+                for a_id in resultats
+            ])
             
-            fig_barres.update_layout(
-                font=dict(family="Lato, sans-serif"),
-                title_font=dict(size=20, color="#0596DE"),
-                legend_title_font=dict(size=14),
-                legend_font=dict(size=12),
+            st.download_button(
+                label="Télécharger la répartition (CSV)",
+                data=df_export.to_csv(index=False).encode("utf-8"),
+                file_name="repartition_aci.csv",
+                mime="text/csv"
             )
-            
-            st.plotly_chart(fig_barres, use_container_width=True)
     
     # Ajouter une note explicative
     st.markdown("---")
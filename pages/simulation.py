@@ -0,0 +1,221 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+from utils.helpers import format_currency
+from utils.data_layer import get_parametres_calcul, get_simulation
+from utils.simulation import VALIDATION_ACTUELLE
+from utils.graphiques import graphique_memorise
+
+# Nombre de scénarios au-delà duquel la grille est jugée trop grande pour l'affichage
+MAX_SCENARIOS = 200000
+
+# Indicateurs de résultat proposés pour la surface de réponse
+METRIQUES = {
+    "Revenu net": "net_revenue",
+    "Revenu ACI total": "total_aci",
+    "Points validés": "total_points"
+}
+
+@graphique_memorise
+def create_surface_chart(surface, metrique):
+    """Crée la surface de réponse 3D d'un indicateur selon la patientèle et le nombre de PS."""
+    # Plotly n'est importé qu'au premier graphique, pour ne pas ralentir le démarrage
+    import plotly.graph_objects as go
+    
+    fig = go.Figure(go.Surface(
+        x=surface.columns,
+        y=surface.index,
+        z=surface.values,
+        colorscale="Blues"
+    ))
+    
+    fig.update_layout(
+        font=dict(family="Lato, sans-serif"),
+        scene=dict(
+            xaxis_title="Patientèle",
+            yaxis_title="Nombre de PS",
+            zaxis_title=metrique
+        ),
+        height=600
+    )
+    return fig
+
+@graphique_memorise
+def create_heatmap_chart(surface, metrique):
+    """Crée la carte de chaleur d'un indicateur selon la patientèle et le nombre de PS."""
+    import plotly.express as px
+    
+    fig = px.imshow(
+        surface,
+        labels=dict(x="Patientèle", y="Nombre de PS", color=metrique),
+        color_continuous_scale="Blues",
+        aspect="auto",
+        origin="lower"
+    )
+    
+    fig.update_layout(font=dict(family="Lato, sans-serif"))
+    return fig
+
+@graphique_memorise
+def create_scenario_parts_chart(parts):
+    """Crée le graphique en barres de la répartition du revenu net d'un scénario entre associés."""
+    import plotly.express as px
+    
+    fig = px.bar(
+        x=parts.index,
+        y=parts.values,
+        labels={"x": "Associé", "y": "Montant (€)"},
+        title="Répartition du revenu net entre associés",
+        color_discrete_sequence=["#0596DE"]
+    )
+    
+    fig.update_layout(
+        font=dict(family="Lato, sans-serif"),
+        title_font=dict(size=20, color="#0596DE")
+    )
+    return fig
+
+def show():
+    """Affiche la page de simulation de scénarios."""
+    st.title("Simulation de scénarios")
+    
+    st.markdown("""
+    Explorez l'effet de la patientèle, du nombre de professionnels, du taux de dossiers,
+    de la valeur du point et des indicateurs validés sur les revenus de la structure.
+    Tous les scénarios de la grille sont évalués en une seule passe, sans modifier les paramètres enregistrés.
+    """)
+    
+    parametres = get_parametres_calcul()
+    
+    # Formulaire de définition de la grille de scénarios
+    with st.form("form_simulation"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            plage_patientele = st.slider(
+                "🧑‍⚕️ Patientèle",
+                min_value=1000,
+                max_value=30000,
+                value=(2000, 20000),
+                step=500
+            )
+            pas_patientele = st.number_input("Pas de patientèle", min_value=100, value=500, step=100)
+            
+            taux_dossiers = st.multiselect(
+                "📋 Taux de dossiers (%)",
+                options=sorted({0.0, 2.5, 5.0, 10.0, 20.0, 30.0, 50.0, parametres.taux_dossiers_pourcentage}),
+                default=[parametres.taux_dossiers_pourcentage]
+            )
+        
+        with col2:
+            plage_ps = st.slider(
+                "👨‍⚕️ Nombre de PS",
+                min_value=1,
+                max_value=60,
+                value=(5, 40),
+                step=1
+            )
+            
+            valeurs_point = st.multiselect(
+                "💲 Valeur du point (€)",
+                options=sorted({6.5, 7.0, 7.5, 8.0, parametres.valeur_point}),
+                default=[parametres.valeur_point]
+            )
+            
+            jeux_validation = st.multiselect(
+                "✅ Indicateurs validés",
+                options=[VALIDATION_ACTUELLE, "Socles et prérequis uniquement", "Tous les indicateurs validés"],
+                default=[VALIDATION_ACTUELLE]
+            )
+        
+        lancer = st.form_submit_button("Lancer la simulation")
+    
+    if lancer:
+        st.session_state.grille_simulation = {
+            "patienteles": tuple(range(plage_patientele[0], plage_patientele[1] + 1, int(pas_patientele))),
+            "nombres_ps": tuple(range(plage_ps[0], plage_ps[1] + 1)),
+            "taux_dossiers": tuple(taux_dossiers),
+            "valeurs_point": tuple(valeurs_point),
+            "jeux_validation": tuple(jeux_validation)
+        }
+    
+    grille = st.session_state.get("grille_simulation")
+    if not grille:
+        st.info("Définissez la grille de scénarios puis lancez la simulation.")
+        return
+    
+    if not all(grille.values()):
+        st.error("Sélectionnez au moins une valeur pour chaque paramètre.")
+        return
+    
+    nombre_scenarios = int(np.prod([len(valeurs) for valeurs in grille.values()]))
+    if nombre_scenarios > MAX_SCENARIOS:
+        st.error(f"La grille comporte {nombre_scenarios} scénarios (maximum {MAX_SCENARIOS}). Augmentez le pas ou réduisez les plages.")
+        return
+    
+    # Évaluer tous les scénarios (résultat mis en cache tant que les données ne changent pas)
+    resultats, parts_associes = get_simulation(**grille)
+    st.caption(f"{nombre_scenarios} scénarios évalués.")
+    
+    # Choix de la coupe de la grille à représenter
+    st.subheader("Surface de réponse")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        metrique = st.selectbox("Indicateur", options=list(METRIQUES))
+    with col2:
+        taux_coupe = st.selectbox("Taux de dossiers (%)", options=grille["taux_dossiers"])
+    with col3:
+        valeur_coupe = st.selectbox("Valeur du point (€)", options=grille["valeurs_point"])
+    with col4:
+        jeu_coupe = st.selectbox("Indicateurs validés", options=grille["jeux_validation"])
+    
+    coupe = resultats[
+        (resultats["taux_dossiers"] == taux_coupe)
+        & (resultats["valeur_point"] == valeur_coupe)
+        & (resultats["jeu_validation"] == jeu_coupe)
+    ]
+    surface = coupe.pivot_table(index="nombre_ps", columns="patientele", values=METRIQUES[metrique])
+    
+    tab_surface, tab_carte = st.tabs(["Surface 3D", "Carte de chaleur"])
+    
+    with tab_surface:
+        st.plotly_chart(create_surface_chart(surface, metrique), use_container_width=True)
+    
+    with tab_carte:
+        st.plotly_chart(create_heatmap_chart(surface, metrique), use_container_width=True)
+    
+    # Détail d'un scénario de la coupe
+    st.subheader("Détail d'un scénario")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        patientele_detail = st.select_slider("Patientèle", options=list(surface.columns))
+    with col2:
+        ps_detail = st.select_slider("Nombre de PS", options=list(surface.index))
+    
+    index_detail = coupe[(coupe["patientele"] == patientele_detail) & (coupe["nombre_ps"] == ps_detail)].index[0]
+    scenario = resultats.loc[index_detail]
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric(label="Revenu ACI Total", value=format_currency(scenario["total_aci"]))
+    with col2:
+        st.metric(label="Revenu Net", value=format_currency(scenario["net_revenue"]))
+    with col3:
+        st.metric(label="Points Validés", value=f"{int(scenario['total_points'])} pts")
+    
+    parts = parts_associes.loc[index_detail]
+    if len(parts) > 0:
+        st.plotly_chart(create_scenario_parts_chart(parts), use_container_width=True)
+    
+    # Export de l'ensemble des scénarios
+    st.download_button(
+        label="Télécharger les résultats (CSV)",
+        data=pd.concat([resultats, parts_associes], axis=1).to_csv(index=False).encode("utf-8"),
+        file_name="simulation_aci.csv",
+        mime="text/csv"
+    )
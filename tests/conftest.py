@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from utils.db_config import Base, Session, STRUCTURE_PAR_DEFAUT
+from utils.param_store import parametres_store
+from models import Structure, Indicateur, Associe
+from utils.init_data import init_parametres, init_indicateurs
+from utils.repartition import create_default_repartitions, sync_attributions
+
+@pytest.fixture
+def base_vide():
+    """Base SQLite en mémoire, utilisée par les sessions de l'application, ne contenant que la structure par défaut."""
+    moteur = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(moteur)
+    ancien_moteur = Session.kw["bind"]
+    Session.configure(bind=moteur)
+    parametres_store.invalider()
+    
+    session = Session()
+    session.add(Structure(id=STRUCTURE_PAR_DEFAUT, nom="Structure de test"))
+    session.commit()
+    session.close()
+    
+    yield moteur
+    
+    Session.configure(bind=ancien_moteur)
+    parametres_store.invalider()
+    moteur.dispose()
+
+@pytest.fixture
+def base_aci(base_vide):
+    """Base en mémoire avec les indicateurs par défaut, répartis entre deux associés."""
+    init_parametres()
+    init_indicateurs()
+    
+    session = Session()
+    session.add_all([
+        Associe(id=1, nom="Martin", prenom="Anne", fonction="Médecin", est_gerant=True, coefficient_majoration=1.5),
+        Associe(id=2, nom="Durand", prenom="Paul", fonction="IDE", est_gerant=False, coefficient_majoration=1.0)
+    ])
+    session.commit()
+    indicateur_ids = [indicateur_id for (indicateur_id,) in session.query(Indicateur.id).order_by(Indicateur.id)]
+    session.close()
+    
+    create_default_repartitions(indicateur_ids)
+    sync_attributions({indicateur_id: {1: 0, 2: 0} for indicateur_id in indicateur_ids})
+    return indicateur_ids
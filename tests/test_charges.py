@@ -0,0 +1,80 @@
+import datetime
+import pandas as pd
+import pytest
+from utils.charges import prepare_charges, CATEGORIE_DEFAUT
+
+def preparer(lignes, colonnes=("libelle", "montant", "categorie", "date_saisie")):
+    """Prépare des lignes saisies comme dans un fichier CSV (valeurs texte)."""
+    return prepare_charges(pd.DataFrame(lignes, columns=list(colonnes), dtype=str))
+
+def test_montants_et_dates_convertis():
+    valides, rejets, nb_lignes = preparer([
+        ("Loyer", "1 234,56 €", "Locaux", "05/01/2023"),
+        ("Logiciel", "1.234,5", "", "31/12/2023"),
+        ("Fournitures", "89.9", None, None),
+        ("Ménage", "-12", "Entretien", "")
+    ])
+    
+    assert nb_lignes == 4
+    assert rejets.empty
+    assert list(valides["montant"]) == pytest.approx([1234.56, 1234.5, 89.9, -12.0])
+    assert list(valides["categorie"]) == ["Locaux", CATEGORIE_DEFAUT, CATEGORIE_DEFAUT, "Entretien"]
+    assert valides["date_saisie"][0] == datetime.date(2023, 1, 5)
+    assert valides["date_saisie"][1] == datetime.date(2023, 12, 31)
+    
+    # Une charge sans date est datée du jour de l'import
+    assert valides["date_saisie"][2] == valides["date_saisie"][3] == datetime.datetime.now().date()
+
+@pytest.mark.parametrize("montant", ["1.234", "1,234.56", "-2.500"])
+def test_montant_ambigu_rejete(montant):
+    valides, rejets, _ = preparer([("Charge", montant, "Divers", "01/02/2023")])
+    
+    assert valides.empty
+    assert list(rejets["motif"]) == ["Montant ambigu (séparateurs de milliers et de décimales)"]
+
+@pytest.mark.parametrize("montant", ["abc", "", "12 euros", None])
+def test_montant_invalide_rejete(montant):
+    valides, rejets, _ = preparer([("Charge", montant, "Divers", "01/02/2023")])
+    
+    assert valides.empty
+    assert list(rejets["motif"]) == ["Montant invalide"]
+
+@pytest.mark.parametrize("date", ["31/02/2023", "2023-01-05", "5 janvier 2023", "13/13/2023"])
+def test_date_invalide_rejetee(date):
+    valides, rejets, _ = preparer([("Charge", "10", "Divers", date)])
+    
+    assert valides.empty
+    assert list(rejets["motif"]) == ["Date invalide (format attendu JJ/MM/AAAA)"]
+
+def test_rejets_numerotes_comme_dans_le_fichier():
+    valides, rejets, nb_lignes = preparer([
+        ("Loyer", "800", "Locaux", "01/01/2023"),
+        ("", "100", "Divers", "01/01/2023"),
+        ("Assurance", "1.500", "Divers", "01/01/2023"),
+        ("Électricité", "120,40", "Locaux", "01/01/2023"),
+        ("Eau", "35", "Locaux", "32/01/2023")
+    ])
+    
+    assert nb_lignes == 5
+    assert list(valides["libelle"]) == ["Loyer", "Électricité"]
+    
+    # En-tête en ligne 1 : la première charge est en ligne 2
+    assert list(rejets["ligne"]) == [3, 4, 6]
+    assert list(rejets["motif"]) == [
+        "Libellé manquant",
+        "Montant ambigu (séparateurs de milliers et de décimales)",
+        "Date invalide (format attendu JJ/MM/AAAA)"
+    ]
+
+def test_montants_numeriques_excel_acceptes():
+    df = pd.DataFrame({
+        "Libelle": ["Loyer", "Logiciel"],
+        "Montant": [1234.5, 1.234],
+        "Date_saisie": [datetime.datetime(2023, 3, 1), None]
+    })
+    valides, rejets, _ = prepare_charges(df)
+    
+    # Les nombres typés d'un fichier Excel ne sont pas ambigus
+    assert rejets.empty
+    assert list(valides["montant"]) == pytest.approx([1234.5, 1.234])
+    assert valides["date_saisie"][0] == datetime.date(2023, 3, 1)
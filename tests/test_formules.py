@@ -0,0 +1,154 @@
+import itertools
+import numpy as np
+import pytest
+from utils.db_config import Session
+from models import Indicateur
+from utils.formules import RegistreFormules, registre_formules, REGLES_FORMULES, FORMULE_FIXE
+from utils.points import ParametresCalcul, evaluate_indicator
+
+# Indicateurs couvrant chacune des branches de l'ancien calcul : (nom, points fixes, points variables)
+INDICATEURS = [
+    ("Fonction de coordination - Variable (jusqu'à 8000 patients)", 0, 1700),
+    ("Fonction de coordination - Variable (au-delà de 8000 patients)", 0, 1100),
+    ("Concertation pluri-professionnelle (RCP)", 0, 1000),
+    ("Concertation pluri-professionnelle - avec IPA", 100, 1000),
+    ("SI labellisé 'Standard' (ANS) - Variable (jusqu'à 16 PS)", 0, 200),
+    ("SI labellisé 'Standard' (ANS) - Variable (au-delà de 16 PS)", 0, 150),
+    ("Coordination externe", 0, 350),
+    ("Parcours insuffisance cardiaque", 0, 100),
+    ("Protocoles pluri-professionnels (avec IPA)", 140, 10),
+    ("Protocoles nationaux de coopération", 100, 10),
+    ("Formation de professionnels - 3e & 4e stage", 225, 10),
+    ("Réponse aux crises sanitaires graves - Activation", 0, 350),
+    ("Missions de santé publique (1ère mission)", 0, 350),
+    ("Démarche qualité - Niveau 2", 100, 200),
+    ("Transmission des données de santé", 0, 200),
+    ("Amplitude horaires complète (8h-20h + samedi matin)", 800, 0)
+]
+
+# Grille de paramètres : (patientèle, nombre de PS, taux de dossiers en fraction, nombre de protocoles)
+GRILLE = list(itertools.product((0, 3000, 8000, 12500), (0, 10, 20), (0, 0.05, 0.3), (0, 3, 9)))
+
+def creer_indicateur(nom, points_fixes, points_variables, est_valide=True, prorata=0.75):
+    """Indicateur non enregistré, dont le code de formule est déduit du nom."""
+    regle = registre_formules.resoudre(nom)
+    return Indicateur(
+        id=None, nom=nom, axe="Accès aux soins", type="optionnel", points_fixes=points_fixes,
+        points_variables=points_variables, est_valide=est_valide, prorata=prorata,
+        code_formule=regle.code if regle else None
+    )
+
+def points_reference(indicateur, patientele=None, nombre_ps=None, taux_dossiers=None, nb_protocoles=None):
+    """Calcul de référence : corps de l'ancienne fonction calculate_indicator_points, sur un indicateur chargé."""
+    points_fixes = indicateur.points_fixes if indicateur.est_valide else 0
+    points_variables = 0
+    
+    if indicateur.est_valide and indicateur.points_variables > 0:
+        if "Fonction de coordination - Variable (jusqu'à 8000 patients)" in indicateur.nom:
+            points_variables = 1700 * min(patientele or 0, 8000) / 4000
+        
+        elif "Fonction de coordination - Variable (au-delà de 8000 patients)" in indicateur.nom:
+            points_variables = 1100 * max((patientele or 0) - 8000, 0) / 4000
+        
+        elif "Concertation pluri-professionnelle" in indicateur.nom:
+            base_points = 1000
+            if "avec IPA" in indicateur.nom:
+                points_fixes = 200
+            
+            if patientele and taux_dossiers:
+                points_variables = base_points * (patientele / 4000) * (taux_dossiers / 5)
+        
+        elif "SI labellisé 'Standard' (ANS) - Variable (jusqu'à 16 PS)" in indicateur.nom:
+            points_variables = 200 * min(nombre_ps or 0, 16)
+        
+        elif "SI labellisé 'Standard' (ANS) - Variable (au-delà de 16 PS)" in indicateur.nom:
+            points_variables = 150 * max((nombre_ps or 0) - 16, 0)
+        
+        elif "Coordination externe" in indicateur.nom or "Parcours insuffisance cardiaque" in indicateur.nom:
+            points_variables = indicateur.points_variables * ((patientele or 0) / 4000)
+        
+        elif "Protocoles pluri-professionnels" in indicateur.nom or "Protocoles nationaux de coopération" in indicateur.nom:
+            max_protocoles = 8 if "pluri-professionnels" in indicateur.nom else 6
+            points_fixes = indicateur.points_fixes * min(nb_protocoles or 0, max_protocoles)
+            points_variables = 0
+        
+        elif "Formation de professionnels - 3e & 4e stage" in indicateur.nom:
+            points_fixes = indicateur.points_fixes * min(nb_protocoles or 0, 2)
+            points_variables = 0
+        
+        elif "Réponse aux crises sanitaires graves - Activation" in indicateur.nom:
+            points_variables = indicateur.points_variables
+        
+        elif "Missions de santé publique" in indicateur.nom or "Implication des usagers - Niveau 2" in indicateur.nom or "Démarche qualité" in indicateur.nom:
+            points_variables = indicateur.points_variables
+    
+    return (points_fixes + points_variables) * indicateur.prorata
+
+@pytest.mark.parametrize("nom, code", [
+    ("Fonction de coordination - Variable (jusqu'à 8000 patients)", "coordination_jusqu_8000"),
+    ("Concertation pluri-professionnelle (RCP)", "concertation"),
+    ("Concertation pluri-professionnelle (avec IPA)", "concertation_avec_ipa"),
+    ("Concertation pluri-professionnelle - avec IPA", "concertation_avec_ipa"),
+    ("SI labellisé 'Standard' (ANS) - Variable 16 premiers PS", "si_jusqu_16_ps"),
+    ("SI labellisé 'Standard' (ANS) - Variable PS supplémentaires", "si_au_dela_16_ps"),
+    ("Protocoles pluri-professionnels (avec IPA)", "protocoles_pluri_professionnels"),
+    ("Démarche qualité - Niveau 3", "forfait_variable"),
+    ("Transmission des données de santé", None),
+    ("avec IPA", None)
+])
+def test_resolution_par_nom(nom, code):
+    regle = registre_formules.resoudre(nom)
+    assert (regle.code if regle else None) == code
+
+def test_formule_conservee_apres_renommage():
+    indicateur = creer_indicateur("Coordination externe", 0, 350)
+    indicateur.nom = "Coordination avec les partenaires extérieurs"
+    
+    assert registre_formules.code_pour(indicateur) == "prorata_patientele"
+    assert registre_formules.indicateurs_sans_formule([indicateur]) == []
+
+def test_code_inconnu_signale():
+    indicateur = creer_indicateur("Coordination externe", 0, 350)
+    indicateur.code_formule = "formule_retiree"
+    
+    assert registre_formules.formule_pour(indicateur) is FORMULE_FIXE
+    assert registre_formules.indicateurs_sans_formule([indicateur]) == [indicateur]
+
+def test_codes_en_double_refuses():
+    with pytest.raises(ValueError):
+        RegistreFormules(REGLES_FORMULES + REGLES_FORMULES[:1])
+
+def test_codes_init_data_identiques_a_la_resolution(base_aci):
+    session = Session()
+    indicateurs = session.query(Indicateur).all()
+    session.close()
+    
+    for indicateur in indicateurs:
+        regle = registre_formules.resoudre(indicateur.nom)
+        assert indicateur.code_formule == (regle.code if regle else None), indicateur.nom
+
+@pytest.mark.parametrize("patientele, nombre_ps, taux_dossiers, nb_protocoles", GRILLE)
+def test_points_identiques_a_la_reference(patientele, nombre_ps, taux_dossiers, nb_protocoles):
+    parametres = ParametresCalcul(patientele=patientele, nombre_ps=nombre_ps, taux_dossiers=taux_dossiers, nb_protocoles=nb_protocoles)
+    for nom, points_fixes, points_variables in INDICATEURS:
+        for est_valide in (True, False):
+            indicateur = creer_indicateur(nom, points_fixes, points_variables, est_valide=est_valide)
+            attendu = points_reference(indicateur, patientele, nombre_ps, taux_dossiers, nb_protocoles)
+            assert evaluate_indicator(indicateur, parametres) == pytest.approx(attendu), (nom, est_valide)
+
+@pytest.mark.parametrize("regle", REGLES_FORMULES, ids=lambda regle: regle.code)
+def test_evaluer_tableau_identique_a_evaluer(regle):
+    # Chaque paramètre en colonne (S, 1), comme pour l'évaluation d'une grille de scénarios
+    patientele, nombre_ps, taux_dossiers, nb_protocoles = (np.array(valeurs, dtype=float)[:, None] for valeurs in zip(*GRILLE))
+    tableau = ParametresCalcul(patientele=patientele, nombre_ps=nombre_ps, taux_dossiers=taux_dossiers, nb_protocoles=nb_protocoles)
+    points_fixes = np.array([0.0, 100.0, 225.0])
+    points_variables = np.array([350.0, 1000.0, 10.0])
+    
+    fixes, variables = regle.formule.evaluer_tableau(points_fixes, points_variables, tableau)
+    fixes = np.broadcast_to(fixes, (len(GRILLE), len(points_fixes)))
+    variables = np.broadcast_to(variables, (len(GRILLE), len(points_fixes)))
+    for ligne, (p, n, t, nb) in enumerate(GRILLE):
+        parametres = ParametresCalcul(patientele=p, nombre_ps=n, taux_dossiers=t, nb_protocoles=nb)
+        for colonne in range(len(points_fixes)):
+            attendus = regle.formule.evaluer(points_fixes[colonne], points_variables[colonne], parametres)
+            assert (fixes[ligne, colonne], variables[ligne, colonne]) == pytest.approx(attendus), (ligne, colonne)
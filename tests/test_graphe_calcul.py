@@ -0,0 +1,66 @@
+import pytest
+from utils.db_config import Session
+from models import Indicateur, Associe
+from utils.param_store import parametres_store
+from utils.helpers import save_indicator_validations
+from utils.points import load_calculation_parameters
+from utils.repartition import load_repartition_data, calculate_results
+from utils.charges import calculate_charges_total
+from utils.graphe_calcul import GrapheCalcul, get_graphe_calcul
+from utils.resultats import load_results, refresh_results
+
+def verifier_resultats(graphe):
+    """Compare les résultats du graphe à un calcul complet depuis la base."""
+    resultats = graphe.resultats()
+    attendus = calculate_results(load_repartition_data(), load_calculation_parameters(), calculate_charges_total())
+    
+    assert resultats["points"] == pytest.approx(attendus["points"])
+    assert resultats["total_aci"] == pytest.approx(attendus["total_aci"])
+    assert set(resultats["repartition"]) == set(attendus["repartition"])
+    for associe_id, part in attendus["repartition"].items():
+        assert resultats["repartition"][associe_id]["total"] == pytest.approx(part["total"])
+
+def test_validation_mise_a_jour_sans_reconstruction(base_aci):
+    graphe = GrapheCalcul()
+    verifier_resultats(graphe)
+    
+    save_indicator_validations({base_aci[0]: True, base_aci[1]: True})
+    verifier_resultats(graphe)
+    save_indicator_validations({base_aci[0]: False})
+    verifier_resultats(graphe)
+    assert graphe.nb_reconstructions == 1
+
+def test_parametre_mis_a_jour_sans_reconstruction(base_aci):
+    graphe = GrapheCalcul()
+    save_indicator_validations({indicateur_id: True for indicateur_id in base_aci})
+    verifier_resultats(graphe)
+    
+    parametres_store.set("patientele", 8000)
+    verifier_resultats(graphe)
+    parametres_store.set("valeur_point", 7.5)
+    verifier_resultats(graphe)
+    assert graphe.nb_reconstructions == 1
+
+def test_ecriture_non_decrite_reconstruit(base_aci):
+    graphe = GrapheCalcul()
+    verifier_resultats(graphe)
+    
+    # Écriture sans événement, comme celle d'un autre processus
+    session = Session()
+    session.query(Indicateur).filter(Indicateur.id == base_aci[2]).update({"est_valide": True})
+    session.query(Associe).filter(Associe.id == 2).update({"coefficient_majoration": 2.0})
+    session.commit()
+    session.close()
+    
+    verifier_resultats(graphe)
+    assert graphe.nb_reconstructions == 2
+
+def test_resultats_enregistres_issus_du_graphe(base_aci):
+    save_indicator_validations({base_aci[0]: True})
+    resultats = load_results()
+    attendus = get_graphe_calcul().resultats()
+    
+    assert resultats["points"] == pytest.approx(attendus["points"])
+    assert resultats["par_axe"] == attendus["par_axe"]
+    assert resultats["net_revenue"] == pytest.approx(attendus["net_revenue"])
+    assert not refresh_results()
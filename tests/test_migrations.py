@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from utils import db_config
+from utils.db_config import create_db_engine, init_db, migrate_db, get_schema_version, execute_query, STRUCTURE_PAR_DEFAUT
+
+# Schéma d'une base antérieure aux migrations : ni structures, ni index d'unicité, ni code de formule
+SCHEMA_INITIAL = (
+    "CREATE TABLE indicateurs (id INTEGER PRIMARY KEY, nom VARCHAR(255) NOT NULL, axe VARCHAR(50) NOT NULL, "
+    "type VARCHAR(50) NOT NULL, points_fixes INTEGER, points_variables INTEGER, formule_calcul TEXT, "
+    "est_valide BOOLEAN, prorata FLOAT)",
+    "CREATE TABLE associes (id INTEGER PRIMARY KEY, nom VARCHAR(100) NOT NULL, prenom VARCHAR(100) NOT NULL, "
+    "fonction VARCHAR(100), est_gerant BOOLEAN, coefficient_majoration FLOAT)",
+    "CREATE TABLE repartitions (id INTEGER PRIMARY KEY, indicateur_id INTEGER NOT NULL, est_commun BOOLEAN, "
+    "mode_repartition VARCHAR(50))",
+    "CREATE TABLE attributions (id INTEGER PRIMARY KEY, associe_id INTEGER NOT NULL, indicateur_id INTEGER NOT NULL, "
+    "pourcentage FLOAT)",
+    "CREATE TABLE parametres (id INTEGER PRIMARY KEY, cle VARCHAR(100) NOT NULL UNIQUE, valeur VARCHAR(255) NOT NULL, "
+    "description TEXT)"
+)
+
+DONNEES_INITIALES = (
+    "INSERT INTO indicateurs VALUES "
+    "(1, 'Concertation pluri-professionnelle (avec IPA)', 'Travail en équipe & coordination', 'socle', 0, 1000, NULL, 1, 1.0), "
+    "(2, 'Coordination externe', 'Travail en équipe & coordination', 'optionnel', 0, 350, NULL, 1, 1.0), "
+    "(3, 'Amplitude horaires complète (8h-20h + samedi matin)', 'Accès aux soins', 'socle', 800, 0, NULL, 1, 1.0)",
+    "INSERT INTO associes VALUES (1, 'Martin', 'Anne', 'Médecin', 1, 1.5), (2, 'Durand', 'Paul', 'IDE', 0, 1.0)",
+    "INSERT INTO repartitions VALUES (1, 1, 0, 'personnalise'), (2, 1, 1, 'egalitaire'), (3, 2, 1, 'egalitaire')",
+    "INSERT INTO attributions VALUES (1, 1, 1, 70), (2, 2, 1, 30), (3, 1, 1, 10), (4, 1, 2, 0)",
+    "INSERT INTO parametres VALUES (1, 'valeur_point', '7', NULL), (2, 'patientele', '5000', NULL)"
+)
+
+@pytest.fixture
+def base_initiale(tmp_path, monkeypatch):
+    """Base sur fichier au schéma initial (version 0), utilisée par les fonctions de migration."""
+    moteur = create_db_engine(str(tmp_path / "aci_app.db"))
+    with moteur.begin() as connexion:
+        for instruction in SCHEMA_INITIAL + DONNEES_INITIALES:
+            connexion.exec_driver_sql(instruction)
+    monkeypatch.setattr(db_config, "engine", moteur)
+    
+    yield moteur
+    
+    moteur.dispose()
+
+def test_migration_complete(base_initiale):
+    assert get_schema_version() == 0
+    
+    init_db()
+    
+    assert get_schema_version() == db_config.VERSION_SCHEMA
+    assert execute_query("SELECT id, nom FROM structures") == [(STRUCTURE_PAR_DEFAUT, db_config.NOM_STRUCTURE_PAR_DEFAUT)]
+    assert execute_query("SELECT DISTINCT structure_id FROM attributions") == [(STRUCTURE_PAR_DEFAUT,)]
+    
+    # La première ligne de chaque doublon est conservée
+    assert execute_query("SELECT id, indicateur_id, est_commun FROM repartitions ORDER BY id") == [(1, 1, 0), (3, 2, 1)]
+    assert execute_query("SELECT id, pourcentage FROM attributions ORDER BY id") == [(1, 70.0), (2, 30.0), (4, 0.0)]
+    
+    # Code de formule déduit du nom des indicateurs existants
+    assert execute_query("SELECT id, code_formule FROM indicateurs ORDER BY id") == [
+        (1, "concertation_avec_ipa"), (2, "prorata_patientele"), (3, None)
+    ]
+
+def test_contraintes_apres_migration(base_initiale):
+    init_db()
+    
+    with pytest.raises(IntegrityError):
+        execute_query("INSERT INTO attributions (associe_id, indicateur_id, pourcentage, structure_id) VALUES (1, 1, 5, 1)")
+    
+    # Une clé de paramètre n'est plus unique que par structure
+    execute_query("INSERT INTO structures (id, nom) VALUES (2, 'Seconde structure')")
+    execute_query("INSERT INTO parametres (cle, valeur, structure_id) VALUES ('valeur_point', '8', 2)")
+    with pytest.raises(IntegrityError):
+        execute_query("INSERT INTO parametres (cle, valeur, structure_id) VALUES ('valeur_point', '9', 2)")
+    assert execute_query("SELECT valeur FROM parametres WHERE cle = 'patientele'") == [("5000",)]
+
+def test_migrations_appliquees_une_seule_fois(base_initiale):
+    db_config.Base.metadata.create_all(base_initiale)
+    
+    assert migrate_db() == list(range(1, db_config.VERSION_SCHEMA + 1))
+    assert migrate_db() == []
+    assert execute_query("SELECT COUNT(*) FROM structures") == [(1,)]
+
+def test_migration_en_echec_annulee(base_initiale, monkeypatch):
+    def migration_en_echec(connexion):
+        connexion.exec_driver_sql("ALTER TABLE associes ADD COLUMN essai INTEGER")
+        raise RuntimeError("échec de la migration")
+    
+    monkeypatch.setattr(db_config, "MIGRATIONS", db_config.MIGRATIONS + (migration_en_echec,))
+    monkeypatch.setattr(db_config, "VERSION_SCHEMA", len(db_config.MIGRATIONS))
+    db_config.Base.metadata.create_all(base_initiale)
+    
+    with pytest.raises(RuntimeError):
+        migrate_db()
+    
+    # Les migrations précédentes restent acquises, la migration en échec ne laisse aucune trace
+    assert get_schema_version() == db_config.VERSION_SCHEMA - 1
+    assert "essai" not in {colonne for _, colonne, *_ in execute_query("PRAGMA table_info(associes)")}
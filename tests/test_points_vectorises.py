@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from utils.param_store import parametres_store
+from utils.helpers import save_indicator_validations
+from utils.points import ParametresCalcul, evaluate_indicator
+from utils.points_vectorises import indicateurs_to_frame, evaluate_points_vectorized, total_points_by_axe_vectorized
+from utils.repartition import load_repartition_data, calculate_results
+from utils.simulation import build_scenario_grid, simulate_scenarios, VALIDATION_ACTUELLE
+
+PARAMETRES = ParametresCalcul(patientele=9500, nombre_ps=18, taux_dossiers=0.12, nb_protocoles=7, valeur_point=7.0)
+
+@pytest.fixture
+def indicateurs(base_aci):
+    """Indicateurs par défaut, un sur deux validé."""
+    save_indicator_validations({indicateur_id: True for indicateur_id in base_aci[::2]})
+    return load_repartition_data()["indicateurs"]
+
+def test_points_identiques_au_calcul_unitaire(indicateurs):
+    obtenus = evaluate_points_vectorized(indicateurs_to_frame(indicateurs), PARAMETRES)
+    
+    attendus = [evaluate_indicator(indicateur, PARAMETRES) for indicateur in indicateurs]
+    assert obtenus == pytest.approx(attendus)
+    assert sum(attendus) > 0
+
+def test_scenarios_et_masques_de_validation(indicateurs):
+    patienteles = np.array([0.0, 4000.0, 12000.0])[:, None]
+    nombres_ps = np.array([20.0, 5.0, 16.0])[:, None]
+    taux_dossiers = np.array([0.05, 0.0, 0.3])[:, None]
+    parametres = ParametresCalcul(patientele=patienteles, nombre_ps=nombres_ps, taux_dossiers=taux_dossiers, nb_protocoles=3)
+    est_valide = np.array([
+        [True] * len(indicateurs),
+        [False] * len(indicateurs),
+        [i % 3 == 0 for i in range(len(indicateurs))]
+    ])
+    
+    obtenus = evaluate_points_vectorized(indicateurs_to_frame(indicateurs), parametres, est_valide=est_valide)
+    
+    assert obtenus.shape == (3, len(indicateurs))
+    for ligne in range(3):
+        scenario = ParametresCalcul(
+            patientele=patienteles[ligne, 0], nombre_ps=nombres_ps[ligne, 0],
+            taux_dossiers=taux_dossiers[ligne, 0], nb_protocoles=3
+        )
+        for colonne, indicateur in enumerate(indicateurs):
+            indicateur.est_valide = bool(est_valide[ligne, colonne])
+            assert obtenus[ligne, colonne] == pytest.approx(evaluate_indicator(indicateur, scenario)), (ligne, indicateur.nom)
+
+def test_totaux_par_axe(indicateurs):
+    obtenus = total_points_by_axe_vectorized(indicateurs_to_frame(indicateurs), PARAMETRES)
+    
+    assert set(obtenus) == {indicateur.axe for indicateur in indicateurs}
+    for axe, totaux in obtenus.items():
+        du_axe = [indicateur for indicateur in indicateurs if indicateur.axe == axe]
+        assert totaux["valide"] == pytest.approx(sum(evaluate_indicator(i, PARAMETRES) for i in du_axe))
+        assert totaux["total"] == pytest.approx(sum((i.points_fixes + i.points_variables) * i.prorata for i in du_axe))
+
+def test_simulation_identique_au_calcul_par_scenario(indicateurs):
+    parametres_store.set("nb_protocoles", 4)
+    donnees = load_repartition_data()
+    scenarios = build_scenario_grid((2000, 8000, 15000), (8, 24), (5, 20), (6.5, 7.0), (VALIDATION_ACTUELLE,))
+    
+    # Lots de 5 scénarios : le dernier lot est incomplet
+    resultats, parts = simulate_scenarios(scenarios, donnees=donnees, total_charges=1500.0, taille_lot=5)
+    
+    assert len(resultats) == len(parts) == len(scenarios)
+    noms = {associe.id: f"{associe.prenom} {associe.nom}" for associe in donnees["associes"]}
+    for index, scenario in scenarios.iterrows():
+        parametres = ParametresCalcul(
+            patientele=scenario["patientele"], nombre_ps=scenario["nombre_ps"],
+            taux_dossiers=scenario["taux_dossiers"] / 100, nb_protocoles=4, valeur_point=scenario["valeur_point"]
+        )
+        attendus = calculate_results(donnees, parametres, 1500.0)
+        
+        assert resultats.loc[index, "total_points"] == pytest.approx(attendus["total_points"])
+        assert resultats.loc[index, "net_revenue"] == pytest.approx(attendus["net_revenue"])
+        for associe_id, part in attendus["repartition"].items():
+            assert parts.loc[index, noms[associe_id]] == pytest.approx(part["total"]), (index, associe_id)
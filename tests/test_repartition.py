@@ -0,0 +1,151 @@
+import pytest
+from utils.db_config import Session, get_data_version, get_data_events
+from models import Indicateur, Associe, Repartition, Attribution
+from utils.repartition import load_repartition_data, compute_repartition, sync_attributions
+
+# Points calculés de chaque indicateur ; un indicateur non validé ne rapporte aucun point
+POINTS = {1: 500.0, 2: 300.0, 3: 200.0, 4: 100.0, 5: 0.0}
+NET_REVENUE = 10000.0
+
+@pytest.fixture
+def base_memoire(base_vide):
+    """Base SQLite en mémoire : un gérant pondéré, des indicateurs communs et des attributions par associé."""
+    session = Session()
+    session.add_all([
+        Associe(id=1, nom="Martin", prenom="Anne", fonction="Médecin", est_gerant=True, coefficient_majoration=1.5),
+        Associe(id=2, nom="Durand", prenom="Paul", fonction="IDE", est_gerant=False, coefficient_majoration=1.0),
+        Associe(id=3, nom="Petit", prenom="Lucie", fonction="Kiné", est_gerant=False, coefficient_majoration=1.0)
+    ])
+    session.add_all([
+        Indicateur(id=1, nom="Socle commun", axe="Accès aux soins", type="socle", points_fixes=500, est_valide=True),
+        Indicateur(id=2, nom="Optionnel commun", axe="Accès aux soins", type="optionnel", points_fixes=300, est_valide=True),
+        Indicateur(id=3, nom="Optionnel attribué", axe="Travail en équipe & coordination", type="optionnel", points_fixes=200, est_valide=True),
+        Indicateur(id=4, nom="Prérequis attribué", axe="Système d'information", type="prérequis", points_fixes=100, est_valide=True),
+        Indicateur(id=5, nom="Optionnel non validé", axe="Système d'information", type="optionnel", points_fixes=50, est_valide=False)
+    ])
+    session.add_all([
+        Repartition(indicateur_id=1, est_commun=True),
+        Repartition(indicateur_id=2, est_commun=True),
+        Repartition(indicateur_id=3, est_commun=False),
+        Repartition(indicateur_id=4, est_commun=False),
+        Repartition(indicateur_id=5, est_commun=True)
+    ])
+    
+    # Les indicateurs communs ont une attribution à pourcentage nul pour chaque associé
+    attributions = [(associe_id, indicateur_id, 0) for indicateur_id in (1, 2, 5) for associe_id in (1, 2, 3)]
+    attributions += [(1, 3, 60), (2, 3, 40), (3, 4, 100)]
+    session.add_all([
+        Attribution(associe_id=associe_id, indicateur_id=indicateur_id, pourcentage=pourcentage)
+        for associe_id, indicateur_id, pourcentage in attributions
+    ])
+    session.commit()
+    session.close()
+
+def repartition_boucle(points, net_revenue):
+    """Répartition de référence : boucle par attribution de l'ancienne version de get_associes_repartition."""
+    session = Session()
+    associes = session.query(Associe).all()
+    attributions = session.query(Attribution).all()
+    indicateurs = {i.id: i for i in session.query(Indicateur).all()}
+    
+    if net_revenue <= 0:
+        session.close()
+        return {}
+    
+    points_associes = {associe.id: {"points_fixes": 0, "points_variables": 0} for associe in associes}
+    for attribution in attributions:
+        indicateur = indicateurs.get(attribution.indicateur_id)
+        if indicateur is None or not indicateur.est_valide:
+            continue
+        
+        repartition = session.query(Repartition).filter_by(indicateur_id=indicateur.id).first()
+        if repartition and repartition.est_commun:
+            total_poids = sum(a.coefficient_majoration for a in associes)
+            associe = session.query(Associe).filter_by(id=attribution.associe_id).first()
+            part_points = points[indicateur.id] / total_poids * associe.coefficient_majoration
+        else:
+            part_points = points[indicateur.id] * (attribution.pourcentage / 100)
+        
+        if indicateur.type in ("socle", "prérequis"):
+            points_associes[attribution.associe_id]["points_fixes"] += part_points
+        else:
+            points_associes[attribution.associe_id]["points_variables"] += part_points
+    session.close()
+    
+    points_totaux = sum(p["points_fixes"] + p["points_variables"] for p in points_associes.values())
+    resultats = {}
+    for associe_id, p in points_associes.items():
+        total = p["points_fixes"] + p["points_variables"]
+        montant_total = net_revenue * total / points_totaux
+        resultats[associe_id] = {
+            "part_fixe": montant_total * p["points_fixes"] / total,
+            "part_variable": montant_total * p["points_variables"] / total,
+            "total": montant_total,
+            "pourcentage": total / points_totaux * 100
+        }
+    return resultats
+
+def repartition_matricielle(points, net_revenue):
+    """Répartition calculée par le moteur matriciel à partir des données chargées en une passe."""
+    donnees = load_repartition_data()
+    return compute_repartition(
+        donnees["associes"],
+        donnees["indicateurs"],
+        donnees["attributions"],
+        donnees["repartitions"],
+        points,
+        net_revenue
+    )
+
+def test_repartition_identique_a_la_boucle(base_memoire):
+    attendu = repartition_boucle(POINTS, NET_REVENUE)
+    obtenu = repartition_matricielle(POINTS, NET_REVENUE)
+    
+    assert set(obtenu) == set(attendu) == {1, 2, 3}
+    for associe_id, parts in attendu.items():
+        for champ in ("part_fixe", "part_variable", "total", "pourcentage"):
+            assert obtenu[associe_id][champ] == pytest.approx(parts[champ]), (associe_id, champ)
+
+def test_coefficient_du_gerant_applique(base_memoire):
+    obtenu = repartition_matricielle(POINTS, NET_REVENUE)
+    
+    # Indicateurs communs : le gérant reçoit 1,5 fois la part d'un associé non gérant
+    part_fixe_commune = NET_REVENUE * (500 / 1100)
+    assert obtenu[1]["part_fixe"] == pytest.approx(part_fixe_commune * 1.5 / 3.5)
+    assert obtenu[2]["part_fixe"] == pytest.approx(part_fixe_commune * 1.0 / 3.5)
+    assert sum(parts["total"] for parts in obtenu.values()) == pytest.approx(NET_REVENUE)
+
+def test_revenu_net_negatif_sans_repartition(base_memoire):
+    assert repartition_matricielle(POINTS, -1.0) == repartition_boucle(POINTS, -1.0) == {}
+
+def attributions_enregistrees():
+    """Attributions en base : {(indicateur_id, associe_id): pourcentage}."""
+    session = Session()
+    attributions = {(a.indicateur_id, a.associe_id): a.pourcentage for a in session.query(Attribution).all()}
+    session.close()
+    return attributions
+
+def test_sync_attributions_n_ecrit_que_les_differences(base_memoire):
+    avant = attributions_enregistrees()
+    version = get_data_version()
+    
+    # Indicateur 3 : un pourcentage modifié, un associé retiré, un associé ajouté ; indicateur 4 inchangé
+    assert sync_attributions({3: {1: 50, 3: 50}, 4: {3: 100}}) == 3
+    
+    apres = attributions_enregistrees()
+    assert {cle: pourcentage for cle, pourcentage in apres.items() if cle[0] == 3} == {(3, 1): 50, (3, 3): 50}
+    assert {cle: pourcentage for cle, pourcentage in apres.items() if cle[0] != 3} == {
+        cle: pourcentage for cle, pourcentage in avant.items() if cle[0] != 3
+    }
+    assert get_data_events(version, get_data_version()) == [("repartition",)]
+
+def test_sync_attributions_sans_difference(base_memoire):
+    version = get_data_version()
+    
+    assert sync_attributions({3: {1: 60, 2: 40}, 4: {3: 100}}) == 0
+    assert sync_attributions({}) == 0
+    assert get_data_version() == version
+
+def test_sync_attributions_vide_un_indicateur(base_memoire):
+    assert sync_attributions({1: {}}) == 3
+    assert not any(indicateur_id == 1 for indicateur_id, _ in attributions_enregistrees())
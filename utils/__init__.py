@@ -1,3 +1,3 @@
 # Ce fichier permet d'importer facilement les fonctions utilitaires
-from utils.db_config import init_db, get_session, execute_query
+from utils.db_config import init_db, migrate_db, get_schema_version, get_session, execute_query, get_data_version, bump_data_version, get_data_events, configure_db, dispose_engine, checkpoint_db, delete_db_files, get_structure_id, set_structure_id, structure_active
 from utils.init_data import initialize_all_data, init_parametres, init_indicateurs
@@ -0,0 +1,46 @@
+import os
+import re
+from functools import lru_cache
+
+# Dossier servi par Streamlit sous l'URL app/static (server.enableStaticServing)
+DOSSIER_STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+URL_STATIC = "app/static"
+
+# Feuilles de style de l'application, dans leur ordre d'injection
+FEUILLES_DE_STYLE = ("interface.css", "style.css")
+
+# Chaînes entre guillemets, recopiées telles quelles par la minification
+_CHAINES = re.compile(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')')
+
+def minify_css(css):
+    """Retire les commentaires et les espaces superflus d'une feuille de style."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    
+    morceaux = _CHAINES.split(css)
+    for i in range(0, len(morceaux), 2):
+        morceau = re.sub(r"\s+", " ", morceaux[i])
+        morceau = re.sub(r"\s*([{};,>])\s*", r"\1", morceau)
+        morceau = re.sub(r":\s+", ":", morceau)
+        morceaux[i] = morceau.replace(";}", "}")
+    
+    return "".join(morceaux).strip()
+
+@lru_cache(maxsize=None)
+def load_stylesheet(nom):
+    """Lit et minifie une feuille de style de static/css, une seule fois par processus."""
+    with open(os.path.join(DOSSIER_STATIC, 'css', nom), 'r', encoding='utf-8') as f:
+        return minify_css(f.read())
+
+@lru_cache(maxsize=None)
+def get_styles_html(noms=FEUILLES_DE_STYLE):
+    """Retourne la balise <style> unique regroupant les feuilles de style données."""
+    return "<style>" + "".join(load_stylesheet(nom) for nom in noms) + "</style>"
+
+@lru_cache(maxsize=None)
+def get_logo_url(nom="logo.png"):
+    """Retourne l'URL statique du logo, ou None si le fichier est absent ou vide."""
+    chemin = os.path.join(DOSSIER_STATIC, 'images', nom)
+    if not os.path.isfile(chemin) or os.path.getsize(chemin) == 0:
+        return None
+    
+    return f"{URL_STATIC}/images/{nom}"
@@ -0,0 +1,171 @@
+# Calcul des revenus ACI en ligne de commande, sans Streamlit, pour un ensemble de structures.
+#
+# Exemple : python -m utils.batch data/*.db --sortie rapport_aci.parquet --processus 8
+import os
+import sys
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from utils import db_config
+from utils.db_config import init_db, structure_active
+from utils.param_store import parametres_store
+from utils.points import load_calculation_parameters
+from utils.repartition import load_repartition_data, calculate_results
+from utils.charges import calculate_charges_total
+from utils.structures import list_structures
+
+# Nombre de structures transmises à la fois à chaque processus
+TAILLE_LOT_BATCH = 8
+
+COLONNES_RESUME = [
+    "base", "structure_id", "structure", "annee", "associes",
+    "total_points", "total_aci", "total_charges", "net_revenue", "erreur"
+]
+COLONNES_ASSOCIES = [
+    "base", "structure_id", "structure", "associe_id", "associe",
+    "fonction", "est_gerant", "part_fixe", "part_variable", "total", "pourcentage"
+]
+
+def list_batch_tasks(chemins_bases, structure_ids=None):
+    """Liste les structures à calculer, sous forme de tuples (base, structure_id, nom).
+    
+    Le schéma de chaque base est mis à jour au passage, une seule fois et avant le
+    lancement des calculs en parallèle.
+    """
+    taches = []
+    for chemin in chemins_bases:
+        _utiliser_base(chemin)
+        init_db()
+        for structure in list_structures():
+            if structure_ids is None or structure.id in structure_ids:
+                taches.append((chemin, structure.id, structure.nom))
+    
+    # Les processus de calcul ouvriront leurs propres connexions
+    db_config.dispose_engine()
+    return taches
+
+def _utiliser_base(chemin):
+    """Fait pointer le processus courant vers une base, si ce n'est pas déjà le cas."""
+    if os.path.abspath(db_config.DB_PATH) != os.path.abspath(chemin):
+        db_config.configure_db(chemin)
+        # Les paramètres en cache sont indexés par structure, pas par base
+        parametres_store.invalider()
+
+def _initialiser_processus():
+    """Abandonne les connexions héritées du processus parent."""
+    db_config.engine.dispose(close=False)
+
+def calculate_structure(tache):
+    """Calcule les points, revenus et la répartition d'une structure.
+    
+    Retourne la ligne de résumé de la structure et les lignes de ses associés ; une
+    erreur de calcul est reportée dans la colonne `erreur` sans interrompre le lot.
+    """
+    chemin, structure_id, nom = tache
+    resume = {"base": chemin, "structure_id": structure_id, "structure": nom, "erreur": None}
+    
+    try:
+        _utiliser_base(chemin)
+        with structure_active(structure_id):
+            donnees = load_repartition_data()
+            parametres = load_calculation_parameters()
+            total_charges = calculate_charges_total()
+            annee = parametres_store.get("annee_en_cours")
+        
+        resultats = calculate_results(donnees, parametres, total_charges)
+    except Exception as e:
+        resume["erreur"] = str(e)
+        return resume, []
+    
+    resume.update({
+        "annee": annee,
+        "associes": len(donnees["associes"]),
+        "total_points": resultats["total_points"],
+        "total_aci": resultats["total_aci"],
+        "total_charges": total_charges,
+        "net_revenue": resultats["net_revenue"]
+    })
+    associes = [
+        {
+            "base": chemin,
+            "structure_id": structure_id,
+            "structure": nom,
+            "associe_id": associe_id,
+            "associe": part["nom"],
+            "fonction": part["fonction"],
+            "est_gerant": part["est_gerant"],
+            "part_fixe": part["part_fixe"],
+            "part_variable": part["part_variable"],
+            "total": part["total"],
+            "pourcentage": part["pourcentage"]
+        }
+        for associe_id, part in resultats["repartition"].items()
+    ]
+    return resume, associes
+
+def run_batch(chemins_bases, structure_ids=None, processus=None):
+    """Calcule toutes les structures des bases indiquées, en parallèle sur plusieurs processus.
+    
+    Retourne deux DataFrame : le résumé par structure et les parts des associés.
+    """
+    taches = list_batch_tasks(chemins_bases, structure_ids)
+    
+    if processus == 1 or len(taches) <= 1:
+        resultats = [calculate_structure(tache) for tache in taches]
+    else:
+        with ProcessPoolExecutor(max_workers=processus, initializer=_initialiser_processus) as executeur:
+            resultats = list(executeur.map(calculate_structure, taches, chunksize=TAILLE_LOT_BATCH))
+    
+    resume = pd.DataFrame([ligne for ligne, _ in resultats], columns=COLONNES_RESUME)
+    associes = pd.DataFrame([ligne for _, lignes in resultats for ligne in lignes], columns=COLONNES_ASSOCIES)
+    return resume, associes
+
+def write_report(resume, associes, sortie):
+    """Écrit le rapport en Parquet ou en CSV selon l'extension du fichier de sortie.
+    
+    Les parts des associés sont écrites à côté, dans un fichier suffixé par « _associes ».
+    Retourne les chemins des fichiers écrits.
+    """
+    racine, extension = os.path.splitext(sortie)
+    chemin_associes = f"{racine}_associes{extension}"
+    
+    if extension.lower() == ".parquet":
+        resume.to_parquet(sortie, index=False)
+        associes.to_parquet(chemin_associes, index=False)
+    else:
+        resume.to_csv(sortie, index=False)
+        associes.to_csv(chemin_associes, index=False)
+    
+    return sortie, chemin_associes
+
+def main(arguments=None):
+    """Point d'entrée de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Calcul des revenus ACI d'un ensemble de structures.")
+    parser.add_argument("bases", nargs="*", default=[db_config.DB_PATH], help="Fichiers de base de données à traiter")
+    parser.add_argument("--sortie", default="rapport_aci.csv", help="Fichier de rapport (.csv ou .parquet)")
+    parser.add_argument("--structures", type=int, nargs="+", help="Identifiants des structures à calculer (toutes par défaut)")
+    parser.add_argument("--processus", type=int, default=None, help="Nombre de processus (tous les cœurs par défaut)")
+    options = parser.parse_args(arguments)
+    
+    manquantes = [chemin for chemin in options.bases if not os.path.exists(chemin)]
+    if manquantes:
+        parser.error(f"Base(s) introuvable(s) : {', '.join(manquantes)}")
+    
+    debut = time.perf_counter()
+    resume, associes = run_batch(options.bases, options.structures, options.processus)
+    
+    try:
+        fichiers = write_report(resume, associes, options.sortie)
+    except ImportError:
+        parser.error("L'écriture en Parquet nécessite le paquet pyarrow (pip install pyarrow).")
+    
+    nb_erreurs = int(resume["erreur"].notna().sum())
+    print(
+        f"{len(resume)} structure(s) calculée(s) en {time.perf_counter() - debut:.1f} s, "
+        f"{nb_erreurs} en erreur. Rapport : {', '.join(fichiers)}"
+    )
+    return 1 if nb_erreurs else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# Mesure du temps de démarrage de l'application : délai jusqu'au premier affichage.
+#
+# Chaque mesure est faite dans un nouveau processus Python, comme au lancement du serveur,
+# sur une copie temporaire de l'arborescence de l'application et de sa base de données : une
+# version qui ignore ACI_DB_PATH (comme la version initiale) utilise ainsi data/aci_app.db
+# de la copie, jamais celle de son dépôt. Pour comparer deux versions de l'application :
+#   python -m utils.benchmark_demarrage
+#   python -m utils.benchmark_demarrage --app /chemin/vers/autre/version/app.py
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Programme exécuté dans chaque processus de mesure. Streamlit est chargé et initialisé
+# (exécution d'un script vide) avant le chronomètre, comme le fait le serveur à son lancement
+MESURE = """
+import sys, json, time
+from streamlit.testing.v1 import AppTest
+
+AppTest.from_string("", default_timeout=120).run()
+
+debut = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+premier_affichage = time.perf_counter() - debut
+
+debut = time.perf_counter()
+at.run()
+relance = time.perf_counter() - debut
+
+print(json.dumps({
+    "premier_affichage": premier_affichage,
+    "relance": relance,
+    "modules": len(sys.modules),
+    "erreurs": len(at.exception)
+}))
+"""
+
+# Fichiers de l'arborescence inutiles aux mesures
+FICHIERS_IGNORES = shutil.ignore_patterns(".git", "__pycache__", "*.pdf", "*.xlsx", "*.db-wal", "*.db-shm")
+
+def copier_application(app, base, dossier):
+    """Copie l'arborescence de l'application et la base de données ; retourne le chemin du script copié."""
+    copie = os.path.join(dossier, "application")
+    shutil.copytree(os.path.dirname(app), copie, ignore=FICHIERS_IGNORES)
+    os.makedirs(os.path.join(copie, "data"), exist_ok=True)
+    shutil.copyfile(base, os.path.join(copie, "data", "aci_app.db"))
+    return os.path.join(copie, os.path.basename(app))
+
+def mesurer(app, base, repetitions):
+    """Lance les mesures et retourne la liste des résultats de chaque processus."""
+    environnement = {**os.environ, "ACI_DB_PATH": base, "PYTHONPATH": os.path.dirname(app)}
+    resultats = []
+    for _ in range(repetitions):
+        sortie = subprocess.run(
+            [sys.executable, "-c", MESURE, app],
+            cwd=os.path.dirname(app),
+            env=environnement,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        resultats.append(json.loads(sortie.stdout.strip().splitlines()[-1]))
+    return resultats
+
+def main(arguments=None):
+    """Point d'entrée de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Mesure du temps de démarrage de l'application.")
+    parser.add_argument("--app", default=os.path.join(RACINE, "app.py"), help="Script de l'application à mesurer")
+    parser.add_argument("--base", default=os.path.join(RACINE, "data", "aci_app.db"), help="Base de données copiée pour les mesures")
+    parser.add_argument("--repetitions", type=int, default=5, help="Nombre de processus mesurés")
+    options = parser.parse_args(arguments)
+    
+    with tempfile.TemporaryDirectory() as dossier:
+        app = copier_application(os.path.abspath(options.app), options.base, dossier)
+        base = os.path.join(os.path.dirname(app), "data", "aci_app.db")
+        
+        # Un premier lancement, non compté, met à jour le schéma de la copie
+        mesurer(app, base, 1)
+        resultats = mesurer(app, base, options.repetitions)
+    
+    for cle, libelle in (("premier_affichage", "Premier affichage"), ("relance", "Réexécution")):
+        durees = [r[cle] * 1000 for r in resultats]
+        print(f"{libelle} : médiane {statistics.median(durees):.0f} ms, min {min(durees):.0f} ms, max {max(durees):.0f} ms")
+    print(f"Modules chargés : {resultats[-1]['modules']}, erreurs : {max(r['erreurs'] for r in resultats)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import time
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from datetime import datetime
+from sqlalchemy import insert, func
+from models import Charge
+from utils import db_config
+from utils.db_config import get_session
+
+# Catégorie attribuée aux charges importées sans catégorie
+CATEGORIE_DEFAUT = "Autres"
+
+# Libellés utilisés dans les regroupements pour les charges sans catégorie ou sans date
+CATEGORIE_VIDE = "Non catégorisé"
+PERIODE_VIDE = "Non datée"
+
+# Format des dates attendu dans les fichiers d'import
+FORMAT_DATE_IMPORT = "%d/%m/%Y"
+
+# Nombre de lignes insérées par requête lors d'un import
+TAILLE_LOT_IMPORT = 5000
+
+# Nombre de charges affichées par page
+TAILLE_PAGE_CHARGES = 50
+
+@dataclass
+class ResultatImport:
+    """Bilan d'un import de charges."""
+    nb_lignes: int = 0
+    nb_importees: int = 0
+    rejets: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=["ligne", "motif"]))
+    duree: float = 0.0
+
+    @property
+    def nb_rejetees(self):
+        """Retourne le nombre de lignes rejetées."""
+        return len(self.rejets)
+
+    @property
+    def debit(self):
+        """Retourne le nombre de lignes traitées par seconde."""
+        return self.nb_lignes / self.duree if self.duree > 0 else 0.0
+
+def read_charges_file(fichier, nom_fichier=None):
+    """Lit un fichier de charges CSV ou Excel (.xlsx) dans un DataFrame."""
+    nom_fichier = (nom_fichier or getattr(fichier, "name", "") or "").lower()
+    if nom_fichier.endswith(".xlsx"):
+        return pd.read_excel(fichier, engine="openpyxl")
+    
+    # Valeurs lues telles quelles : pandas lirait sinon 1.234 comme un nombre décimal
+    # sans que son ambiguïté puisse être détectée
+    return pd.read_csv(fichier, sep=",", dtype=str)
+
+# Montants texte dont les séparateurs admettent deux lectures : virgule avant le point
+# (1,234.56 en notation anglaise) ou point unique suivi de trois chiffres (1.234)
+MOTIF_MONTANT_ANGLAIS = r",.*\."
+MOTIF_MONTANT_MILLIERS = r"[+-]?[1-9]\d{0,2}\.\d{3}"
+
+def _parse_montants(colonne):
+    """Convertit une colonne de montants en nombres.
+    
+    Retourne les montants (NaN pour les valeurs illisibles ou ambiguës) et le masque
+    des valeurs ambiguës, qui sont rejetées plutôt que devinées.
+    """
+    if pd.api.types.is_numeric_dtype(colonne):
+        return pd.to_numeric(colonne, errors="coerce").astype(float), pd.Series(False, index=colonne.index)
+    
+    # Retirer espaces et symbole monétaire
+    texte = colonne.astype("string").str.replace(r"[\s€]", "", regex=True)
+    
+    # Seules les cellules saisies comme texte peuvent être ambiguës : les nombres d'un fichier
+    # Excel sont déjà typés
+    est_texte = colonne.map(lambda v: isinstance(v, str)).astype(bool)
+    ambigus = est_texte & (
+        texte.str.contains(MOTIF_MONTANT_ANGLAIS, regex=True) | texte.str.fullmatch(MOTIF_MONTANT_MILLIERS)
+    ).fillna(False).astype(bool)
+    
+    # Virgule décimale (1 234,56 ou 1.234,56)
+    virgule = texte.str.contains(",", regex=False).fillna(False)
+    texte = texte.where(~virgule, texte.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    montants = pd.to_numeric(texte, errors="coerce").astype(float).mask(ambigus)
+    return montants, ambigus
+
+def _parse_dates(colonne):
+    """Convertit une colonne de dates JJ/MM/AAAA (ou déjà typées) en dates, NaT si illisibles."""
+    if pd.api.types.is_datetime64_any_dtype(colonne):
+        return colonne
+    
+    dates = pd.to_datetime(colonne.astype("string"), format=FORMAT_DATE_IMPORT, errors="coerce")
+    
+    # Les fichiers Excel peuvent contenir des cellules déjà au format date
+    cellules_dates = colonne.map(lambda v: isinstance(v, datetime)).astype(bool)
+    if cellules_dates.any():
+        dates[cellules_dates] = pd.to_datetime(colonne[cellules_dates])
+    return dates
+
+def prepare_charges(df):
+    """Valide et convertit un DataFrame de charges par opérations sur colonnes.
+    
+    Retourne le DataFrame des charges valides (libelle, montant, categorie, date_saisie),
+    celui des lignes rejetées avec leur motif (numéros de ligne du fichier) et le nombre
+    de lignes lues.
+    """
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    nb_lignes = len(df)
+    
+    libelles = df["libelle"].astype("string").str.strip()
+    montants, montants_ambigus = _parse_montants(df["montant"])
+    
+    if "categorie" in df.columns:
+        categories = df["categorie"].astype("string").str.strip().replace("", pd.NA).fillna(CATEGORIE_DEFAUT)
+    else:
+        categories = pd.Series(CATEGORIE_DEFAUT, index=df.index, dtype="string")
+    
+    if "date_saisie" in df.columns:
+        date_renseignee = df["date_saisie"].notna() & (df["date_saisie"].astype("string").str.strip() != "")
+        dates = _parse_dates(df["date_saisie"])
+    else:
+        date_renseignee = pd.Series(False, index=df.index)
+        dates = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    
+    # Motif de rejet de chaque ligne (le premier problème rencontré)
+    motifs = np.select(
+        [
+            (libelles.isna() | (libelles == "")).to_numpy(dtype=bool),
+            montants_ambigus.to_numpy(dtype=bool),
+            ~np.isfinite(montants.to_numpy()),
+            (date_renseignee & dates.isna()).to_numpy(dtype=bool)
+        ],
+        [
+            "Libellé manquant",
+            "Montant ambigu (séparateurs de milliers et de décimales)",
+            "Montant invalide",
+            "Date invalide (format attendu JJ/MM/AAAA)"
+        ],
+        default=""
+    )
+    est_valide = motifs == ""
+    
+    # En l'absence de date, la charge est datée du jour de l'import
+    aujourd_hui = datetime.now().date()
+    valides = pd.DataFrame({
+        "libelle": libelles[est_valide].astype(object),
+        "montant": montants[est_valide],
+        "categorie": categories[est_valide].astype(object),
+        "date_saisie": [d.date() if pd.notna(d) else aujourd_hui for d in dates[est_valide]]
+    })
+    
+    # Numéro de ligne dans le fichier (en-tête en ligne 1)
+    rejets = pd.DataFrame({
+        "ligne": np.flatnonzero(~est_valide) + 2,
+        "motif": motifs[~est_valide]
+    })
+    
+    return valides.reset_index(drop=True), rejets, nb_lignes
+
+def insert_charges(valides, taille_lot=TAILLE_LOT_IMPORT):
+    """Insère les charges par lots dans une seule transaction et retourne le nombre inséré."""
+    enregistrements = valides.to_dict("records")
+    requete = insert(Charge.__table__)
+    
+    with db_config.engine.begin() as connexion:
+        for debut in range(0, len(enregistrements), taille_lot):
+            connexion.execute(requete, enregistrements[debut:debut + taille_lot])
+    
+    return len(enregistrements)
+
+def import_charges(df, taille_lot=TAILLE_LOT_IMPORT):
+    """Importe un DataFrame de charges : les lignes invalides sont écartées et signalées."""
+    debut = time.perf_counter()
+    
+    valides, rejets, nb_lignes = prepare_charges(df)
+    nb_importees = insert_charges(valides, taille_lot) if len(valides) else 0
+    
+    return ResultatImport(
+        nb_lignes=nb_lignes,
+        nb_importees=nb_importees,
+        rejets=rejets,
+        duree=time.perf_counter() - debut
+    )
+
+def calculate_charges_total():
+    """Calcule le total des charges par une somme SQL."""
+    session = get_session()
+    total = session.query(func.coalesce(func.sum(Charge.montant), 0.0)).scalar()
+    session.close()
+    
+    return total
+
+def _sommes_par(cle):
+    """Retourne un dictionnaire {clé: total des charges} calculé par GROUP BY."""
+    session = get_session()
+    lignes = (
+        session.query(cle.label("cle"), func.sum(Charge.montant))
+        .group_by("cle")
+        .order_by("cle")
+        .all()
+    )
+    session.close()
+    
+    return {cle: total for cle, total in lignes}
+
+def get_charges_by_category():
+    """Retourne le total des charges par catégorie."""
+    return _sommes_par(func.coalesce(func.nullif(Charge.categorie, ""), CATEGORIE_VIDE))
+
+def get_charges_by_month():
+    """Retourne le total des charges par mois (clé AAAA-MM)."""
+    return _sommes_par(func.coalesce(func.strftime("%Y-%m", Charge.date_saisie), PERIODE_VIDE))
+
+def get_charges_by_year():
+    """Retourne le total des charges par année (clé AAAA)."""
+    return _sommes_par(func.coalesce(func.strftime("%Y", Charge.date_saisie), PERIODE_VIDE))
+
+@dataclass(frozen=True)
+class FiltresCharges:
+    """Critères de recherche des charges, appliqués par la base de données."""
+    date_debut: object = None
+    date_fin: object = None
+    categories: tuple = ()
+    montant_min: float = None
+    montant_max: float = None
+    recherche: str = ""
+
+def _filtrer_charges(requete, filtres):
+    """Ajoute à une requête les conditions SQL correspondant aux filtres."""
+    if filtres.date_debut is not None:
+        requete = requete.filter(Charge.date_saisie >= filtres.date_debut)
+    if filtres.date_fin is not None:
+        requete = requete.filter(Charge.date_saisie <= filtres.date_fin)
+    if filtres.categories:
+        requete = requete.filter(Charge.categorie.in_(filtres.categories))
+    if filtres.montant_min is not None:
+        requete = requete.filter(Charge.montant >= filtres.montant_min)
+    if filtres.montant_max is not None:
+        requete = requete.filter(Charge.montant <= filtres.montant_max)
+    if filtres.recherche:
+        # Échapper les caractères spéciaux de LIKE saisis par l'utilisateur
+        motif = filtres.recherche.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        requete = requete.filter(Charge.libelle.ilike(f"%{motif}%", escape="\\"))
+    return requete
+
+def count_charges(filtres=FiltresCharges()):
+    """Retourne le nombre et le montant total des charges correspondant aux filtres."""
+    session = get_session()
+    nombre, total = _filtrer_charges(
+        session.query(func.count(Charge.id), func.coalesce(func.sum(Charge.montant), 0.0)),
+        filtres
+    ).one()
+    session.close()
+    
+    return nombre, total
+
+def get_charges_page(filtres=FiltresCharges(), apres_id=None, taille=TAILLE_PAGE_CHARGES):
+    """Retourne une page de charges triées par identifiant (pagination par clé).
+    
+    La page commence après la charge `apres_id` : la requête parcourt l'index de la clé
+    primaire au lieu de sauter les lignes précédentes comme le ferait un OFFSET.
+    """
+    session = get_session()
+    requete = _filtrer_charges(session.query(Charge), filtres)
+    if apres_id is not None:
+        requete = requete.filter(Charge.id > apres_id)
+    charges = requete.order_by(Charge.id).limit(taille).all()
+    session.close()
+    
+    return charges
+
+def get_charges_categories():
+    """Retourne les catégories distinctes des charges enregistrées."""
+    session = get_session()
+    categories = [
+        categorie for (categorie,) in
+        session.query(Charge.categorie).filter(Charge.categorie.isnot(None)).distinct().order_by(Charge.categorie)
+    ]
+    session.close()
+    
+    return categories
@@ -0,0 +1,205 @@
+import streamlit as st
+from models import Associe
+from utils.db_config import get_session, get_data_version, get_structure_id
+from utils.points import load_indicateurs, load_calculation_parameters
+from utils.helpers import calculate_charges_total
+from utils.resultats import load_results
+from utils.repartition import load_repartition_config
+from utils.charges import (
+    get_charges_by_category,
+    get_charges_by_month,
+    get_charges_by_year,
+    get_charges_page,
+    count_charges,
+    get_charges_categories,
+    TAILLE_PAGE_CHARGES
+)
+
+# Les caches sont indexés par la version des données et par la structure courante : toute
+# écriture incrémente la version, de sorte que les entrées obsolètes ne sont plus jamais
+# relues puis sont évincées.
+# Les résultats calculés (points, totaux, répartition) sont lus dans les tables de résultats
+# matérialisés ; lorsque l'empreinte des données d'entrée change, ils sont réécrits à partir
+# du graphe de calcul, mis à jour incrémentalement (voir GrapheCalcul.synchroniser).
+# Les modules propres à certaines pages (simulation, historique, structures, indicateurs
+# clés) ne sont importés qu'au premier appel de leur chargeur, pour ne pas ralentir le
+# démarrage de l'application.
+MAX_VERSIONS = 4
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _indicateurs(version, structure_id):
+    return load_indicateurs()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _associes(version, structure_id):
+    session = get_session()
+    associes = session.query(Associe).all()
+    session.close()
+    return associes
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS * 8)
+def _page_charges(version, structure_id, filtres, apres_id, taille):
+    return get_charges_page(filtres, apres_id, taille)
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS * 8)
+def _nombre_charges(version, structure_id, filtres):
+    return count_charges(filtres)
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _categories_charges(version, structure_id):
+    return get_charges_categories()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _charges_total(version, structure_id):
+    return calculate_charges_total()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _charges_par_categorie(version, structure_id):
+    return get_charges_by_category()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _charges_par_mois(version, structure_id):
+    return get_charges_by_month()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _charges_par_annee(version, structure_id):
+    return get_charges_by_year()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _parametres_calcul(version, structure_id):
+    return load_calculation_parameters()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS * 4)
+def _simulation(version, structure_id, patienteles, nombres_ps, taux_dossiers, valeurs_point, jeux_validation):
+    from utils.simulation import build_scenario_grid, simulate_scenarios
+    scenarios = build_scenario_grid(patienteles, nombres_ps, taux_dossiers, valeurs_point, jeux_validation)
+    return simulate_scenarios(scenarios)
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _structures(version):
+    from utils.structures import list_structures
+    return list_structures()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _consolidation(version):
+    from utils.structures import get_consolidation
+    return get_consolidation()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _historique(version, structure_id):
+    from utils.historique import get_history
+    return get_history()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS * 4)
+def _comparaison_annees(version, structure_id, annee_a, annee_b):
+    from utils.historique import compare_years
+    return compare_years(annee_a, annee_b)
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _configuration_repartition(version, structure_id):
+    return load_repartition_config()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _resultats(version, structure_id):
+    return load_results()
+
+@st.cache_data(show_spinner=False, max_entries=MAX_VERSIONS)
+def _kpi(version, structure_id):
+    from utils.kpi import build_kpi_snapshot
+    return build_kpi_snapshot(_resultats(version, structure_id), _parametres_calcul(version, structure_id))
+
+def get_indicateurs():
+    """Retourne la liste des indicateurs (mise en cache)."""
+    return _indicateurs(get_data_version(), get_structure_id())
+
+def get_associes():
+    """Retourne la liste des associés (mise en cache)."""
+    return _associes(get_data_version(), get_structure_id())
+
+def get_configuration_repartition():
+    """Retourne le mode de répartition et les attributions de chaque indicateur (mis en cache)."""
+    return _configuration_repartition(get_data_version(), get_structure_id())
+
+def get_page_charges(filtres, apres_id=None, taille=TAILLE_PAGE_CHARGES):
+    """Retourne une page de charges filtrées (mise en cache)."""
+    return _page_charges(get_data_version(), get_structure_id(), filtres, apres_id, taille)
+
+def get_nombre_charges(filtres):
+    """Retourne le nombre et le total des charges filtrées (mis en cache)."""
+    return _nombre_charges(get_data_version(), get_structure_id(), filtres)
+
+def get_categories_charges():
+    """Retourne les catégories des charges enregistrées (mises en cache)."""
+    return _categories_charges(get_data_version(), get_structure_id())
+
+def get_charges_total():
+    """Retourne le total des charges (mis en cache)."""
+    return _charges_total(get_data_version(), get_structure_id())
+
+def get_charges_par_categorie():
+    """Retourne le total des charges par catégorie (mis en cache)."""
+    return _charges_par_categorie(get_data_version(), get_structure_id())
+
+def get_charges_par_mois():
+    """Retourne le total des charges par mois (mis en cache)."""
+    return _charges_par_mois(get_data_version(), get_structure_id())
+
+def get_charges_par_annee():
+    """Retourne le total des charges par année (mis en cache)."""
+    return _charges_par_annee(get_data_version(), get_structure_id())
+
+def get_parametres_calcul():
+    """Retourne l'instantané des paramètres de calcul (mis en cache)."""
+    return _parametres_calcul(get_data_version(), get_structure_id())
+
+def get_resultats():
+    """Retourne l'ensemble des résultats calculés (résultats matérialisés, mis en cache)."""
+    return _resultats(get_data_version(), get_structure_id())
+
+def get_points_indicateurs():
+    """Retourne les points calculés de chaque indicateur (résultats matérialisés)."""
+    return get_resultats()["points"]
+
+def get_points_par_axe():
+    """Retourne les points validés et potentiels par axe (résultats matérialisés)."""
+    return get_resultats()["par_axe"]
+
+def get_total_aci():
+    """Retourne le revenu total ACI en euros (résultats matérialisés)."""
+    return get_resultats()["total_aci"]
+
+def get_kpi_snapshot():
+    """Retourne l'instantané des indicateurs clés : points par axe, revenus, charges et taux (mis en cache)."""
+    return _kpi(get_data_version(), get_structure_id())
+
+def get_repartition_associes():
+    """Retourne la répartition des revenus entre associés (résultats matérialisés)."""
+    return get_resultats()["repartition"]
+
+def get_simulation(patienteles, nombres_ps, taux_dossiers, valeurs_point, jeux_validation):
+    """Retourne les résultats et les parts des associés d'une grille de scénarios (mis en cache)."""
+    return _simulation(
+        get_data_version(),
+        get_structure_id(),
+        tuple(patienteles),
+        tuple(nombres_ps),
+        tuple(taux_dossiers),
+        tuple(valeurs_point),
+        tuple(jeux_validation)
+    )
+
+def get_structures():
+    """Retourne la liste des structures (mise en cache)."""
+    return _structures(get_data_version())
+
+def get_consolidation_structures():
+    """Retourne les résultats consolidés de toutes les structures (mis en cache)."""
+    return _consolidation(get_data_version())
+
+def get_historique():
+    """Retourne les totaux des années clôturées (mis en cache)."""
+    return _historique(get_data_version(), get_structure_id())
+
+def get_comparaison_annees(annee_a, annee_b):
+    """Retourne la comparaison détaillée de deux années clôturées (mise en cache)."""
+    return _comparaison_annees(get_data_version(), get_structure_id(), annee_a, annee_b)
@@ -1,38 +1,343 @@
 import os
-import sqlite3
-from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, Float, Boolean, Date, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+import threading
+import collections
+import contextlib
+import contextvars
+from sqlalchemy import create_engine, event, MetaData, Table, Column, Integer, String, Float, Boolean, Date, ForeignKey
+from sqlalchemy.ext.declarative import declarative_base, declared_attr
+from sqlalchemy.orm import sessionmaker, relationship, with_loader_criteria
+from sqlalchemy.pool import QueuePool
+from utils.formules import registre_formules
 
-# Chemin vers le fichier de base de données
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'aci_app.db')
+# Chemin vers le fichier de base de données (surchargeable par ACI_DB_PATH)
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'aci_app.db')
+DB_PATH = os.environ.get("ACI_DB_PATH", DEFAULT_DB_PATH)
+
+def _env_bool(nom, defaut):
+    """Lit un booléen dans une variable d'environnement."""
+    valeur = os.environ.get(nom)
+    if valeur is None:
+        return defaut
+    return valeur.strip().lower() in ("1", "true", "yes", "oui", "on")
+
+def _env_int(nom, defaut):
+    """Lit un entier dans une variable d'environnement."""
+    try:
+        return int(os.environ.get(nom, defaut))
+    except (TypeError, ValueError):
+        return defaut
+
+# Configuration de la connexion, modifiable par variables d'environnement
+DB_CONFIG = {
+    "echo": _env_bool("ACI_DB_ECHO", False),
+    "pool_size": _env_int("ACI_DB_POOL_SIZE", 5),
+    "max_overflow": _env_int("ACI_DB_MAX_OVERFLOW", 10),
+    "busy_timeout": _env_int("ACI_DB_BUSY_TIMEOUT", 30),
+    "journal_mode": os.environ.get("ACI_DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("ACI_DB_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": _env_int("ACI_DB_MMAP_SIZE", 256 * 1024 * 1024),
+    "cache_size": _env_int("ACI_DB_CACHE_SIZE", -64000),  # Négatif : taille en Kio
+    "temp_store": os.environ.get("ACI_DB_TEMP_STORE", "MEMORY")
+}
+
+def _appliquer_pragmas(dbapi_connection, connection_record):
+    """Applique les réglages SQLite à chaque nouvelle connexion du pool."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={DB_CONFIG['journal_mode']}")
+    cursor.execute(f"PRAGMA synchronous={DB_CONFIG['synchronous']}")
+    cursor.execute(f"PRAGMA mmap_size={int(DB_CONFIG['mmap_size'])}")
+    cursor.execute(f"PRAGMA cache_size={int(DB_CONFIG['cache_size'])}")
+    cursor.execute(f"PRAGMA temp_store={DB_CONFIG['temp_store']}")
+    cursor.close()
+
+def create_db_engine(db_path):
+    """Crée un moteur SQLAlchemy avec pool de connexions et réglages SQLite."""
+    moteur = create_engine(
+        f'sqlite:///{db_path}',
+        echo=DB_CONFIG["echo"],
+        poolclass=QueuePool,
+        pool_size=DB_CONFIG["pool_size"],
+        max_overflow=DB_CONFIG["max_overflow"],
+        # Les connexions du pool sont partagées entre les threads des sessions Streamlit
+        connect_args={"check_same_thread": False, "timeout": DB_CONFIG["busy_timeout"]}
+    )
+    event.listen(moteur, "connect", _appliquer_pragmas)
+    return moteur
 
 # Création du moteur SQLAlchemy
-engine = create_engine(f'sqlite:///{DB_PATH}', echo=True)
+engine = create_db_engine(DB_PATH)
 Base = declarative_base()
 Session = sessionmaker(bind=engine)
 
+# Structure (SISA) courante : chaque session Streamlit s'exécutant dans son propre thread,
+# la valeur est propre à la session en cours
+STRUCTURE_PAR_DEFAUT = 1
+NOM_STRUCTURE_PAR_DEFAUT = "Structure principale"
+_structure_courante = contextvars.ContextVar("structure_courante", default=STRUCTURE_PAR_DEFAUT)
+
+def get_structure_id():
+    """Retourne l'identifiant de la structure courante."""
+    return _structure_courante.get()
+
+def set_structure_id(structure_id):
+    """Définit la structure courante pour la suite de l'exécution."""
+    _structure_courante.set(structure_id)
+
+@contextlib.contextmanager
+def structure_active(structure_id):
+    """Exécute un bloc dans le contexte d'une structure donnée."""
+    jeton = _structure_courante.set(structure_id)
+    try:
+        yield
+    finally:
+        _structure_courante.reset(jeton)
+
+class StructureMixin:
+    """Rattache un modèle à une structure.
+    
+    Les requêtes ORM sur ces modèles sont filtrées sur la structure courante et les
+    nouvelles lignes lui sont rattachées ; l'option d'exécution `toutes_structures`
+    désactive le filtre pour les vues consolidées.
+    """
+
+    @declared_attr
+    def structure_id(cls):
+        return Column(Integer, ForeignKey('structures.id'), nullable=False, default=get_structure_id, index=True)
+
+@event.listens_for(Session, "do_orm_execute")
+def _filtrer_par_structure(etat):
+    """Restreint les requêtes ORM aux lignes de la structure courante."""
+    if etat.execution_options.get("toutes_structures", False):
+        return
+    
+    if (etat.is_select and not etat.is_column_load and not etat.is_relationship_load) or etat.is_update or etat.is_delete:
+        structure_id = get_structure_id()
+        etat.statement = etat.statement.options(
+            with_loader_criteria(
+                StructureMixin,
+                lambda cls: cls.structure_id == structure_id,
+                include_aliases=True,
+                propagate_to_loaders=False
+            )
+        )
+
+# Version des données, incrémentée à chaque écriture pour invalider les caches
+_data_version = 0
+_data_version_lock = threading.Lock()
+
+# Journal des événements associés aux dernières versions : {version: événements ou None}
+TAILLE_JOURNAL_EVENEMENTS = 256
+_data_events = collections.OrderedDict()
+
+@contextlib.contextmanager
+def _transaction_schema():
+    """Ouvre une transaction en écriture qui englobe aussi les instructions DDL."""
+    with engine.connect() as connexion:
+        # pysqlite n'ouvre pas de transaction avant les instructions DDL : l'ouvrir
+        # explicitement, en écriture, pour qu'un autre processus attende qu'elle se termine
+        connexion.exec_driver_sql("BEGIN IMMEDIATE")
+        yield connexion
+        connexion.commit()
+
 def init_db():
-    """Initialise la base de données et crée les tables si elles n'existent pas."""
-    Base.metadata.create_all(engine)
+    """Initialise la base de données : crée les tables manquantes puis met le schéma à jour."""
+    with _transaction_schema() as connexion:
+        Base.metadata.create_all(connexion)
+    migrate_db()
+    
     print("Base de données initialisée avec succès.")
 
+# Schéma de la table parametres à la version 1, figé : la migration doit produire ce schéma
+# même si le modèle Parametre évolue par la suite
+_SCHEMA_PARAMETRES_V1 = (
+    "CREATE TABLE parametres ("
+    "id INTEGER NOT NULL, "
+    "cle VARCHAR(100) NOT NULL, "
+    "valeur VARCHAR(255) NOT NULL, "
+    "description TEXT, "
+    "structure_id INTEGER NOT NULL, "
+    "PRIMARY KEY (id), "
+    "CONSTRAINT uq_parametres_structure_cle UNIQUE (structure_id, cle), "
+    "FOREIGN KEY(structure_id) REFERENCES structures (id))",
+    "CREATE INDEX ix_parametres_structure_id ON parametres (structure_id)"
+)
+
+def _migration_structures(connexion):
+    """Rattache les données d'une base mono-structure à la structure par défaut."""
+    connexion.exec_driver_sql(
+        "INSERT OR IGNORE INTO structures (id, nom) VALUES (?, ?)",
+        (STRUCTURE_PAR_DEFAUT, NOM_STRUCTURE_PAR_DEFAUT)
+    )
+        
+    # Ajouter la colonne structure_id aux tables créées avant son introduction
+    for table in Base.metadata.sorted_tables:
+        if "structure_id" not in table.c:
+            continue
+        colonnes = {ligne[1] for ligne in connexion.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+        if "structure_id" not in colonnes:
+            connexion.exec_driver_sql(
+                f"ALTER TABLE {table.name} ADD COLUMN structure_id INTEGER NOT NULL DEFAULT {STRUCTURE_PAR_DEFAUT}"
+            )
+        
+    # La clé d'un paramètre n'est plus unique que par structure : SQLite ne permettant pas
+    # de supprimer une contrainte, la table est recréée avec ses données
+    for index in connexion.exec_driver_sql("PRAGMA index_list(parametres)").fetchall():
+        if index[3] != "u":
+            continue
+        colonnes_index = [ligne[2] for ligne in connexion.exec_driver_sql(f"PRAGMA index_info('{index[1]}')")]
+        if colonnes_index == ["cle"]:
+            connexion.exec_driver_sql("ALTER TABLE parametres RENAME TO parametres_avant_v1")
+            for instruction in _SCHEMA_PARAMETRES_V1:
+                connexion.exec_driver_sql(instruction)
+            connexion.exec_driver_sql(
+                "INSERT INTO parametres (id, cle, valeur, description, structure_id) "
+                "SELECT id, cle, valeur, description, structure_id FROM parametres_avant_v1"
+            )
+            connexion.exec_driver_sql("DROP TABLE parametres_avant_v1")
+            break
+
+def _migration_index(connexion):
+    """Supprime les répartitions et attributions en double puis crée les index déclarés manquants."""
+    # Conserver la première ligne de chaque doublon, comme le font les calculs
+    connexion.exec_driver_sql(
+        "DELETE FROM repartitions WHERE id NOT IN "
+        "(SELECT MIN(id) FROM repartitions GROUP BY structure_id, indicateur_id)"
+    )
+    connexion.exec_driver_sql(
+        "DELETE FROM attributions WHERE id NOT IN "
+        "(SELECT MIN(id) FROM attributions GROUP BY structure_id, indicateur_id, associe_id)"
+    )
+    
+    # create_all ignore les tables existantes : créer les index ajoutés depuis leur création
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connexion, checkfirst=True)
+
+def _migration_codes_formules(connexion):
+    """Ajoute le code de formule des indicateurs, déduit de leur nom pour les indicateurs existants."""
+    colonnes = {ligne[1] for ligne in connexion.exec_driver_sql("PRAGMA table_info(indicateurs)")}
+    if "code_formule" not in colonnes:
+        connexion.exec_driver_sql("ALTER TABLE indicateurs ADD COLUMN code_formule VARCHAR(50)")
+    
+    # Le nom déterminait jusqu'ici la formule : en déduire le code une fois pour toutes
+    for indicateur_id, nom in connexion.exec_driver_sql("SELECT id, nom FROM indicateurs WHERE code_formule IS NULL").fetchall():
+        regle = registre_formules.resoudre(nom)
+        if regle:
+            connexion.exec_driver_sql(
+                "UPDATE indicateurs SET code_formule = ? WHERE id = ?",
+                (regle.code, indicateur_id)
+            )
+
+# Migrations du schéma, dans l'ordre : la migration n porte la base à la version n
+# (PRAGMA user_version). Une migration doit aussi s'appliquer sans erreur à une base neuve.
+MIGRATIONS = (
+    _migration_structures,
+    _migration_index,
+    _migration_codes_formules,
+)
+VERSION_SCHEMA = len(MIGRATIONS)
+
+def get_schema_version():
+    """Retourne la version du schéma de la base (PRAGMA user_version)."""
+    with engine.connect() as connexion:
+        return connexion.exec_driver_sql("PRAGMA user_version").scalar()
+
+def migrate_db():
+    """Applique à la base les migrations qu'elle n'a pas encore reçues.
+    
+    Chaque migration s'exécute dans sa propre transaction avec la mise à jour du
+    numéro de version ; retourne la liste des numéros de migrations appliquées.
+    """
+    if get_schema_version() >= VERSION_SCHEMA:
+        return []
+    
+    appliquees = []
+    for numero, migration in enumerate(MIGRATIONS, start=1):
+        with _transaction_schema() as connexion:
+            # Relire la version une fois le verrou obtenu : un autre processus a pu migrer la base
+            if connexion.exec_driver_sql("PRAGMA user_version").scalar() >= numero:
+                continue
+            
+            migration(connexion)
+            connexion.exec_driver_sql(f"PRAGMA user_version = {numero}")
+        appliquees.append(numero)
+    
+    return appliquees
+
 def get_session():
     """Retourne une session de base de données."""
     return Session()
 
-def execute_query(query, params=None):
-    """Exécute une requête SQL brute."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def configure_db(db_path):
+    """Fait pointer l'application vers un autre fichier de base de données."""
+    global engine, DB_PATH
+    engine.dispose()
+    DB_PATH = db_path
+    engine = create_db_engine(db_path)
+    Session.configure(bind=engine)
+    return engine
+
+def dispose_engine():
+    """Ferme toutes les connexions du pool (avant de remplacer ou supprimer le fichier)."""
+    engine.dispose()
+
+def checkpoint_db():
+    """Reporte le journal WAL dans le fichier principal de la base."""
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def delete_db_files():
+    """Supprime le fichier de base de données et ses fichiers de journal WAL."""
+    dispose_engine()
+    for chemin in (DB_PATH, f"{DB_PATH}-wal", f"{DB_PATH}-shm"):
+        if os.path.exists(chemin):
+            os.remove(chemin)
+
+def get_data_version():
+    """Retourne la version courante des données."""
+    return _data_version
+
+def bump_data_version(*evenements):
+    """Signale une écriture en base : incrémente la version des données et la retourne.
     
-    if params:
-        cursor.execute(query, params)
-    else:
-        cursor.execute(query)
+    Les événements décrivent ce qui a changé dans la structure courante, sous la forme
+    ("indicateur", id), ("parametre", cle), ("charges",), ("associes",) ou ("repartition",).
+    Sans événement, l'écriture est considérée comme pouvant toucher n'importe quelle donnée,
+    de n'importe quelle structure.
+    """
+    global _data_version
+    structure_id = get_structure_id()
+    with _data_version_lock:
+        _data_version += 1
+        _data_events[_data_version] = tuple((structure_id, evenement) for evenement in evenements) or None
+        while len(_data_events) > TAILLE_JOURNAL_EVENEMENTS:
+            _data_events.popitem(last=False)
+        return _data_version
+
+def get_data_events(depuis_version, jusqu_a_version, structure_id=None):
+    """Retourne les événements d'une structure (la structure courante par défaut) survenus entre deux versions.
     
-    result = cursor.fetchall()
-    conn.commit()
-    conn.close()
+    Retourne None si l'une des versions n'a pas d'événement connu (écriture non décrite
+    ou sortie du journal) : les résultats dérivés doivent alors être entièrement recalculés.
+    """
+    if structure_id is None:
+        structure_id = get_structure_id()
     
-    return result
+    with _data_version_lock:
+        evenements = []
+        for version in range(depuis_version + 1, jusqu_a_version + 1):
+            evenements_version = _data_events.get(version)
+            if evenements_version is None:
+                return None
+            evenements.extend(evenement for structure, evenement in evenements_version if structure == structure_id)
+        return evenements
+
+def execute_query(query, params=None):
+    """Exécute une requête SQL brute sur une connexion du pool."""
+    with engine.begin() as connection:
+        if params:
+            result = connection.exec_driver_sql(query, params)
+        else:
+            result = connection.exec_driver_sql(query)
+        
+        return [tuple(row) for row in result.fetchall()] if result.returns_rows else []
@@ -0,0 +1,221 @@
+import numpy as np
+from collections import namedtuple
+
+class FormuleFixe:
+    """Formule par défaut : seuls les points fixes de l'indicateur sont attribués."""
+    code = "fixe"
+    dependances = ()
+
+    def evaluer(self, points_fixes, points_variables, parametres):
+        return points_fixes, 0
+
+    def evaluer_tableau(self, points_fixes, points_variables, parametres):
+        return points_fixes, 0
+
+class ForfaitVariable:
+    """Points variables attribués tels quels, en plus des points fixes."""
+    code = "forfait_variable"
+    dependances = ()
+
+    def evaluer(self, points_fixes, points_variables, parametres):
+        return points_fixes, points_variables
+
+    def evaluer_tableau(self, points_fixes, points_variables, parametres):
+        return points_fixes, points_variables
+
+class ProrataPatientele:
+    """Points variables proratisés par tranche de 4000 patients.
+    
+    Sans coefficient, la base est le nombre de points variables de l'indicateur.
+    Le seuil et le plafond délimitent la tranche de patientèle prise en compte.
+    """
+    code = "prorata_patientele"
+    dependances = ("patientele",)
+
+    def __init__(self, coefficient=None, seuil=0, plafond=None):
+        self.coefficient = coefficient
+        self.seuil = seuil
+        self.plafond = plafond
+
+    def evaluer(self, points_fixes, points_variables, parametres):
+        base = points_variables if self.coefficient is None else self.coefficient
+        patients = max(parametres.patientele - self.seuil, 0)
+        if self.plafond is not None:
+            patients = min(patients, self.plafond - self.seuil)
+        return points_fixes, base * patients / 4000
+
+    def evaluer_tableau(self, points_fixes, points_variables, parametres):
+        base = points_variables if self.coefficient is None else self.coefficient
+        patients = np.maximum(np.asarray(parametres.patientele) - self.seuil, 0)
+        if self.plafond is not None:
+            patients = np.minimum(patients, self.plafond - self.seuil)
+        return points_fixes, base * patients / 4000
+
+class Concertation:
+    """Concertation pluri-professionnelle : 1000 points selon la patientèle et le taux de dossiers."""
+    code = "concertation"
+    dependances = ("patientele", "taux_dossiers")
+
+    def __init__(self, points_fixes=None):
+        self.points_fixes = points_fixes
+
+    def evaluer(self, points_fixes, points_variables, parametres):
+        if self.points_fixes is not None:
+            points_fixes = self.points_fixes
+        
+        variables = 0
+        if parametres.patientele and parametres.taux_dossiers:
+            variables = 1000 * (parametres.patientele / 4000) * (parametres.taux_dossiers / 5)
+        return points_fixes, variables
+
+    def evaluer_tableau(self, points_fixes, points_variables, parametres):
+        if self.points_fixes is not None:
+            points_fixes = self.points_fixes
+        
+        patientele = np.asarray(parametres.patientele, dtype=float)
+        taux_dossiers = np.asarray(parametres.taux_dossiers, dtype=float)
+        variables = np.where(
+            (patientele != 0) & (taux_dossiers != 0),
+            1000 * (patientele / 4000) * (taux_dossiers / 5),
+            0.0
+        )
+        return points_fixes, variables
+
+class ParProfessionnel:
+    """Points attribués par professionnel de santé équipé, sur une tranche de PS."""
+    code = "par_professionnel"
+    dependances = ("nombre_ps",)
+
+    def __init__(self, coefficient, seuil=0, plafond=None):
+        self.coefficient = coefficient
+        self.seuil = seuil
+        self.plafond = plafond
+
+    def evaluer(self, points_fixes, points_variables, parametres):
+        nombre = max(parametres.nombre_ps - self.seuil, 0)
+        if self.plafond is not None:
+            nombre = min(nombre, self.plafond - self.seuil)
+        return points_fixes, self.coefficient * nombre
+
+    def evaluer_tableau(self, points_fixes, points_variables, parametres):
+        nombre = np.maximum(np.asarray(parametres.nombre_ps) - self.seuil, 0)
+        if self.plafond is not None:
+            nombre = np.minimum(nombre, self.plafond - self.seuil)
+        return points_fixes, self.coefficient * nombre
+
+class ParProtocole:
+    """Points fixes multipliés par le nombre de protocoles (ou de stages), dans la limite d'un maximum."""
+    code = "par_protocole"
+    dependances = ("nb_protocoles",)
+
+    def __init__(self, maximum):
+        self.maximum = maximum
+
+    def evaluer(self, points_fixes, points_variables, parametres):
+        return points_fixes * min(parametres.nb_protocoles, self.maximum), 0
+
+    def evaluer_tableau(self, points_fixes, points_variables, parametres):
+        return points_fixes * np.minimum(parametres.nb_protocoles, self.maximum), 0
+
+FORMULE_FIXE = FormuleFixe()
+
+# Règle associant un code de formule aux libellés d'indicateurs qu'elle couvre
+RegleFormule = namedtuple("RegleFormule", ["code", "motifs", "formule"])
+
+# Table déclarative des formules, une règle par code. Le calcul s'appuie sur le code de
+# formule enregistré avec chaque indicateur (Indicateur.code_formule) ; les motifs ne servent
+# qu'à attribuer ce code aux indicateurs créés avant son introduction (voir la migration
+# _migration_codes_formules). Un motif est un fragment du nom, ou un tuple de fragments qui
+# doivent tous y figurer ; lorsque plusieurs motifs correspondent, le plus long (le plus
+# précis) l'emporte, indépendamment de l'ordre des règles.
+REGLES_FORMULES = (
+    RegleFormule("coordination_jusqu_8000", ("Fonction de coordination - Variable (jusqu'à 8000 patients)",), ProrataPatientele(1700, plafond=8000)),
+    RegleFormule("coordination_au_dela_8000", ("Fonction de coordination - Variable (au-delà de 8000 patients)",), ProrataPatientele(1100, seuil=8000)),
+    RegleFormule("concertation_avec_ipa", (("Concertation pluri-professionnelle", "avec IPA"),), Concertation(points_fixes=200)),
+    RegleFormule("concertation", ("Concertation pluri-professionnelle",), Concertation()),
+    RegleFormule("si_jusqu_16_ps", (
+        "SI labellisé 'Standard' (ANS) - Variable (jusqu'à 16 PS)",
+        "SI labellisé 'Standard' (ANS) - Variable 16 premiers PS"
+    ), ParProfessionnel(200, plafond=16)),
+    RegleFormule("si_au_dela_16_ps", (
+        "SI labellisé 'Standard' (ANS) - Variable (au-delà de 16 PS)",
+        "SI labellisé 'Standard' (ANS) - Variable PS supplémentaires"
+    ), ParProfessionnel(150, seuil=16)),
+    RegleFormule("prorata_patientele", ("Coordination externe", "Parcours insuffisance cardiaque"), ProrataPatientele()),
+    RegleFormule("protocoles_pluri_professionnels", ("Protocoles pluri-professionnels",), ParProtocole(8)),
+    RegleFormule("protocoles_cooperation", ("Protocoles nationaux de coopération",), ParProtocole(6)),
+    RegleFormule("stages_supplementaires", ("Formation de professionnels - 3e & 4e stage",), ParProtocole(2)),
+    RegleFormule("crises_activation", ("Réponse aux crises sanitaires graves - Activation",), ForfaitVariable()),
+    RegleFormule("forfait_variable", ("Missions de santé publique", "Implication des usagers - Niveau 2", "Démarche qualité"), ForfaitVariable()),
+)
+
+class RegistreFormules:
+    """Registre des formules compilées, indexé par code de formule.
+    
+    Les formules sont instanciées une fois, à l'import de ce module ; la formule d'un
+    indicateur se résout par une lecture de dictionnaire sur son code de formule, de sorte
+    que renommer un indicateur ne change pas son calcul.
+    """
+
+    def __init__(self, regles=REGLES_FORMULES):
+        codes = [regle.code for regle in regles]
+        doublons = sorted({code for code in codes if codes.count(code) > 1})
+        if doublons:
+            raise ValueError(f"Codes de formule en double : {', '.join(doublons)}")
+        
+        self.regles = regles
+        self._regles_par_code = {regle.code: regle for regle in regles}
+
+    @property
+    def codes(self):
+        """Codes des formules dédiées, dans l'ordre de la table."""
+        return tuple(regle.code for regle in self.regles)
+
+    def resoudre(self, nom):
+        """Retourne la règle dont le motif le plus long figure dans le nom, ou None si aucune ne correspond.
+        
+        Ne sert qu'à déduire le code de formule d'un indicateur qui n'en a pas encore.
+        """
+        meilleure, longueur = None, 0
+        for regle in self.regles:
+            for motif in regle.motifs:
+                fragments = (motif,) if isinstance(motif, str) else motif
+                precision = sum(len(fragment) for fragment in fragments)
+                if precision > longueur and all(fragment in nom for fragment in fragments):
+                    meilleure, longueur = regle, precision
+        return meilleure
+
+    def regle_pour(self, indicateur):
+        """Retourne la règle d'un indicateur selon son code de formule (None si aucune formule dédiée)."""
+        return self._regles_par_code.get(indicateur.code_formule)
+
+    def formule_pour(self, indicateur):
+        """Retourne la formule compilée d'un indicateur."""
+        regle = self.regle_pour(indicateur)
+        return regle.formule if regle else FORMULE_FIXE
+
+    def formule_par_code(self, code):
+        """Retourne la formule associée à un code de formule."""
+        regle = self._regles_par_code.get(code)
+        return regle.formule if regle else FORMULE_FIXE
+
+    def dependances_pour(self, indicateur):
+        """Retourne les paramètres de calcul dont dépendent les points d'un indicateur."""
+        if not (indicateur.points_variables or 0) > 0:
+            return ()
+        return self.formule_pour(indicateur).dependances
+
+    def code_pour(self, indicateur):
+        """Retourne le code de formule d'un indicateur."""
+        regle = self.regle_pour(indicateur)
+        return regle.code if regle else FORMULE_FIXE.code
+
+    def indicateurs_sans_formule(self, indicateurs):
+        """Liste les indicateurs à points variables pour lesquels aucune formule n'est définie."""
+        return [
+            indicateur for indicateur in indicateurs
+            if (indicateur.points_variables or 0) > 0 and self.regle_pour(indicateur) is None
+        ]
+
+# Registre partagé par toute l'application
+registre_formules = RegistreFormules()
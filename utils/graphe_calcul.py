@@ -0,0 +1,248 @@
+import hashlib
+import threading
+import dataclasses
+from sqlalchemy import func
+from models import Indicateur, Associe, Attribution, Repartition, Parametre, Charge
+from utils.db_config import get_session, get_data_version, get_data_events, get_structure_id, structure_active, STRUCTURE_PAR_DEFAUT
+from utils.formules import registre_formules
+from utils.points import load_calculation_parameters, evaluate_indicator, calculate_potential_points
+from utils.repartition import load_repartition_data, MatriceRepartition, repartition_results
+from utils.charges import calculate_charges_total
+
+def _empreinte(*requetes):
+    """Empreinte des lignes retournées par une suite de requêtes."""
+    empreinte = hashlib.sha256()
+    for requete in requetes:
+        for ligne in requete:
+            empreinte.update(repr(tuple(ligne)).encode())
+        empreinte.update(b"|")
+    return empreinte.hexdigest()
+
+def compute_input_hashes():
+    """Calcule les empreintes des données d'entrée du calcul de la structure courante, par partie.
+    
+    Retourne un dictionnaire {partie: empreinte} ; la partie "indicateurs" est elle-même un
+    dictionnaire {id de l'indicateur: empreinte}, pour repérer les indicateurs modifiés.
+    """
+    session = get_session()
+    # Le code de formule détermine la formule des points variables ; le texte de
+    # formule_calcul, descriptif, n'intervient pas dans le calcul
+    indicateurs = session.query(
+        Indicateur.id, Indicateur.nom, Indicateur.axe, Indicateur.type, Indicateur.points_fixes,
+        Indicateur.points_variables, Indicateur.est_valide, Indicateur.prorata, Indicateur.code_formule
+    )
+    empreintes = {
+        "indicateurs": {ligne.id: _empreinte((ligne,)) for ligne in indicateurs},
+        "repartition": _empreinte(
+            session.query(
+                Associe.id, Associe.nom, Associe.prenom, Associe.fonction, Associe.est_gerant, Associe.coefficient_majoration
+            ).order_by(Associe.id),
+            session.query(Attribution.associe_id, Attribution.indicateur_id, Attribution.pourcentage).order_by(Attribution.id),
+            session.query(Repartition.indicateur_id, Repartition.est_commun).order_by(Repartition.id)
+        ),
+        "parametres": _empreinte(session.query(Parametre.cle, Parametre.valeur).order_by(Parametre.cle)),
+        "charges": _empreinte(session.query(func.count(Charge.id), func.sum(Charge.montant)))
+    }
+    session.close()
+    
+    return empreintes
+
+class GrapheCalcul:
+    """Graphe de calcul incrémental des revenus ACI.
+    
+    Les nœuds s'enchaînent ainsi : points des indicateurs → totaux par axe → revenu ACI
+    → revenu net → parts des associés. Les écritures décrivent ce qu'elles modifient par
+    des événements transmis à bump_data_version ; à la synchronisation, seuls les nœuds
+    concernés sont recalculés. Les empreintes des données d'entrée vérifient que les
+    événements expliquent tous les changements : une écriture non décrite, ou faite par un
+    autre processus, provoque une reconstruction complète.
+    Chaque structure dispose de son propre graphe.
+    """
+
+    def __init__(self, registre=registre_formules, structure_id=STRUCTURE_PAR_DEFAUT):
+        self.registre = registre
+        self.structure_id = structure_id
+        self.version = None
+        self.empreintes = None
+        self.nb_reconstructions = 0
+        self._verrou = threading.RLock()
+
+    def synchroniser(self):
+        """Met le graphe à jour par rapport aux données de la base."""
+        with self._verrou, structure_active(self.structure_id):
+            # Version lue avant les empreintes : une écriture concurrente sera rejouée à la
+            # synchronisation suivante
+            version = get_data_version()
+            empreintes = compute_input_hashes()
+            if empreintes == self.empreintes:
+                self.version = version
+                return
+            
+            # Seuls les événements de la structure du graphe sont rejoués
+            evenements = None
+            if self.version is not None:
+                evenements = get_data_events(self.version, version, self.structure_id)
+            
+            if (
+                evenements is None
+                or not self._evenements_expliquent(evenements, empreintes)
+                or not all(self._appliquer(evenement) for evenement in evenements)
+            ):
+                self._reconstruire()
+            self.version = version
+            self.empreintes = empreintes
+
+    def _evenements_expliquent(self, evenements, empreintes):
+        """Vérifie que les événements couvrent toutes les données d'entrée modifiées."""
+        natures = {evenement[0] for evenement in evenements}
+        indicateurs_evenements = {evenement[1] for evenement in evenements if evenement[0] == "indicateur"}
+        anciennes = self.empreintes["indicateurs"]
+        nouvelles = empreintes["indicateurs"]
+        if any(anciennes.get(i) != nouvelles.get(i) and i not in indicateurs_evenements for i in anciennes.keys() | nouvelles.keys()):
+            return False
+        
+        # Les autres parties sont entièrement rechargées par l'événement correspondant
+        natures_parties = {"repartition": {"associes", "repartition"}, "parametres": {"parametre"}, "charges": {"charges"}}
+        return all(
+            self.empreintes[partie] == empreintes[partie] or natures & natures_partie
+            for partie, natures_partie in natures_parties.items()
+        )
+
+    def _appliquer(self, evenement):
+        """Propage un événement ; retourne False s'il impose une reconstruction complète."""
+        nature = evenement[0]
+        if nature == "indicateur":
+            return self._indicateur_modifie(evenement[1])
+        if nature == "parametre":
+            return self._parametres_modifies()
+        if nature == "charges":
+            self.total_charges = calculate_charges_total()
+            return True
+        if nature in ("associes", "repartition"):
+            donnees = load_repartition_data()
+            self._construire_repartition(donnees["associes"], donnees["attributions"], donnees["repartitions"])
+            return True
+        if nature in ("structures", "historique"):
+            return True
+        return False
+
+    def _reconstruire(self):
+        """Recalcule tous les nœuds à partir de la base de données."""
+        donnees = load_repartition_data()
+        self.parametres = load_calculation_parameters()
+        self.total_charges = calculate_charges_total()
+        
+        self.indicateurs = {indicateur.id: indicateur for indicateur in donnees["indicateurs"]}
+        self.points = {
+            indicateur.id: evaluate_indicator(indicateur, self.parametres, self.registre)
+            for indicateur in donnees["indicateurs"]
+        }
+        
+        # Totaux par axe, dans l'ordre d'apparition des axes
+        self.par_axe = {}
+        for indicateur in donnees["indicateurs"]:
+            totaux = self.par_axe.setdefault(indicateur.axe, {"total": 0.0, "valide": 0.0})
+            totaux["total"] += calculate_potential_points(indicateur)
+            totaux["valide"] += self.points[indicateur.id]
+        self.total_points = sum(self.points.values())
+        
+        self._construire_repartition(donnees["associes"], donnees["attributions"], donnees["repartitions"])
+        self.nb_reconstructions += 1
+
+    def _construire_repartition(self, associes, attributions, repartitions):
+        """Reconstruit la matrice d'attribution et les points de chaque associé."""
+        self.associes = associes
+        self.matrice = MatriceRepartition(associes, list(self.indicateurs.values()), attributions, repartitions)
+        self.colonnes = {indicateur_id: colonne for colonne, indicateur_id in enumerate(self.matrice.indicateur_ids)}
+        self.points_fixes, self.points_variables = self.matrice.points_par_associe(
+            self.matrice.vecteur_points(self.points)
+        )
+
+    def _indicateur_modifie(self, indicateur_id):
+        """Recalcule un indicateur puis reporte l'écart sur les nœuds qui en dépendent."""
+        session = get_session()
+        indicateur = session.query(Indicateur).filter_by(id=indicateur_id).first()
+        session.close()
+        
+        ancien = self.indicateurs.get(indicateur_id)
+        
+        # Indicateur créé puis supprimé depuis la dernière synchronisation
+        if indicateur is None and ancien is None:
+            return True
+        
+        # Un indicateur ajouté, supprimé, ou changeant d'axe ou de type modifie la structure du graphe
+        if indicateur is None or ancien is None or indicateur.axe != ancien.axe or indicateur.type != ancien.type:
+            return False
+        
+        self.indicateurs[indicateur_id] = indicateur
+        self.par_axe[indicateur.axe]["total"] += calculate_potential_points(indicateur) - calculate_potential_points(ancien)
+        self._mettre_a_jour_points(indicateur)
+        return True
+
+    def _parametres_modifies(self):
+        """Recalcule uniquement les indicateurs dont la formule dépend d'un paramètre modifié."""
+        parametres = load_calculation_parameters()
+        modifies = {
+            champ.name for champ in dataclasses.fields(parametres)
+            if getattr(parametres, champ.name) != getattr(self.parametres, champ.name)
+        }
+        self.parametres = parametres
+        
+        # La valeur du point n'intervient qu'au niveau du revenu, calculé à la lecture
+        if modifies - {"valeur_point"}:
+            for indicateur in self.indicateurs.values():
+                if modifies.intersection(self.registre.dependances_pour(indicateur)):
+                    self._mettre_a_jour_points(indicateur)
+        return True
+
+    def _mettre_a_jour_points(self, indicateur):
+        """Réévalue les points d'un indicateur et propage l'écart aux totaux et aux associés."""
+        points = evaluate_indicator(indicateur, self.parametres, self.registre)
+        ecart = points - self.points[indicateur.id]
+        if ecart == 0:
+            return
+        
+        self.points[indicateur.id] = points
+        self.par_axe[indicateur.axe]["valide"] += ecart
+        self.total_points += ecart
+        
+        # Mise à jour de rang 1 des points des associés : seule la colonne de l'indicateur change
+        colonne = self.colonnes[indicateur.id]
+        self.points_fixes = self.points_fixes + ecart * self.matrice.poids_fixes[:, colonne]
+        self.points_variables = self.points_variables + ecart * self.matrice.poids_variables[:, colonne]
+
+    def resultats(self):
+        """Retourne l'ensemble des résultats, dans le format des tables de résultats matérialisés."""
+        with self._verrou:
+            self.synchroniser()
+            total_aci = self.total_points * self.parametres.valeur_point
+            net_revenue = total_aci - self.total_charges
+            return {
+                "points": dict(self.points),
+                "par_axe": {axe: dict(totaux) for axe, totaux in self.par_axe.items()},
+                "total_points": self.total_points,
+                "total_aci": total_aci,
+                "total_charges": self.total_charges,
+                "net_revenue": net_revenue,
+                "repartition": repartition_results(
+                    self.associes,
+                    self.matrice.associe_ids,
+                    self.points_fixes,
+                    self.points_variables,
+                    net_revenue
+                )
+            }
+
+# Graphes partagés par toutes les sessions de l'application, un par structure
+_graphes = {}
+_verrou_graphes = threading.Lock()
+
+def get_graphe_calcul(structure_id=None):
+    """Retourne le graphe de calcul d'une structure (la structure courante par défaut)."""
+    if structure_id is None:
+        structure_id = get_structure_id()
+    
+    with _verrou_graphes:
+        if structure_id not in _graphes:
+            _graphes[structure_id] = GrapheCalcul(structure_id=structure_id)
+        return _graphes[structure_id]
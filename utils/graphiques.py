@@ -0,0 +1,100 @@
+import hashlib
+import threading
+import functools
+import collections
+import pandas as pd
+
+# Nombre de figures conservées ; au-delà, les moins récemment utilisées sont évincées
+TAILLE_CACHE_GRAPHIQUES = 64
+
+def _normaliser(valeur):
+    """Convertit les données d'un graphique en une structure dont la représentation est stable."""
+    if isinstance(valeur, pd.DataFrame):
+        return (
+            "DataFrame",
+            tuple(map(str, valeur.columns)),
+            tuple(map(str, valeur.dtypes)),
+            pd.util.hash_pandas_object(valeur, index=True).values.tobytes()
+        )
+    if isinstance(valeur, pd.Series):
+        return ("Series", str(valeur.name), str(valeur.dtype), pd.util.hash_pandas_object(valeur, index=True).values.tobytes())
+    if isinstance(valeur, dict):
+        # L'ordre des clés est conservé : il détermine l'ordre d'affichage des séries
+        return ("dict", tuple((_normaliser(cle), _normaliser(v)) for cle, v in valeur.items()))
+    if isinstance(valeur, (list, tuple)):
+        return (type(valeur).__name__, tuple(_normaliser(v) for v in valeur))
+    return valeur
+
+@functools.cache
+def _classe_figure_serialisee():
+    """Retourne la classe des figures mémorisées (Plotly n'est importé qu'au premier graphique)."""
+    import plotly.graph_objects as go
+    
+    class FigureSerialisee(go.Figure):
+        """Figure réduite à sa forme sérialisée, calculée une seule fois.
+        
+        st.plotly_chart lit une figure par to_dict() : la forme mémorisée est retournée
+        telle quelle, sans nouvelle copie ni validation de la figure d'origine.
+        """
+
+        def __init__(self, figure):
+            super().__init__()
+            self._serialisee = figure.to_dict()
+
+        def to_dict(self):
+            return self._serialisee
+
+        def to_plotly_json(self):
+            return self._serialisee
+    
+    return FigureSerialisee
+
+def empreinte_donnees(*args, **kwargs):
+    """Retourne l'empreinte (sha256) des arguments d'un constructeur de graphique."""
+    return hashlib.sha256(repr(_normaliser((args, kwargs))).encode()).hexdigest()
+
+class FabriqueGraphiques:
+    """Cache des figures Plotly, indexé par le constructeur et l'empreinte de ses données.
+    
+    Une figure n'est construite, validée puis sérialisée par Plotly que lorsque ses données
+    changent ; les réexécutions suivantes réutilisent sa forme sérialisée. Les figures
+    retournées sont partagées entre les sessions et ne sont destinées qu'à l'affichage.
+    """
+
+    def __init__(self, taille=TAILLE_CACHE_GRAPHIQUES):
+        self.taille = taille
+        self._figures = collections.OrderedDict()
+        self._verrou = threading.Lock()
+
+    def figure(self, construire, *args, **kwargs):
+        """Retourne la figure construite par `construire(*args, **kwargs)`, depuis le cache si possible."""
+        cle = (construire.__module__, construire.__qualname__, empreinte_donnees(*args, **kwargs))
+        with self._verrou:
+            figure = self._figures.get(cle)
+            if figure is not None:
+                self._figures.move_to_end(cle)
+                return figure
+        
+        figure = _classe_figure_serialisee()(construire(*args, **kwargs))
+        
+        with self._verrou:
+            self._figures[cle] = figure
+            self._figures.move_to_end(cle)
+            while len(self._figures) > self.taille:
+                self._figures.popitem(last=False)
+        return figure
+
+    def vider(self):
+        """Vide le cache des figures."""
+        with self._verrou:
+            self._figures.clear()
+
+# Cache partagé par toutes les sessions de l'application
+fabrique_graphiques = FabriqueGraphiques()
+
+def graphique_memorise(construire):
+    """Décorateur : mémorise les figures d'un constructeur de graphique selon ses données."""
+    @functools.wraps(construire)
+    def construire_memorise(*args, **kwargs):
+        return fabrique_graphiques.figure(construire, *args, **kwargs)
+    return construire_memorise
@@ -1,44 +1,50 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from models import Indicateur, Associe, Repartition, Attribution, Charge, Parametre, Patientele, ProfessionnelSante
-from utils import get_session
-import base64
-import os
+from sqlalchemy import update
+from utils import get_session, bump_data_version
+from utils.points import load_indicateurs, load_calculation_parameters, compute_indicator_points, calculate_points_batch
+from utils.points_vectorises import indicateurs_to_frame, total_points_by_axe_vectorized
+from utils.repartition import load_repartition_data, compute_repartition
+from utils.charges import calculate_charges_total
+from utils.param_store import parametres_store
+from utils.assets import get_styles_html, get_logo_url
+from utils.graphiques import graphique_memorise
 
 def load_css():
-    """Charge le CSS personnalisé."""
-    css_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'css', 'style.css')
-    with open(css_file, 'r') as f:
-        st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+    """Injecte les feuilles de style de l'application (lues et minifiées une fois par processus)."""
+    st.markdown(get_styles_html(), unsafe_allow_html=True)
 
 def get_parameter_value(key):
-    """Récupère la valeur d'un paramètre depuis la base de données."""
-    session = get_session()
-    param = session.query(Parametre).filter_by(cle=key).first()
-    session.close()
-    
-    if param:
-        return param.valeur
-    return None
+    """Récupère la valeur brute (texte) d'un paramètre depuis le cache des paramètres."""
+    return parametres_store.get_brut(key)
+
+def get_parameter(key, default=None):
+    """Récupère la valeur typée (int, float ou str) d'un paramètre."""
+    return parametres_store.get(key, default)
 
 def set_parameter_value(key, value, description=None):
-    """Définit la valeur d'un paramètre dans la base de données."""
-    session = get_session()
-    param = session.query(Parametre).filter_by(cle=key).first()
+    """Définit la valeur d'un paramètre dans la base de données et met à jour le cache."""
+    parametres_store.set(key, value, description)
+
+def save_indicator_validations(validations):
+    """Enregistre en une seule transaction l'état de validation de plusieurs indicateurs.
     
-    if param:
-        param.valeur = value
-        if description:
-            param.description = description
-    else:
-        param = Parametre(cle=key, valeur=value, description=description)
-        session.add(param)
+    `validations` associe à chaque identifiant d'indicateur son nouvel état ; retourne le
+    nombre d'indicateurs mis à jour.
+    """
+    if not validations:
+        return 0
     
+    session = get_session()
+    session.execute(
+        update(Indicateur),
+        [{"id": indicateur_id, "est_valide": est_valide} for indicateur_id, est_valide in validations.items()]
+    )
     session.commit()
     session.close()
+    
+    bump_data_version(*[("indicateur", indicateur_id) for indicateur_id in validations])
+    return len(validations)
 
 def calculate_indicator_points(indicateur_id, patientele=None, nombre_ps=None, taux_dossiers=None, nb_protocoles=None):
     """Calcule les points pour un indicateur donné en fonction des paramètres."""
@@ -49,106 +55,47 @@ def calculate_indicator_points(indicateur_id, patientele=None, nombre_ps=None, t
     if not indicateur:
         return 0
     
-    # Points fixes toujours attribués si l'indicateur est validé
-    points_fixes = indicateur.points_fixes if indicateur.est_valide else 0
-    points_variables = 0
-    
-    # Calcul des points variables selon la formule de l'indicateur
-    if indicateur.est_valide and indicateur.points_variables > 0:
-        if "Fonction de coordination - Variable (jusqu'à 8000 patients)" in indicateur.nom:
-            points_variables = 1700 * min(patientele or 0, 8000) / 4000
-        
-        elif "Fonction de coordination - Variable (au-delà de 8000 patients)" in indicateur.nom:
-            points_variables = 1100 * max((patientele or 0) - 8000, 0) / 4000
-        
-        elif "Concertation pluri-professionnelle" in indicateur.nom:
-            base_points = 1000
-            if "avec IPA" in indicateur.nom:
-                points_fixes = 200  # Points fixes supplémentaires pour IPA
-            
-            if patientele and taux_dossiers:
-                points_variables = base_points * (patientele / 4000) * (taux_dossiers / 5)
-        
-        elif "SI labellisé 'Standard' (ANS) - Variable (jusqu'à 16 PS)" in indicateur.nom:
-            points_variables = 200 * min(nombre_ps or 0, 16)
-        
-        elif "SI labellisé 'Standard' (ANS) - Variable (au-delà de 16 PS)" in indicateur.nom:
-            points_variables = 150 * max((nombre_ps or 0) - 16, 0)
-        
-        elif "Coordination externe" in indicateur.nom or "Parcours insuffisance cardiaque" in indicateur.nom:
-            points_variables = indicateur.points_variables * ((patientele or 0) / 4000)
-        
-        elif "Protocoles pluri-professionnels" in indicateur.nom or "Protocoles nationaux de coopération" in indicateur.nom:
-            # Pour les protocoles, on multiplie par le nombre de protocoles (max 8 ou 6)
-            max_protocoles = 8 if "pluri-professionnels" in indicateur.nom else 6
-            points_fixes = indicateur.points_fixes * min(nb_protocoles or 0, max_protocoles)
-            points_variables = 0  # Pas de points variables pour les protocoles
-        
-        elif "Formation de professionnels - 3e & 4e stage" in indicateur.nom:
-            # Pour les stages supplémentaires (max 2)
-            points_fixes = indicateur.points_fixes * min(nb_protocoles or 0, 2)
-            points_variables = 0
-        
-        elif "Réponse aux crises sanitaires graves - Activation" in indicateur.nom:
-            # 350 points si crise, 0 sinon (déjà géré par est_valide)
-            points_variables = indicateur.points_variables
-        
-        elif "Missions de santé publique" in indicateur.nom or "Implication des usagers - Niveau 2" in indicateur.nom or "Démarche qualité" in indicateur.nom:
-            # Points variables fixes pour ces indicateurs
-            points_variables = indicateur.points_variables
-    
-    # Appliquer le prorata si défini
-    total_points = (points_fixes + points_variables) * indicateur.prorata
-    
-    return total_points
+    return compute_indicator_points(
+        indicateur,
+        patientele=patientele,
+        nombre_ps=nombre_ps,
+        taux_dossiers=taux_dossiers,
+        nb_protocoles=nb_protocoles
+    )
 
-def get_total_points_by_axe():
+def get_total_points_by_axe(indicateurs=None, parametres=None):
     """Récupère le total des points par axe."""
-    session = get_session()
-    indicateurs = session.query(Indicateur).all()
-    session.close()
-    
-    # Récupérer les paramètres nécessaires pour le calcul
-    patientele = int(get_parameter_value("patientele") or 4000)
-    nombre_ps = int(get_parameter_value("nombre_ps") or 10)
-    taux_dossiers = float(get_parameter_value("taux_dossiers") or 5) / 100  # Convertir en pourcentage
-    
-    # Calculer les points par axe
-    axes = {}
-    for indicateur in indicateurs:
-        if indicateur.axe not in axes:
-            axes[indicateur.axe] = {"total": 0, "valide": 0}
-        
-        # Calculer les points pour cet indicateur
-        points = calculate_indicator_points(
-            indicateur.id, 
-            patientele=patientele, 
-            nombre_ps=nombre_ps, 
-            taux_dossiers=taux_dossiers
-        )
-        
-        if indicateur.est_valide:
-            axes[indicateur.axe]["valide"] += points
-        
-        # Ajouter au total potentiel (que l'indicateur soit validé ou non)
-        axes[indicateur.axe]["total"] += (indicateur.points_fixes + indicateur.points_variables) * indicateur.prorata
-    
-    return axes
+    # Charger les données une seule fois si elles ne sont pas fournies
+    if indicateurs is None:
+        indicateurs = load_indicateurs()
+    if parametres is None:
+        parametres = load_calculation_parameters()
+    
+    # Calculer les points par axe en un seul regroupement sur le tableau des indicateurs
+    tableau = indicateurs_to_frame(indicateurs)
+    return total_points_by_axe_vectorized(tableau, parametres)
 
+@graphique_memorise
 def create_pie_chart(data, title):
     """Crée un graphique en camembert avec Plotly."""
+    # Plotly n'est importé qu'au premier graphique, pour ne pas ralentir le démarrage ;
+    # plotly.express n'est pas utilisé ici, sa construction de figure est nettement plus lente
+    import plotly.graph_objects as go
+    from plotly.colors import sequential
+    
     labels = list(data.keys())
     values = [data[key]["valide"] for key in labels]
+    couleurs = [sequential.Blues_r[i % len(sequential.Blues_r)] for i in range(len(labels))]
     
-    fig = px.pie(
-        names=labels,
+    fig = go.Figure(go.Pie(
+        labels=labels,
         values=values,
-        title=title,
-        color_discrete_sequence=px.colors.sequential.Blues_r,
-        hole=0.4
-    )
+        hole=0.4,
+        marker=dict(colors=couleurs)
+    ))
     
     fig.update_layout(
+        title=title,
         font=dict(family="Lato, sans-serif"),
         title_font=dict(size=20, color="#0596DE"),
         legend_title_font=dict(size=14),
@@ -157,8 +104,11 @@ def create_pie_chart(data, title):
     
     return fig
 
+@graphique_memorise
 def create_bar_chart(data, title):
     """Crée un graphique en barres avec Plotly."""
+    import plotly.graph_objects as go
+    
     labels = list(data.keys())
     valide = [data[key]["valide"] for key in labels]
     total = [data[key]["total"] for key in labels]
@@ -192,28 +142,13 @@ def create_bar_chart(data, title):
     
     return fig
 
-def get_logo_base64():
-    """Retourne le logo en base64 pour l'affichage dans Streamlit."""
-    logo_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'images', 'logo.png')
-    
-    # Si le logo n'existe pas, retourner None
-    if not os.path.exists(logo_path):
-        return None
-    
-    with open(logo_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode()
-    
-    return encoded_string
-
 def display_logo():
     """Affiche le logo dans l'application Streamlit."""
-    logo_base64 = get_logo_base64()
+    logo_url = get_logo_url()
     
-    if logo_base64:
-        st.markdown(
-            f'<img src="data:image/png;base64,{logo_base64}" alt="Logo" width="200">',
-            unsafe_allow_html=True
-        )
+    if logo_url:
+        # Le logo est servi par Streamlit (dossier static) au lieu d'être encodé à chaque affichage
+        st.markdown(f'<img src="{logo_url}" alt="Logo" width="200">', unsafe_allow_html=True)
     else:
         # Afficher un titre stylisé si pas de logo
         st.markdown(
@@ -225,168 +160,48 @@ def format_currency(amount):
     """Formate un montant en euros."""
     return f"{amount:,.2f} €".replace(",", " ").replace(".", ",")
 
-def calculate_total_aci_revenue():
+def calculate_total_aci_revenue(indicateurs=None, parametres=None):
     """Calcule le revenu total ACI en euros."""
-    session = get_session()
-    indicateurs = session.query(Indicateur).all()
-    session.close()
-    
-    # Récupérer les paramètres nécessaires pour le calcul
-    patientele = int(get_parameter_value("patientele") or 4000)
-    nombre_ps = int(get_parameter_value("nombre_ps") or 10)
-    taux_dossiers = float(get_parameter_value("taux_dossiers") or 5) / 100
-    valeur_point = float(get_parameter_value("valeur_point") or 7)
+    # Charger les données une seule fois si elles ne sont pas fournies
+    if indicateurs is None:
+        indicateurs = load_indicateurs()
+    if parametres is None:
+        parametres = load_calculation_parameters()
     
     # Calculer les points totaux
-    total_points = 0
-    for indicateur in indicateurs:
-        if indicateur.est_valide:
-            points = calculate_indicator_points(
-                indicateur.id, 
-                patientele=patientele, 
-                nombre_ps=nombre_ps, 
-                taux_dossiers=taux_dossiers
-            )
-            total_points += points
+    points = calculate_points_batch(indicateurs, parametres)
+    total_points = sum(points[indicateur.id] for indicateur in indicateurs if indicateur.est_valide)
     
     # Convertir en euros
-    total_euros = total_points * valeur_point
+    total_euros = total_points * parametres.valeur_point
     
     return total_euros
 
-def calculate_charges_total():
-    """Calcule le total des charges."""
-    session = get_session()
-    charges = session.query(Charge).all()
-    session.close()
-    
-    total_charges = sum(charge.montant for charge in charges)
-    return total_charges
-
-def calculate_net_revenue():
+def calculate_net_revenue(indicateurs=None, parametres=None):
     """Calcule le revenu net après déduction des charges."""
-    total_aci = calculate_total_aci_revenue()
+    total_aci = calculate_total_aci_revenue(indicateurs, parametres)
     total_charges = calculate_charges_total()
     
     return total_aci - total_charges
 
 def get_associes_repartition():
     """Récupère la répartition des revenus entre associés."""
-    session = get_session()
-    associes = session.query(Associe).all()
-    attributions = session.query(Attribution).all()
-    indicateurs = {i.id: i for i in session.query(Indicateur).all()}
-    session.close()
-    
-    # Calculer le revenu total ACI
-    total_aci = calculate_total_aci_revenue()
-    total_charges = calculate_charges_total()
-    net_revenue = total_aci - total_charges
-    
-    # Si net_revenue est négatif ou nul, pas de répartition à faire
-    if net_revenue <= 0:
-        return {}
-    
-    # Étape 1: Calculer d'abord les points et pourcentages relatifs pour chaque associé
-    # (sans convertir en euros)
-    pourcentages_associes = {}
-    points_associes = {}
-    points_totaux = 0
-    
-    # Initialiser les résultats
-    resultats = {}
-    for associe in associes:
-        resultats[associe.id] = {
-            "nom": f"{associe.prenom} {associe.nom}",
-            "fonction": associe.fonction,
-            "est_gerant": associe.est_gerant,
-            "coefficient": associe.coefficient_majoration,
-            "part_fixe": 0,
-            "part_variable": 0,
-            "total": 0,
-            "pourcentage": 0
-        }
-        points_associes[associe.id] = {"points_fixes": 0, "points_variables": 0}
-    
-    # Calculer les points pour chaque associé
-    for attribution in attributions:
-        if attribution.indicateur_id in indicateurs and indicateurs[attribution.indicateur_id].est_valide:
-            indicateur = indicateurs[attribution.indicateur_id]
-            
-            # Récupérer la répartition de cet indicateur
-            session = get_session()
-            repartition = session.query(Repartition).filter_by(indicateur_id=indicateur.id).first()
-            session.close()
-            
-            # Calculer les points pour cet indicateur
-            patientele = int(get_parameter_value("patientele") or 4000)
-            nombre_ps = int(get_parameter_value("nombre_ps") or 10)
-            taux_dossiers = float(get_parameter_value("taux_dossiers") or 5) / 100
-            
-            points = calculate_indicator_points(
-                indicateur.id, 
-                patientele=patientele, 
-                nombre_ps=nombre_ps, 
-                taux_dossiers=taux_dossiers
-            )
-            
-            # Répartir les points selon le mode de répartition
-            if repartition and repartition.est_commun:
-                # Répartition commune entre tous les associés avec leurs coefficients individuels
-                # Calculer le total des coefficients pour la pondération
-                total_poids = sum(a.coefficient_majoration for a in associes)
-                
-                # Calculer la part de base en points
-                part_base_points = points / total_poids
-                
-                # Calculer les points pour cet associé en fonction de son coefficient
-                associe_id = attribution.associe_id
-                session = get_session()
-                associe = session.query(Associe).filter_by(id=associe_id).first()
-                coefficient = associe.coefficient_majoration if associe else 1.0
-                session.close()
-                
-                part_points = part_base_points * coefficient
-                
-                if indicateur.type == 'socle' or indicateur.type == 'prérequis':
-                    points_associes[attribution.associe_id]["points_fixes"] += part_points
-                else:
-                    points_associes[attribution.associe_id]["points_variables"] += part_points
-            
-            else:
-                # Répartition personnalisée selon les pourcentages d'attribution
-                part_points = points * (attribution.pourcentage / 100)
-                
-                if indicateur.type == 'socle' or indicateur.type == 'prérequis':
-                    points_associes[attribution.associe_id]["points_fixes"] += part_points
-                else:
-                    points_associes[attribution.associe_id]["points_variables"] += part_points
-    
-    # Calculer les points totaux pour tous les associés
-    for associe_id in points_associes:
-        points_associes[associe_id]["total"] = points_associes[associe_id]["points_fixes"] + points_associes[associe_id]["points_variables"]
-        points_totaux += points_associes[associe_id]["total"]
-    
-    # Calculer les pourcentages de chaque associé sur le total des points
-    if points_totaux > 0:
-        for associe_id in points_associes:
-            pourcentages_associes[associe_id] = points_associes[associe_id]["total"] / points_totaux
-    
-    # Étape 2: Répartir le revenu net selon les pourcentages calculés
-    for associe_id in resultats:
-        if associe_id in pourcentages_associes:
-            # Calculer le montant en euros après déduction des charges
-            montant_total = net_revenue * pourcentages_associes[associe_id]
-            
-            # Répartition proportionnelle fixe/variable basée sur les points
-            total_points = points_associes[associe_id]["total"]
-            if total_points > 0:
-                ratio_fixe = points_associes[associe_id]["points_fixes"] / total_points
-                ratio_variable = points_associes[associe_id]["points_variables"] / total_points
-                
-                resultats[associe_id]["part_fixe"] = montant_total * ratio_fixe
-                resultats[associe_id]["part_variable"] = montant_total * ratio_variable
-                resultats[associe_id]["total"] = montant_total
-                resultats[associe_id]["pourcentage"] = pourcentages_associes[associe_id] * 100
-    
-    return resultats
+    # Charger toutes les données en quelques requêtes
+    donnees = load_repartition_data()
+    parametres = load_calculation_parameters()
+    
+    # Calculer une seule fois les points de chaque indicateur
+    points = calculate_points_batch(donnees["indicateurs"], parametres)
+    
+    # Calculer le revenu net à répartir
+    total_points = sum(points[i.id] for i in donnees["indicateurs"] if i.est_valide)
+    net_revenue = total_points * parametres.valeur_point - calculate_charges_total()
+    
+    return compute_repartition(
+        donnees["associes"],
+        donnees["indicateurs"],
+        donnees["attributions"],
+        donnees["repartitions"],
+        points,
+        net_revenue
+    )
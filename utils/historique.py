@@ -0,0 +1,239 @@
+import datetime
+import pandas as pd
+from models import Exercice, ExerciceValeur, Patientele
+from utils.db_config import get_session, bump_data_version
+from utils.param_store import parametres_store
+from utils.points import load_calculation_parameters
+from utils.repartition import load_repartition_data, calculate_results
+from utils.charges import calculate_charges_total, get_charges_by_category
+
+# Libellés des éléments conservés dans les instantanés annuels
+TYPES_INSTANTANE = {
+    "indicateur": "Validation des indicateurs",
+    "points": "Points par indicateur",
+    "axe": "Points par axe",
+    "associe": "Répartition entre associés",
+    "charges": "Charges par catégorie",
+    "parametre": "Paramètres"
+}
+
+# Éléments dont la valeur est numérique (l'écart entre deux années est calculé)
+TYPES_NUMERIQUES = ("points", "axe", "associe", "charges")
+
+# Les indicateurs et associés sont identifiés par leur id : leur nom est conservé dans
+# un élément à part, pour qu'un renommage ne soit pas vu comme une suppression suivie d'un ajout
+TYPES_LIBELLES = {
+    "indicateur": "nom_indicateur",
+    "points": "nom_indicateur",
+    "associe": "nom_associe"
+}
+
+def build_snapshot_state():
+    """Construit l'instantané de la structure courante.
+    
+    Retourne l'état détaillé sous forme de dictionnaire {(type, clé): valeur texte} et
+    les totaux enregistrés sur l'exercice. La clé d'un indicateur ou d'un associé est
+    son id ; son nom est enregistré sous le type donné par TYPES_LIBELLES.
+    """
+    donnees = load_repartition_data()
+    parametres = load_calculation_parameters()
+    total_charges = calculate_charges_total()
+    resultats = calculate_results(donnees, parametres, total_charges)
+    
+    etat = {}
+    par_axe = {}
+    for indicateur in donnees["indicateurs"]:
+        points = resultats["points"][indicateur.id]
+        cle = str(indicateur.id)
+        etat[("indicateur", cle)] = "1" if indicateur.est_valide else "0"
+        etat[("points", cle)] = repr(points)
+        etat[("nom_indicateur", cle)] = indicateur.nom
+        par_axe[indicateur.axe] = par_axe.get(indicateur.axe, 0.0) + points
+    
+    for axe, points in par_axe.items():
+        etat[("axe", axe)] = repr(points)
+    for associe_id, part in resultats["repartition"].items():
+        etat[("associe", str(associe_id))] = repr(part["total"])
+        etat[("nom_associe", str(associe_id))] = part["nom"]
+    for categorie, total in get_charges_by_category().items():
+        etat[("charges", categorie)] = repr(float(total))
+    for cle, valeur in parametres_store.valeurs().items():
+        etat[("parametre", cle)] = valeur
+    
+    resume = {
+        "patientele": parametres.patientele,
+        "nombre_ps": parametres.nombre_ps,
+        "valeur_point": parametres.valeur_point,
+        "total_points": resultats["total_points"],
+        "total_aci": resultats["total_aci"],
+        "total_charges": total_charges,
+        "net_revenue": resultats["net_revenue"]
+    }
+    
+    return etat, resume
+
+def _delta(precedent, etat):
+    """Retourne les lignes (type, clé, valeur) qui font passer de `precedent` à `etat`.
+    
+    Un élément disparu est représenté par une valeur vide (None).
+    """
+    lignes = [(type_, cle, valeur) for (type_, cle), valeur in etat.items() if precedent.get((type_, cle)) != valeur]
+    lignes += [(type_, cle, None) for (type_, cle) in precedent if (type_, cle) not in etat]
+    return lignes
+
+def _load_states(jusqu_a=None):
+    """Reconstitue l'état complet des années clôturées en rejouant leurs deltas.
+    
+    Retourne un dictionnaire {année: état}, dans l'ordre chronologique.
+    """
+    session = get_session()
+    requete_annees = session.query(Exercice.annee).order_by(Exercice.annee)
+    requete_valeurs = (
+        session.query(Exercice.annee, ExerciceValeur.type, ExerciceValeur.cle, ExerciceValeur.valeur)
+        .join(ExerciceValeur.exercice)
+        .order_by(Exercice.annee, ExerciceValeur.id)
+    )
+    if jusqu_a is not None:
+        requete_annees = requete_annees.filter(Exercice.annee <= jusqu_a)
+        requete_valeurs = requete_valeurs.filter(Exercice.annee <= jusqu_a)
+    annees = [annee for (annee,) in requete_annees]
+    lignes = requete_valeurs.all()
+    session.close()
+    
+    deltas = {}
+    for annee, type_, cle, valeur in lignes:
+        deltas.setdefault(annee, []).append((type_, cle, valeur))
+    
+    etats = {}
+    courant = {}
+    for annee in annees:
+        courant = dict(courant)
+        for type_, cle, valeur in deltas.get(annee, []):
+            if valeur is None:
+                courant.pop((type_, cle), None)
+            else:
+                courant[(type_, cle)] = valeur
+        etats[annee] = courant
+    
+    return etats
+
+def snapshot_year(annee=None):
+    """Clôture une année : enregistre l'instantané de la structure courante.
+    
+    Seules les valeurs ayant changé depuis l'année clôturée précédente sont stockées.
+    Clôturer à nouveau une année remplace son instantané. Retourne l'année clôturée.
+    """
+    if annee is None:
+        annee = parametres_store.get("annee_en_cours")
+    
+    etat, resume = build_snapshot_state()
+    etats = _load_states()
+    etats[annee] = etat
+    annees = sorted(etats)
+    
+    session = get_session()
+    exercices = {exercice.annee: exercice for exercice in session.query(Exercice).all()}
+    if annee not in exercices:
+        exercices[annee] = Exercice(annee=annee)
+        session.add(exercices[annee])
+    
+    exercice = exercices[annee]
+    exercice.date_cloture = datetime.date.today()
+    for champ, valeur in resume.items():
+        setattr(exercice, champ, valeur)
+    
+    # Réécrire les deltas de l'année clôturée et de l'année suivante, dont la référence change
+    position = annees.index(annee)
+    for rang in range(position, min(position + 2, len(annees))):
+        precedent = etats[annees[rang - 1]] if rang > 0 else {}
+        exercices[annees[rang]].valeurs = [
+            ExerciceValeur(type=type_, cle=cle, valeur=valeur)
+            for type_, cle, valeur in _delta(precedent, etats[annees[rang]])
+        ]
+    
+    # Conserver la patientèle de l'année
+    patientele = session.query(Patientele).filter_by(annee=annee).first()
+    if patientele:
+        patientele.nombre_patients = resume["patientele"]
+        patientele.date_mise_a_jour = datetime.date.today()
+    else:
+        session.add(Patientele(annee=annee, nombre_patients=resume["patientele"]))
+    
+    session.commit()
+    session.close()
+    
+    bump_data_version(("historique",))
+    return annee
+
+def get_history():
+    """Retourne les totaux enregistrés de chaque année clôturée, avec leur évolution annuelle."""
+    session = get_session()
+    exercices = session.query(Exercice).order_by(Exercice.annee).all()
+    session.close()
+    
+    historique = pd.DataFrame(
+        [
+            {
+                "annee": exercice.annee,
+                "date_cloture": exercice.date_cloture,
+                "patientele": exercice.patientele,
+                "nombre_ps": exercice.nombre_ps,
+                "valeur_point": exercice.valeur_point,
+                "total_points": exercice.total_points,
+                "total_aci": exercice.total_aci,
+                "total_charges": exercice.total_charges,
+                "net_revenue": exercice.net_revenue
+            }
+            for exercice in exercices
+        ],
+        columns=[
+            "annee", "date_cloture", "patientele", "nombre_ps", "valeur_point",
+            "total_points", "total_aci", "total_charges", "net_revenue"
+        ]
+    )
+    
+    # Évolution en pourcentage par rapport à l'année clôturée précédente
+    for colonne in ("total_points", "total_aci", "net_revenue"):
+        historique[f"evolution_{colonne}"] = historique[colonne].pct_change(fill_method=None) * 100
+    
+    return historique
+
+def compare_years(annee_a, annee_b):
+    """Compare les instantanés de deux années clôturées.
+    
+    Retourne un DataFrame avec une ligne par élément (type, élément, valeur de chaque
+    année, écart pour les valeurs numériques et indicateur de changement). Un élément
+    est désigné par son nom dans l'année comparée, à défaut dans l'année de référence.
+    """
+    etats = _load_states(jusqu_a=max(annee_a, annee_b))
+    etat_a = etats.get(annee_a, {})
+    etat_b = etats.get(annee_b, {})
+    
+    def libelle(type_, cle):
+        type_libelle = TYPES_LIBELLES.get(type_)
+        return etat_b.get((type_libelle, cle)) or etat_a.get((type_libelle, cle)) or cle
+    
+    elements = [(type_, cle) for type_, cle in set(etat_a) | set(etat_b) if type_ in TYPES_INSTANTANE]
+    lignes = []
+    for type_, cle in sorted(elements, key=lambda c: (list(TYPES_INSTANTANE).index(c[0]), libelle(*c), c[1])):
+        valeur_a = etat_a.get((type_, cle))
+        valeur_b = etat_b.get((type_, cle))
+        ecart = None
+        if type_ in TYPES_NUMERIQUES:
+            valeur_a = float(valeur_a) if valeur_a is not None else 0.0
+            valeur_b = float(valeur_b) if valeur_b is not None else 0.0
+            ecart = valeur_b - valeur_a
+        elif type_ == "indicateur":
+            valeur_a = valeur_a == "1"
+            valeur_b = valeur_b == "1"
+        
+        lignes.append({
+            "type": type_,
+            "element": libelle(type_, cle),
+            "valeur_a": valeur_a,
+            "valeur_b": valeur_b,
+            "ecart": ecart,
+            "modifie": valeur_a != valeur_b
+        })
+    
+    return pd.DataFrame(lignes, columns=["type", "element", "valeur_a", "valeur_b", "ecart", "modifie"])
@@ -163,6 +163,7 @@ def init_indicateurs():
             "points_fixes": 0,
             "points_variables": 350,
             "formule_calcul": "350 × patientele/4000",
+            "code_formule": "forfait_variable",
             "prorata": 1.0,
             "description": "350 points pour la première mission, proratisés selon la patientèle"
         },
@@ -173,6 +174,7 @@ def init_indicateurs():
             "points_fixes": 0,
             "points_variables": 350,
             "formule_calcul": "350 × patientele/4000",
+            "code_formule": "forfait_variable",
             "prorata": 1.0,
             "description": "350 points pour la deuxième mission, proratisés selon la patientèle"
         },
@@ -183,6 +185,7 @@ def init_indicateurs():
             "points_fixes": 200,
             "points_variables": 0,
             "formule_calcul": "200 points bonus si ≥ 2 missions réalisées",
+            "code_formule": "forfait_variable",
             "prorata": 1.0,
             "description": "200 points bonus dès que ≥ 2 missions sont réalisées"
         },
@@ -203,6 +206,7 @@ def init_indicateurs():
             "points_fixes": 0,
             "points_variables": 300,
             "formule_calcul": "300 × patientele/4000",
+            "code_formule": "forfait_variable",
             "prorata": 1.0,
             "description": "300 points niveau 2 proratisés selon la patientèle"
         },
@@ -257,6 +261,7 @@ def init_indicateurs():
             "points_fixes": 100,
             "points_variables": 0,
             "formule_calcul": "100 points par protocole (max 8)",
+            "code_formule": "protocoles_pluri_professionnels",
             "prorata": 1.0,
             "description": "Protocoles établis : 100 points par protocole, jusqu'à un maximum de 8 (soit 800 points maximum)."
         },
@@ -267,6 +272,7 @@ def init_indicateurs():
             "points_fixes": 140,
             "points_variables": 0,
             "formule_calcul": "140 points par protocole (100 + 40 si un IPA est intégré, max 8)",
+            "code_formule": "protocoles_pluri_professionnels",
             "prorata": 1.0,
             "description": "Intégration d'un IPA : 40 points supplémentaires par protocole si un infirmier en pratique avancée est intégré."
         },
@@ -277,6 +283,7 @@ def init_indicateurs():
             "points_fixes": 0,
             "points_variables": 1000,
             "formule_calcul": "1000 × patientele/4000 si au moins 6 réunions par an",
+            "code_formule": "concertation",
             "prorata": 1.0,
             "description": "Réunions RCP : 1000 points proratisés si au moins 6 réunions par an sont tenues."
         },
@@ -287,6 +294,7 @@ def init_indicateurs():
             "points_fixes": 0,
             "points_variables": 200,
             "formule_calcul": "200 points proratisés si compte-rendu formalisé",
+            "code_formule": "concertation",
             "prorata": 1.0,
             "description": "Étude de situations spécifiques : 200 points proratisés si ces réunions donnent lieu à au moins un compte-rendu formalisé."
         },
@@ -337,6 +345,7 @@ def init_indicateurs():
             "points_fixes": 100,
             "points_variables": 0,
             "formule_calcul": "100 points fixes (diagnostic de maturité)",
+            "code_formule": "forfait_variable",
             "prorata": 1.0,
             "description": "100 points niveau 1 (diagnostic de maturité)"
         },
@@ -347,6 +356,7 @@ def init_indicateurs():
             "points_fixes": 0,
             "points_variables": 200,
             "formule_calcul": "200 points proratisés selon la patientèle",
+            "code_formule": "forfait_variable",
             "prorata": 1.0,
             "description": "200 points niveau 2 proratisés selon la patientèle"
         },
@@ -357,6 +367,7 @@ def init_indicateurs():
             "points_fixes": 0,
             "points_variables": 300,
             "formule_calcul": "300 points proratisés selon la patientèle",
+            "code_formule": "forfait_variable",
             "prorata": 1.0,
             "description": "300 points niveau 3 proratisés selon la patientèle"
         },
@@ -367,6 +378,7 @@ def init_indicateurs():
             "points_fixes": 100,
             "points_variables": 0,
             "formule_calcul": "100 points fixes",
+            "code_formule": "protocoles_cooperation",
             "prorata": 1.0,
             "description": "100 points fixes pour les protocoles de coopération non programmée"
         },
@@ -377,6 +389,7 @@ def init_indicateurs():
             "points_fixes": 0,
             "points_variables": 100,
             "formule_calcul": "100 × patientele/4000",
+            "code_formule": "prorata_patientele",
             "prorata": 1.0,
             "description": "100 points proratisés selon la patientèle pour le parcours insuffisance cardiaque"
         },
@@ -411,6 +424,7 @@ def init_indicateurs():
             "points_fixes": 0,
             "points_variables": 200,
             "formule_calcul": "200 points pour chacun des 16 premiers professionnels équipés",
+            "code_formule": "si_jusqu_16_ps",
             "prorata": 1.0,
             "description": "Part variable équipement : 200 points pour chacun des 16 premiers professionnels équipés"
         },
@@ -421,6 +435,7 @@ def init_indicateurs():
             "points_fixes": 0,
             "points_variables": 150,
             "formule_calcul": "150 points pour chaque professionnel supplémentaire",
+            "code_formule": "si_au_dela_16_ps",
             "prorata": 1.0,
             "description": "Part variable équipement : 150 points pour chaque professionnel supplémentaire"
         },
@@ -443,7 +458,8 @@ def init_indicateurs():
         # Vérifier si l'indicateur existe déjà
         existing = session.query(Indicateur).filter_by(nom=indic["nom"]).first()
         if not existing:
-            session.add(Indicateur(**indic))
+            # La description sert de documentation : le modèle ne la stocke pas
+            session.add(Indicateur(**{cle: valeur for cle, valeur in indic.items() if cle != "description"}))
     
     session.commit()
     session.close()
@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+import pandas as pd
+from utils.helpers import format_currency
+
+def _taux(valide, total):
+    """Taux de validation (fraction), nul lorsqu'aucun point n'est possible."""
+    return valide / total if total > 0 else 0.0
+
+@dataclass(frozen=True)
+class KpiAxe:
+    """Points validés et potentiels d'un axe."""
+    axe: str
+    valide: float
+    total: float
+    montant: float
+
+    @property
+    def taux_validation(self):
+        return _taux(self.valide, self.total)
+
+@dataclass(frozen=True)
+class KpiSnapshot:
+    """Instantané des indicateurs clés de la structure courante (points, revenus, taux)."""
+    axes: tuple
+    points_valides: float
+    points_potentiels: float
+    montant_points: float
+    total_aci: float
+    total_charges: float
+    net_revenue: float
+    patientele: int
+    nombre_ps: int
+    valeur_point: float
+
+    @property
+    def taux_validation(self):
+        return _taux(self.points_valides, self.points_potentiels)
+
+    @property
+    def points_par_axe(self):
+        """Points par axe au format {axe: {"total", "valide"}} attendu par les graphiques."""
+        return {kpi.axe: {"total": kpi.total, "valide": kpi.valide} for kpi in self.axes}
+
+def build_kpi_snapshot(resultats, parametres):
+    """Construit en une passe l'instantané des indicateurs clés à partir des résultats calculés."""
+    axes = []
+    points_valides = 0.0
+    points_potentiels = 0.0
+    for axe, points in resultats["par_axe"].items():
+        axes.append(KpiAxe(
+            axe=axe,
+            valide=points["valide"],
+            total=points["total"],
+            montant=points["valide"] * parametres.valeur_point
+        ))
+        points_valides += points["valide"]
+        points_potentiels += points["total"]
+    
+    return KpiSnapshot(
+        axes=tuple(axes),
+        points_valides=points_valides,
+        points_potentiels=points_potentiels,
+        montant_points=points_valides * parametres.valeur_point,
+        total_aci=resultats["total_aci"],
+        total_charges=resultats["total_charges"],
+        net_revenue=resultats["net_revenue"],
+        patientele=parametres.patientele,
+        nombre_ps=parametres.nombre_ps,
+        valeur_point=parametres.valeur_point
+    )
+
+def build_axes_table(kpi):
+    """Construit le tableau des points par axe, avec sa ligne de total."""
+    lignes = [
+        {
+            "Axe": axe.axe,
+            "Points validés": axe.valide,
+            "Points potentiels": axe.total,
+            "Taux de validation": f"{axe.taux_validation * 100:.1f}%" if axe.total > 0 else "0%",
+            "Montant (€)": format_currency(axe.montant)
+        }
+        for axe in kpi.axes
+    ]
+    lignes.append({
+        "Axe": "Total",
+        "Points validés": kpi.points_valides,
+        "Points potentiels": kpi.points_potentiels,
+        "Taux de validation": f"{kpi.taux_validation * 100:.1f}%" if kpi.points_potentiels > 0 else "0%",
+        "Montant (€)": format_currency(kpi.montant_points)
+    })
+    
+    return pd.DataFrame(lignes, columns=["Axe", "Points validés", "Points potentiels", "Taux de validation", "Montant (€)"])
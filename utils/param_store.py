@@ -0,0 +1,101 @@
+import threading
+from models import Parametre
+from utils.db_config import get_session, bump_data_version, get_structure_id
+
+# Type et valeur par défaut des paramètres connus de l'application
+TYPES_PARAMETRES = {
+    "valeur_point": (float, 7.0),
+    "annee_en_cours": (int, 2023),
+    "version_avenant": (str, "Avenant 1 - Octobre 2022"),
+    "patientele": (int, 4000),
+    "nombre_ps": (int, 10),
+    "taux_dossiers": (float, 5.0),
+    "nb_protocoles": (int, 0),
+    "ponderation_gerants": (float, 1.0)
+}
+
+def convertir_parametre(cle, valeur, defaut=None):
+    """Convertit la valeur texte d'un paramètre dans son type déclaré."""
+    type_valeur, defaut_declare = TYPES_PARAMETRES.get(cle, (str, None))
+    if defaut is None:
+        defaut = defaut_declare
+    
+    if valeur is None or valeur == "":
+        return defaut
+    
+    try:
+        if type_valeur is int:
+            return int(float(valeur))
+        return type_valeur(valeur)
+    except (TypeError, ValueError):
+        return defaut
+
+class ParametreStore:
+    """Cache en mémoire de la table des paramètres.
+    
+    Les paramètres de chaque structure sont chargés en une seule requête au premier accès
+    puis servis depuis la mémoire ; chaque écriture passe par le store, qui met à jour la
+    base et le cache.
+    """
+
+    def __init__(self):
+        self._valeurs = {}
+        self._verrou = threading.Lock()
+
+    def _charger(self):
+        session = get_session()
+        valeurs = {p.cle: p.valeur for p in session.query(Parametre).all()}
+        session.close()
+        return valeurs
+
+    def valeurs(self):
+        """Retourne les valeurs brutes (texte) des paramètres de la structure courante."""
+        structure_id = get_structure_id()
+        valeurs = self._valeurs.get(structure_id)
+        if valeurs is None:
+            with self._verrou:
+                if structure_id not in self._valeurs:
+                    self._valeurs[structure_id] = self._charger()
+                valeurs = self._valeurs[structure_id]
+        return valeurs
+
+    def get_brut(self, cle):
+        """Retourne la valeur texte d'un paramètre, ou None s'il n'existe pas."""
+        return self.valeurs().get(cle)
+
+    def get(self, cle, defaut=None):
+        """Retourne la valeur typée d'un paramètre."""
+        return convertir_parametre(cle, self.get_brut(cle), defaut)
+
+    def set(self, cle, valeur, description=None):
+        """Enregistre un paramètre en base puis met à jour le cache."""
+        valeur = str(valeur)
+        session = get_session()
+        param = session.query(Parametre).filter_by(cle=cle).first()
+        
+        if param:
+            param.valeur = valeur
+            if description:
+                param.description = description
+        else:
+            param = Parametre(cle=cle, valeur=valeur, description=description)
+            session.add(param)
+        
+        session.commit()
+        session.close()
+        
+        structure_id = get_structure_id()
+        with self._verrou:
+            if structure_id in self._valeurs:
+                self._valeurs[structure_id] = {**self._valeurs[structure_id], cle: valeur}
+        
+        # Les résultats dépendant des paramètres doivent être recalculés
+        bump_data_version(("parametre", cle))
+
+    def invalider(self):
+        """Vide le cache ; il sera rechargé au prochain accès."""
+        with self._verrou:
+            self._valeurs = {}
+
+# Cache partagé par toutes les sessions de l'application
+parametres_store = ParametreStore()
@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from models import Indicateur
+from utils.db_config import get_session
+from utils.formules import registre_formules, FORMULE_FIXE
+from utils.param_store import parametres_store, convertir_parametre
+
+@dataclass(frozen=True)
+class ParametresCalcul:
+    """Instantané des paramètres utilisés pour le calcul des points."""
+    patientele: int = 4000
+    nombre_ps: int = 10
+    taux_dossiers: float = 0.05  # Exprimé en fraction (5 % -> 0.05)
+    nb_protocoles: int = 0
+    valeur_point: float = 7.0
+
+    @property
+    def taux_dossiers_pourcentage(self):
+        """Retourne le taux de dossiers exprimé en pourcentage, tel que saisi."""
+        return round(self.taux_dossiers * 100, 6)
+
+def load_indicateurs():
+    """Charge tous les indicateurs en une seule requête."""
+    session = get_session()
+    indicateurs = session.query(Indicateur).all()
+    session.close()
+    
+    return indicateurs
+
+def build_calculation_parameters(valeurs):
+    """Construit l'instantané des paramètres de calcul à partir de valeurs brutes {clé: texte}."""
+    return ParametresCalcul(
+        patientele=convertir_parametre("patientele", valeurs.get("patientele")),
+        nombre_ps=convertir_parametre("nombre_ps", valeurs.get("nombre_ps")),
+        taux_dossiers=convertir_parametre("taux_dossiers", valeurs.get("taux_dossiers")) / 100,
+        nb_protocoles=convertir_parametre("nb_protocoles", valeurs.get("nb_protocoles")),
+        valeur_point=convertir_parametre("valeur_point", valeurs.get("valeur_point"))
+    )
+
+def load_calculation_parameters():
+    """Construit l'instantané des paramètres de calcul à partir du cache des paramètres."""
+    return build_calculation_parameters(parametres_store.valeurs())
+
+def calculate_potential_points(indicateur):
+    """Points obtenus si l'indicateur était validé, hors formule de calcul."""
+    return ((indicateur.points_fixes or 0) + (indicateur.points_variables or 0)) * indicateur.prorata
+
+def evaluate_indicator(indicateur, parametres, registre=registre_formules):
+    """Évalue les points d'un indicateur chargé à partir d'un instantané de paramètres."""
+    # Un indicateur non validé ne rapporte aucun point
+    if not indicateur.est_valide:
+        return 0.0
+    
+    # La formule dédiée ne s'applique qu'aux indicateurs comportant des points variables
+    if indicateur.points_variables > 0:
+        formule = registre.formule_pour(indicateur)
+    else:
+        formule = FORMULE_FIXE
+    
+    points_fixes, points_variables = formule.evaluer(indicateur.points_fixes, indicateur.points_variables, parametres)
+    
+    # Appliquer le prorata si défini
+    return (points_fixes + points_variables) * indicateur.prorata
+
+def compute_indicator_points(indicateur, patientele=None, nombre_ps=None, taux_dossiers=None, nb_protocoles=None):
+    """Calcule les points d'un indicateur déjà chargé, sans accès à la base de données."""
+    parametres = ParametresCalcul(
+        patientele=patientele or 0,
+        nombre_ps=nombre_ps or 0,
+        taux_dossiers=taux_dossiers or 0,
+        nb_protocoles=nb_protocoles or 0
+    )
+    
+    return evaluate_indicator(indicateur, parametres)
+
+def calculate_points_batch(indicateurs, parametres):
+    """Calcule en une seule passe les points de tous les indicateurs fournis.
+    
+    Retourne un dictionnaire {indicateur_id: points} à partir d'indicateurs déjà chargés
+    et d'un instantané de paramètres, sans aucune requête supplémentaire.
+    """
+    return {indicateur.id: evaluate_indicator(indicateur, parametres) for indicateur in indicateurs}
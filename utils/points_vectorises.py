@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from utils.formules import registre_formules
+
+def indicateurs_to_frame(indicateurs, registre=registre_formules):
+    """Charge les indicateurs dans un tableau en colonnes, avec le code de formule de chacun."""
+    return pd.DataFrame({
+        "id": [i.id for i in indicateurs],
+        "axe": [i.axe for i in indicateurs],
+        "type": [i.type for i in indicateurs],
+        "points_fixes": np.array([i.points_fixes or 0 for i in indicateurs], dtype=float),
+        "points_variables": np.array([i.points_variables or 0 for i in indicateurs], dtype=float),
+        "prorata": np.array([i.prorata for i in indicateurs], dtype=float),
+        "est_valide": np.array([bool(i.est_valide) for i in indicateurs], dtype=bool),
+        "code": [registre.code_pour(i) for i in indicateurs]
+    })
+
+def evaluate_points_vectorized(tableau, parametres, est_valide=None, registre=registre_formules):
+    """Évalue les points de tout le tableau d'indicateurs par opérations sur tableaux.
+    
+    Les champs de `parametres` peuvent être des scalaires ou des tableaux de forme (S, 1)
+    pour évaluer S scénarios à la fois ; `est_valide` peut de même être un masque (S, N).
+    Retourne un tableau de forme (N,) ou (S, N).
+    """
+    points_fixes = tableau["points_fixes"].to_numpy(dtype=float)
+    points_variables = tableau["points_variables"].to_numpy(dtype=float)
+    prorata = tableau["prorata"].to_numpy(dtype=float)
+    codes = tableau["code"].to_numpy()
+    if est_valide is None:
+        est_valide = tableau["est_valide"].to_numpy(dtype=bool)
+    
+    # Dimensions du résultat : une ligne par scénario, une colonne par indicateur
+    forme = np.broadcast_shapes(
+        points_fixes.shape,
+        np.shape(est_valide),
+        np.shape(parametres.patientele),
+        np.shape(parametres.nombre_ps),
+        np.shape(parametres.taux_dossiers),
+        np.shape(parametres.nb_protocoles)
+    )
+    fixes = np.array(np.broadcast_to(points_fixes, forme), dtype=float)
+    variables = np.zeros(forme)
+    
+    # La formule dédiée ne s'applique qu'aux indicateurs comportant des points variables
+    avec_formule = points_variables > 0
+    for code in np.unique(codes[avec_formule]):
+        colonnes = np.flatnonzero(avec_formule & (codes == code))
+        formule = registre.formule_par_code(code)
+        fixes_code, variables_code = formule.evaluer_tableau(
+            points_fixes[colonnes],
+            points_variables[colonnes],
+            parametres
+        )
+        fixes[..., colonnes] = fixes_code
+        variables[..., colonnes] = variables_code
+    
+    # Appliquer le prorata et ne conserver que les indicateurs validés
+    return np.where(est_valide, (fixes + variables) * prorata, 0.0)
+
+def total_points_by_axe_vectorized(tableau, parametres):
+    """Calcule les points validés et potentiels par axe en un seul regroupement."""
+    resultats = pd.DataFrame({
+        "axe": tableau["axe"],
+        "valide": evaluate_points_vectorized(tableau, parametres),
+        "total": (tableau["points_fixes"] + tableau["points_variables"]) * tableau["prorata"]
+    })
+    par_axe = resultats.groupby("axe", sort=False)[["total", "valide"]].sum()
+    
+    return {
+        axe: {"total": float(ligne["total"]), "valide": float(ligne["valide"])}
+        for axe, ligne in par_axe.iterrows()
+    }
@@ -0,0 +1,301 @@
+import numpy as np
+from sqlalchemy import insert, update
+from models import Indicateur, Associe, Repartition, Attribution
+from utils.db_config import get_session, bump_data_version
+from utils.points_vectorises import indicateurs_to_frame, evaluate_points_vectorized
+
+# Types d'indicateurs dont les points alimentent la part fixe des associés
+TYPES_PART_FIXE = ("socle", "prérequis")
+
+def load_repartition_data():
+    """Charge en une requête par table les données nécessaires à la répartition.
+    
+    Retourne un dictionnaire contenant les associés, les indicateurs,
+    les attributions et le mode de répartition (est_commun) de chaque indicateur.
+    """
+    session = get_session()
+    associes = session.query(Associe).all()
+    indicateurs = session.query(Indicateur).all()
+    attributions = session.query(
+        Attribution.associe_id,
+        Attribution.indicateur_id,
+        Attribution.pourcentage
+    ).all()
+    repartitions = session.query(Repartition.indicateur_id, Repartition.est_commun).order_by(Repartition.id).all()
+    session.close()
+    
+    # Ne conserver que la première répartition définie pour chaque indicateur
+    modes_repartition = {}
+    for indicateur_id, est_commun in repartitions:
+        modes_repartition.setdefault(indicateur_id, est_commun)
+    
+    return {
+        "associes": associes,
+        "indicateurs": indicateurs,
+        "attributions": attributions,
+        "repartitions": modes_repartition
+    }
+
+def load_repartition_config():
+    """Charge en une requête jointe la configuration de répartition de chaque indicateur.
+    
+    Retourne un dictionnaire {indicateur_id: {"repartition_id", "est_commun", "attributions"}},
+    où "attributions" est la liste des couples (associe_id, pourcentage) enregistrés.
+    Seule la première répartition définie pour un indicateur est retenue ; un indicateur
+    sans répartition a un "repartition_id" vide.
+    """
+    session = get_session()
+    lignes = session.query(
+        Indicateur.id,
+        Repartition.id,
+        Repartition.est_commun,
+        Attribution.associe_id,
+        Attribution.pourcentage
+    ).outerjoin(
+        Repartition, Repartition.indicateur_id == Indicateur.id
+    ).outerjoin(
+        Attribution, Attribution.indicateur_id == Indicateur.id
+    ).order_by(Indicateur.id, Repartition.id, Attribution.id).all()
+    session.close()
+    
+    configuration = {}
+    for indicateur_id, repartition_id, est_commun, associe_id, pourcentage in lignes:
+        if indicateur_id not in configuration:
+            configuration[indicateur_id] = {"repartition_id": repartition_id, "est_commun": est_commun, "attributions": []}
+        
+        # Les attributions sont répétées pour chaque répartition en double : ne lire que la première
+        config = configuration[indicateur_id]
+        if associe_id is not None and repartition_id == config["repartition_id"]:
+            config["attributions"].append((associe_id, pourcentage))
+    
+    return configuration
+
+def create_default_repartitions(indicateur_ids):
+    """Crée en une seule transaction la répartition par défaut (commune, égalitaire) des indicateurs donnés."""
+    if not indicateur_ids:
+        return 0
+    
+    session = get_session()
+    session.execute(insert(Repartition), [
+        {"indicateur_id": indicateur_id, "est_commun": True, "mode_repartition": "egalitaire"}
+        for indicateur_id in indicateur_ids
+    ])
+    session.commit()
+    session.close()
+    
+    bump_data_version(("repartition",))
+    return len(indicateur_ids)
+
+def sync_attributions(attributions_souhaitees):
+    """Aligne les attributions enregistrées sur les attributions souhaitées, en une seule transaction.
+    
+    `attributions_souhaitees` associe à chaque identifiant d'indicateur un dictionnaire
+    {associe_id: pourcentage}. Seules les différences sont écrites (ajouts, pourcentages
+    modifiés, attributions en trop ou en double) ; retourne le nombre de lignes écrites.
+    """
+    if not attributions_souhaitees:
+        return 0
+    
+    session = get_session()
+    existantes = session.query(
+        Attribution.id,
+        Attribution.indicateur_id,
+        Attribution.associe_id,
+        Attribution.pourcentage
+    ).filter(Attribution.indicateur_id.in_(list(attributions_souhaitees))).order_by(Attribution.id).all()
+    
+    # Comparer les lignes existantes à l'état souhaité
+    conservees = set()
+    a_supprimer = []
+    a_modifier = []
+    for attribution_id, indicateur_id, associe_id, pourcentage in existantes:
+        souhaitees = attributions_souhaitees[indicateur_id]
+        if associe_id not in souhaitees or (indicateur_id, associe_id) in conservees:
+            a_supprimer.append(attribution_id)
+            continue
+        
+        conservees.add((indicateur_id, associe_id))
+        if pourcentage != souhaitees[associe_id]:
+            a_modifier.append({"id": attribution_id, "pourcentage": souhaitees[associe_id]})
+    
+    a_inserer = [
+        {"indicateur_id": indicateur_id, "associe_id": associe_id, "pourcentage": pourcentage}
+        for indicateur_id, souhaitees in attributions_souhaitees.items()
+        for associe_id, pourcentage in souhaitees.items()
+        if (indicateur_id, associe_id) not in conservees
+    ]
+    
+    if a_supprimer:
+        session.query(Attribution).filter(Attribution.id.in_(a_supprimer)).delete(synchronize_session=False)
+    if a_modifier:
+        session.execute(update(Attribution), a_modifier)
+    if a_inserer:
+        session.execute(insert(Attribution), a_inserer)
+    
+    nb_ecritures = len(a_supprimer) + len(a_modifier) + len(a_inserer)
+    if nb_ecritures:
+        session.commit()
+    session.close()
+    
+    if nb_ecritures:
+        bump_data_version(("repartition",))
+    return nb_ecritures
+
+class MatriceRepartition:
+    """Matrice des poids d'attribution : une ligne par associé, une colonne par indicateur.
+    
+    Chaque cellule contient la part de l'indicateur revenant à l'associé : son coefficient
+    rapporté au poids total pour un indicateur commun, son pourcentage sinon. Le produit
+    par le vecteur des points donne les points fixes et variables de chaque associé.
+    """
+
+    def __init__(self, associes, indicateurs, attributions, repartitions):
+        self.associe_ids = [a.id for a in associes]
+        self.indicateur_ids = [i.id for i in indicateurs]
+        lignes_associes = {associe_id: ligne for ligne, associe_id in enumerate(self.associe_ids)}
+        colonnes_indicateurs = {indicateur_id: colonne for colonne, indicateur_id in enumerate(self.indicateur_ids)}
+        
+        # Poids de chaque associé dans la répartition commune
+        coefficients = np.array([a.coefficient_majoration for a in associes], dtype=float)
+        total_poids = coefficients.sum()
+        
+        # Construire les triplets (ligne, colonne, poids) des attributions connues
+        lignes, colonnes, poids = [], [], []
+        for associe_id, indicateur_id, pourcentage in attributions:
+            ligne = lignes_associes.get(associe_id)
+            colonne = colonnes_indicateurs.get(indicateur_id)
+            if ligne is None or colonne is None:
+                continue
+            
+            lignes.append(ligne)
+            colonnes.append(colonne)
+            if repartitions.get(indicateur_id):
+                poids.append(coefficients[ligne] / total_poids if total_poids else 0.0)
+            else:
+                poids.append((pourcentage or 0) / 100)
+        
+        # Cumuler les triplets dans la matrice (les doublons s'additionnent)
+        self.poids = np.zeros((len(self.associe_ids), len(self.indicateur_ids)))
+        np.add.at(self.poids, (np.array(lignes, dtype=int), np.array(colonnes, dtype=int)), np.array(poids, dtype=float))
+        
+        # Séparer les colonnes alimentant la part fixe de celles alimentant la part variable
+        est_fixe = np.array([i.type in TYPES_PART_FIXE for i in indicateurs], dtype=bool)
+        self.poids_fixes = self.poids * est_fixe
+        self.poids_variables = self.poids * ~est_fixe
+
+    def vecteur_points(self, points):
+        """Convertit un dictionnaire {indicateur_id: points} en vecteur aligné sur les colonnes."""
+        return np.array([points.get(indicateur_id, 0.0) for indicateur_id in self.indicateur_ids], dtype=float)
+
+    def points_par_associe(self, points):
+        """Retourne les points fixes et variables de chaque associé.
+        
+        `points` est un vecteur (N,) ou un tableau (S, N) de scénarios ; le résultat
+        a la forme (A,) ou (S, A).
+        """
+        points = np.asarray(points, dtype=float)
+        return points @ self.poids_fixes.T, points @ self.poids_variables.T
+
+def repartir_revenu(points_fixes, points_variables, net_revenue):
+    """Répartit le revenu net au prorata des points de chaque associé.
+    
+    Les points sont des tableaux (A,) ou (S, A) ; `net_revenue` est un scalaire
+    ou un tableau (S, 1). Aucun montant n'est réparti si le revenu net est négatif ou nul.
+    """
+    total_points = points_fixes + points_variables
+    points_totaux = total_points.sum(axis=-1, keepdims=True)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pourcentage = np.where(points_totaux > 0, total_points / points_totaux, 0.0)
+        ratio_fixe = np.where(total_points > 0, points_fixes / total_points, 0.0)
+        ratio_variable = np.where(total_points > 0, points_variables / total_points, 0.0)
+    
+    montant_total = np.where(np.asarray(net_revenue) > 0, net_revenue * pourcentage, 0.0)
+    
+    return {
+        "points": total_points,
+        "pourcentage": pourcentage * 100,
+        "part_fixe": montant_total * ratio_fixe,
+        "part_variable": montant_total * ratio_variable,
+        "total": montant_total
+    }
+
+def compute_repartition(associes, indicateurs, attributions, repartitions, points, net_revenue):
+    """Répartit le revenu net entre associés à partir de données déjà chargées.
+    
+    `points` associe à chaque indicateur ses points calculés et `repartitions` indique
+    pour chaque indicateur s'il est commun à tous les associés.
+    """
+    # Si net_revenue est négatif ou nul, pas de répartition à faire
+    if net_revenue <= 0:
+        return {}
+    
+    # Calculer les points de tous les associés par produit matriciel
+    matrice = MatriceRepartition(associes, indicateurs, attributions, repartitions)
+    points_fixes, points_variables = matrice.points_par_associe(matrice.vecteur_points(points))
+    
+    return repartition_results(associes, matrice.associe_ids, points_fixes, points_variables, net_revenue)
+
+def repartition_results(associes, associe_ids, points_fixes, points_variables, net_revenue):
+    """Construit le résultat de la répartition à partir des points fixes et variables des associés.
+    
+    `associe_ids` donne l'identifiant de l'associé correspondant à chaque position des vecteurs.
+    """
+    if net_revenue <= 0:
+        return {}
+    
+    # Initialiser les résultats
+    resultats = {}
+    for associe in associes:
+        resultats[associe.id] = {
+            "nom": f"{associe.prenom} {associe.nom}",
+            "fonction": associe.fonction,
+            "est_gerant": associe.est_gerant,
+            "coefficient": associe.coefficient_majoration,
+            "part_fixe": 0,
+            "part_variable": 0,
+            "total": 0,
+            "pourcentage": 0
+        }
+    
+    parts = repartir_revenu(points_fixes, points_variables, net_revenue)
+    
+    # Reporter les montants des associés ayant des points
+    for ligne, associe_id in enumerate(associe_ids):
+        if parts["points"][ligne] > 0:
+            resultats[associe_id]["part_fixe"] = float(parts["part_fixe"][ligne])
+            resultats[associe_id]["part_variable"] = float(parts["part_variable"][ligne])
+            resultats[associe_id]["total"] = float(parts["total"][ligne])
+            resultats[associe_id]["pourcentage"] = float(parts["pourcentage"][ligne])
+    
+    return resultats
+
+def calculate_results(donnees, parametres, total_charges):
+    """Calcule les points, les revenus et la répartition à partir de données déjà chargées.
+    
+    `donnees` est le dictionnaire retourné par load_repartition_data. Retourne les points
+    de chaque indicateur, le total des points, le revenu ACI, le revenu net et la
+    répartition entre associés.
+    """
+    indicateurs = donnees["indicateurs"]
+    points = {}
+    if indicateurs:
+        valeurs = evaluate_points_vectorized(indicateurs_to_frame(indicateurs), parametres)
+        points = {indicateur.id: float(p) for indicateur, p in zip(indicateurs, valeurs)}
+    
+    total_points = sum(points.values())
+    total_aci = total_points * parametres.valeur_point
+    net_revenue = total_aci - total_charges
+    
+    matrice = MatriceRepartition(donnees["associes"], indicateurs, donnees["attributions"], donnees["repartitions"])
+    points_fixes, points_variables = matrice.points_par_associe(matrice.vecteur_points(points))
+    
+    return {
+        "points": points,
+        "total_points": total_points,
+        "total_aci": total_aci,
+        "net_revenue": net_revenue,
+        "repartition": repartition_results(
+            donnees["associes"], matrice.associe_ids, points_fixes, points_variables, net_revenue
+        )
+    }
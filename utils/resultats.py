@@ -0,0 +1,132 @@
+import hashlib
+import datetime
+from sqlalchemy import insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import (
+    ResultatCalcul,
+    ResultatIndicateur,
+    ResultatAxe,
+    ResultatAssocie
+)
+from utils.db_config import get_session, get_structure_id
+from utils.graphe_calcul import get_graphe_calcul, compute_input_hashes
+
+# À incrémenter lorsque les règles de calcul changent : les résultats enregistrés
+# avec une version antérieure sont alors recalculés
+VERSION_CALCUL = 1
+
+def compute_input_hash(empreintes=None):
+    """Calcule l'empreinte globale des données d'entrée du calcul de la structure courante."""
+    if empreintes is None:
+        empreintes = compute_input_hashes()
+    
+    empreinte = hashlib.sha256(f"calcul-{VERSION_CALCUL}".encode())
+    for indicateur_id, empreinte_indicateur in sorted(empreintes["indicateurs"].items()):
+        empreinte.update(f"{indicateur_id}:{empreinte_indicateur}".encode())
+    for partie in ("repartition", "parametres", "charges"):
+        empreinte.update(f"|{empreintes[partie]}".encode())
+    
+    return empreinte.hexdigest()
+
+def refresh_results():
+    """Recalcule et enregistre les résultats si les données d'entrée ont changé.
+    
+    Les résultats enregistrés sont ceux du graphe de calcul de la structure courante.
+    Retourne True si les tables de résultats ont été réécrites.
+    """
+    empreinte = compute_input_hash()
+    
+    session = get_session()
+    entete = session.query(ResultatCalcul).first()
+    if entete is not None and entete.empreinte == empreinte:
+        session.close()
+        return False
+    
+    resultats = get_graphe_calcul().resultats()
+    
+    # Deux sessions peuvent enregistrer en même temps les premiers résultats d'une structure :
+    # l'en-tête, unique par structure, est inséré ou mis à jour en une instruction
+    valeurs = {
+        "empreinte": empreinte,
+        "date_calcul": datetime.date.today(),
+        **{champ: resultats[champ] for champ in ("total_points", "total_aci", "total_charges", "net_revenue")}
+    }
+    session.execute(
+        sqlite_insert(ResultatCalcul)
+        .values(structure_id=get_structure_id(), **valeurs)
+        .on_conflict_do_update(index_elements=["structure_id"], set_=valeurs)
+    )
+    
+    # Remplacer les lignes de résultats de la structure
+    for modele in (ResultatIndicateur, ResultatAxe, ResultatAssocie):
+        session.query(modele).delete(synchronize_session=False)
+    
+    if resultats["points"]:
+        session.execute(insert(ResultatIndicateur), [
+            {"indicateur_id": indicateur_id, "points": points}
+            for indicateur_id, points in resultats["points"].items()
+        ])
+    if resultats["par_axe"]:
+        session.execute(insert(ResultatAxe), [
+            {"rang": rang, "axe": axe, "total": totaux["total"], "valide": totaux["valide"]}
+            for rang, (axe, totaux) in enumerate(resultats["par_axe"].items())
+        ])
+    if resultats["repartition"]:
+        session.execute(insert(ResultatAssocie), [
+            {
+                "rang": rang,
+                "associe_id": associe_id,
+                "nom": part["nom"],
+                "fonction": part["fonction"],
+                "est_gerant": part["est_gerant"],
+                "coefficient": part["coefficient"],
+                "part_fixe": part["part_fixe"],
+                "part_variable": part["part_variable"],
+                "total": part["total"],
+                "pourcentage": part["pourcentage"]
+            }
+            for rang, (associe_id, part) in enumerate(resultats["repartition"].items())
+        ])
+    
+    session.commit()
+    session.close()
+    return True
+
+def load_results():
+    """Retourne les résultats enregistrés de la structure courante, rafraîchis s'ils sont périmés."""
+    refresh_results()
+    
+    session = get_session()
+    entete = session.query(ResultatCalcul).one()
+    points = dict(session.query(ResultatIndicateur.indicateur_id, ResultatIndicateur.points))
+    par_axe = {
+        axe: {"total": total, "valide": valide}
+        for axe, total, valide in session.query(ResultatAxe.axe, ResultatAxe.total, ResultatAxe.valide).order_by(ResultatAxe.rang)
+    }
+    repartition = {
+        ligne.associe_id: {
+            "nom": ligne.nom,
+            "fonction": ligne.fonction,
+            "est_gerant": ligne.est_gerant,
+            "coefficient": ligne.coefficient,
+            "part_fixe": ligne.part_fixe,
+            "part_variable": ligne.part_variable,
+            "total": ligne.total,
+            "pourcentage": ligne.pourcentage
+        }
+        for ligne in session.query(ResultatAssocie).order_by(ResultatAssocie.rang)
+    }
+    resultats = {
+        "empreinte": entete.empreinte,
+        "date_calcul": entete.date_calcul,
+        "points": points,
+        "par_axe": par_axe,
+        "total_points": entete.total_points,
+        "total_aci": entete.total_aci,
+        "total_charges": entete.total_charges,
+        "net_revenue": entete.net_revenue,
+        "repartition": repartition
+    }
+    session.close()
+    
+    return resultats
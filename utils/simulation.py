@@ -0,0 +1,100 @@
+import itertools
+import numpy as np
+import pandas as pd
+from utils.points import ParametresCalcul, load_calculation_parameters
+from utils.points_vectorises import indicateurs_to_frame, evaluate_points_vectorized
+from utils.repartition import load_repartition_data, MatriceRepartition, repartir_revenu, TYPES_PART_FIXE
+from utils.charges import calculate_charges_total
+
+# Nombre de scénarios évalués par lot (borne la mémoire des tableaux scénarios x indicateurs)
+TAILLE_LOT_SIMULATION = 20000
+
+# Nom du jeu de validation correspondant aux indicateurs actuellement validés
+VALIDATION_ACTUELLE = "Validation actuelle"
+
+def build_validation_sets(indicateurs):
+    """Construit les jeux de validation proposés par défaut pour la simulation.
+    
+    Chaque jeu est un masque booléen aligné sur la liste des indicateurs.
+    """
+    return {
+        VALIDATION_ACTUELLE: np.array([bool(i.est_valide) for i in indicateurs], dtype=bool),
+        "Socles et prérequis uniquement": np.array([i.type in TYPES_PART_FIXE for i in indicateurs], dtype=bool),
+        "Tous les indicateurs validés": np.ones(len(indicateurs), dtype=bool)
+    }
+
+def build_scenario_grid(patienteles, nombres_ps, taux_dossiers, valeurs_point, jeux_validation=(VALIDATION_ACTUELLE,)):
+    """Construit le produit cartésien des valeurs à explorer, un scénario par ligne.
+    
+    Le taux de dossiers est exprimé en pourcentage, tel que saisi dans l'application.
+    """
+    combinaisons = list(itertools.product(patienteles, nombres_ps, taux_dossiers, valeurs_point, jeux_validation))
+    return pd.DataFrame(
+        combinaisons,
+        columns=["patientele", "nombre_ps", "taux_dossiers", "valeur_point", "jeu_validation"]
+    )
+
+def simulate_scenarios(scenarios, donnees=None, jeux_validation=None, total_charges=None, taille_lot=TAILLE_LOT_SIMULATION):
+    """Évalue une grille de scénarios par calcul vectorisé sur des lots de scénarios.
+    
+    Retourne deux DataFrame alignés sur `scenarios` : les indicateurs globaux de chaque
+    scénario (total_points, total_aci, net_revenue) et le montant revenant à chaque associé.
+    """
+    # Données communes à tous les scénarios, chargées une seule fois
+    if donnees is None:
+        donnees = load_repartition_data()
+    if total_charges is None:
+        total_charges = calculate_charges_total()
+    indicateurs = donnees["indicateurs"]
+    if jeux_validation is None:
+        jeux_validation = build_validation_sets(indicateurs)
+    
+    tableau = indicateurs_to_frame(indicateurs)
+    matrice = MatriceRepartition(donnees["associes"], indicateurs, donnees["attributions"], donnees["repartitions"])
+    nb_protocoles = load_calculation_parameters().nb_protocoles
+    
+    # Masques de validation indexés par le nom du jeu
+    noms_jeux = list(jeux_validation)
+    masques = np.array([jeux_validation[nom] for nom in noms_jeux], dtype=bool).reshape(len(noms_jeux), len(indicateurs))
+    indices_jeux = pd.Categorical(scenarios["jeu_validation"], categories=noms_jeux).codes
+    
+    totaux = []
+    parts_associes = []
+    for debut in range(0, len(scenarios), taille_lot):
+        lot = scenarios.iloc[debut:debut + taille_lot]
+        
+        # Paramètres du lot sous forme de colonnes (S, 1), diffusées sur les indicateurs
+        parametres = ParametresCalcul(
+            patientele=lot["patientele"].to_numpy(dtype=float)[:, None],
+            nombre_ps=lot["nombre_ps"].to_numpy(dtype=float)[:, None],
+            taux_dossiers=lot["taux_dossiers"].to_numpy(dtype=float)[:, None] / 100,
+            nb_protocoles=nb_protocoles,
+            valeur_point=lot["valeur_point"].to_numpy(dtype=float)[:, None]
+        )
+        est_valide = masques[indices_jeux[debut:debut + taille_lot]]
+        
+        # Points (S, N), revenus (S, 1) puis parts des associés (S, A)
+        points = evaluate_points_vectorized(tableau, parametres, est_valide=est_valide)
+        total_points = points.sum(axis=1, keepdims=True)
+        total_aci = total_points * parametres.valeur_point
+        net_revenue = total_aci - total_charges
+        
+        points_fixes, points_variables = matrice.points_par_associe(points)
+        parts = repartir_revenu(points_fixes, points_variables, net_revenue)
+        
+        totaux.append(np.hstack([total_points, total_aci, net_revenue]))
+        parts_associes.append(parts["total"])
+    
+    resultats = pd.DataFrame(
+        np.vstack(totaux) if totaux else np.empty((0, 3)),
+        columns=["total_points", "total_aci", "net_revenue"],
+        index=scenarios.index
+    )
+    noms_associes = {a.id: f"{a.prenom} {a.nom}" for a in donnees["associes"]}
+    parts = pd.DataFrame(
+        np.vstack(parts_associes) if parts_associes else np.empty((0, len(matrice.associe_ids))),
+        columns=[noms_associes[associe_id] for associe_id in matrice.associe_ids],
+        index=scenarios.index
+    )
+    
+    return pd.concat([scenarios, resultats], axis=1), parts
@@ -0,0 +1,103 @@
+import pandas as pd
+from sqlalchemy import func
+from models import Structure, Indicateur, Associe, Charge, Parametre
+from utils.db_config import get_session, bump_data_version, structure_active
+from utils.init_data import init_parametres, init_indicateurs
+from utils.points import build_calculation_parameters
+from utils.points_vectorises import indicateurs_to_frame, evaluate_points_vectorized
+
+def list_structures():
+    """Retourne la liste des structures enregistrées."""
+    session = get_session()
+    structures = session.query(Structure).order_by(Structure.id).all()
+    session.close()
+    
+    return structures
+
+def create_structure(nom):
+    """Crée une structure, initialisée avec les paramètres et indicateurs par défaut.
+    
+    Retourne l'identifiant de la nouvelle structure ; lève ValueError si le nom est vide
+    ou déjà utilisé.
+    """
+    nom = (nom or "").strip()
+    if not nom:
+        raise ValueError("Le nom de la structure est obligatoire.")
+    
+    session = get_session()
+    if session.query(Structure).filter_by(nom=nom).first():
+        session.close()
+        raise ValueError(f"La structure « {nom} » existe déjà.")
+    
+    structure = Structure(nom=nom)
+    session.add(structure)
+    session.commit()
+    structure_id = structure.id
+    session.close()
+    
+    with structure_active(structure_id):
+        init_parametres()
+        init_indicateurs()
+    
+    bump_data_version(("structures",))
+    return structure_id
+
+def get_consolidation():
+    """Calcule les résultats de toutes les structures pour une vue consolidée.
+    
+    Les données de l'ensemble des structures sont lues en quelques requêtes groupées par
+    structure, puis les points de chacune sont évalués par calcul vectorisé.
+    Retourne un DataFrame avec une ligne par structure.
+    """
+    session = get_session()
+    structures = session.query(Structure).order_by(Structure.id).all()
+    
+    charges = dict(
+        session.query(Charge.structure_id, func.sum(Charge.montant))
+        .group_by(Charge.structure_id)
+        .execution_options(toutes_structures=True)
+        .all()
+    )
+    nombres_associes = dict(
+        session.query(Associe.structure_id, func.count(Associe.id))
+        .group_by(Associe.structure_id)
+        .execution_options(toutes_structures=True)
+        .all()
+    )
+    
+    valeurs_parametres = {}
+    for structure_id, cle, valeur in (
+        session.query(Parametre.structure_id, Parametre.cle, Parametre.valeur)
+        .execution_options(toutes_structures=True)
+    ):
+        valeurs_parametres.setdefault(structure_id, {})[cle] = valeur
+    
+    indicateurs_par_structure = {}
+    for indicateur in session.query(Indicateur).execution_options(toutes_structures=True):
+        indicateurs_par_structure.setdefault(indicateur.structure_id, []).append(indicateur)
+    session.close()
+    
+    lignes = []
+    for structure in structures:
+        parametres = build_calculation_parameters(valeurs_parametres.get(structure.id, {}))
+        indicateurs = indicateurs_par_structure.get(structure.id, [])
+        
+        total_points = 0.0
+        if indicateurs:
+            total_points = float(evaluate_points_vectorized(indicateurs_to_frame(indicateurs), parametres).sum())
+        
+        total_aci = total_points * parametres.valeur_point
+        total_charges = charges.get(structure.id) or 0.0
+        lignes.append({
+            "structure_id": structure.id,
+            "structure": structure.nom,
+            "associes": nombres_associes.get(structure.id, 0),
+            "total_points": total_points,
+            "total_aci": total_aci,
+            "total_charges": total_charges,
+            "net_revenue": total_aci - total_charges
+        })
+    
+    return pd.DataFrame(lignes, columns=[
+        "structure_id", "structure", "associes", "total_points", "total_aci", "total_charges", "net_revenue"
+    ])